@@ -168,11 +168,12 @@ class MCastManager(EmpowerApp):
             # assign MCS
             self.log.info("Block %s setting mcast address %s to %s MCS %d",
                       block, self.mcast_addr, TX_MCAST[TX_MCAST_DMS], mcs)
-            txp.mcast = TX_MCAST_LEGACY
-            if mcs_type == BT_HT20:
-                txp.ht_mcs = [mcs]
-            else:
-                txp.mcs = [mcs]
+            with txp.batch():
+                txp.mcast = TX_MCAST_LEGACY
+                if mcs_type == BT_HT20:
+                    txp.ht_mcs = [mcs]
+                else:
+                    txp.mcs = [mcs]
 
     def to_dict(self):
         """ Return a JSON-serializable."""
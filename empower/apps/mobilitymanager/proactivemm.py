@@ -53,7 +53,7 @@ class ProactiveMobilityManager(EmpowerApp):
         """ Periodic job. """
 
         for lvap in self.lvaps():
-            lvap.blocks = self.blocks().sortByRssi(lvap.addr).first()
+            lvap.blocks = self.tenant.ucqm.best(lvap.addr, 1, self.blocks())
 
 
 def launch(tenant_id, every=DEFAULT_PERIOD):
@@ -97,7 +97,7 @@ class ReactiveMobilityManager(EmpowerApp):
         if not lvap:
             return
 
-        lvap.blocks = self.blocks().sortByRssi(lvap.addr).first()
+        lvap.blocks = self.tenant.ucqm.best(lvap.addr, 1, self.blocks())
 
 
 def launch(tenant_id, limit=DEFAULT_LIMIT, every=DEFAULT_PERIOD):
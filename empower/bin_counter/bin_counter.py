@@ -31,6 +31,7 @@ from construct import Array
 from empower.datatypes.etheraddress import EtherAddress
 from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.core.module import ModulePeriodic
+from empower.core.binning import Binner
 from empower.core.app import EmpowerApp
 from empower.lvapp import PT_VERSION
 
@@ -92,7 +93,9 @@ class BinCounter(ModulePeriodic):
 
         # parameters
         self._lvap = None
-        self._bins = [8192]
+        self._bins = None
+        self._metrics = None
+        self.bins = [8192]
 
         # data structures
         self.tx_packets = []
@@ -150,6 +153,13 @@ class BinCounter(ModulePeriodic):
 
         self._bins = bins
 
+        # the time series names, built once: all the tx bytes bins, then the
+        # rx bytes, the tx packets, and the rx packets bins
+        self._metrics = tuple("%s[%u]" % (metric, size)
+                              for metric in ("tx_bytes", "rx_bytes",
+                                             "tx_packets", "rx_packets")
+                              for size in bins)
+
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the Stats """
 
@@ -202,12 +212,12 @@ class BinCounter(ModulePeriodic):
                       self.module_id)
 
         msg = STATS_REQUEST.build(stats_req)
-        lvap.wtp.connection.stream.write(msg)
+        self.worker.send_request(lvap.wtp, msg)
 
     def fill_bytes_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -216,25 +226,12 @@ class BinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if len(entry) == 0:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + size * count
-                    break
-
-        return out
+        return Binner(self.bins).fill(data)[0]
 
     def fill_packets_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -243,20 +240,7 @@ class BinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if len(entry) == 0:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + count
-                    break
-
-        return out
+        return Binner(self.bins).fill(data)[1]
 
     def update_stats(self, delta, last, current):
         """Update stats."""
@@ -279,7 +263,7 @@ class BinCounter(ModulePeriodic):
 
         # update this object
         tx_samples = response.stats[0:response.nb_tx]
-        rx_samples = response.stats[response.nb_tx:-1]
+        rx_samples = response.stats[response.nb_tx:]
 
         old_tx_bytes = self.tx_bytes
         old_rx_bytes = self.rx_bytes
@@ -287,11 +271,10 @@ class BinCounter(ModulePeriodic):
         old_tx_packets = self.tx_packets
         old_rx_packets = self.rx_packets
 
-        self.tx_bytes = self.fill_bytes_samples(tx_samples)
-        self.rx_bytes = self.fill_bytes_samples(rx_samples)
+        binner = Binner(self.bins)
 
-        self.tx_packets = self.fill_packets_samples(tx_samples)
-        self.rx_packets = self.fill_packets_samples(rx_samples)
+        self.tx_bytes, self.tx_packets = binner.fill(tx_samples)
+        self.rx_bytes, self.rx_packets = binner.fill(rx_samples)
 
         if self.last:
             delta = time.time() - self.last
@@ -306,6 +289,15 @@ class BinCounter(ModulePeriodic):
 
         self.last = time.time()
 
+        series = self.series(self.lvap, self._metrics)
+        nb_bins = len(self.bins)
+
+        for i in range(nb_bins):
+            series[i].append(self.tx_bytes[i], self.last)
+            series[nb_bins + i].append(self.rx_bytes[i], self.last)
+            series[2 * nb_bins + i].append(self.tx_packets[i], self.last)
+            series[3 * nb_bins + i].append(self.rx_packets[i], self.last)
+
         # call callback
         self.handle_callback(self)
 
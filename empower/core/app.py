@@ -19,11 +19,11 @@
 
 import time
 import uuid
-import tornado.ioloop
 import empower.logger
 
 from empower.core.lvnf import LVNF
 from empower.core.resourcepool import ResourcePool
+from empower.core.scheduler import get_scheduler
 
 from empower.main import RUNTIME
 
@@ -74,14 +74,12 @@ class EmpowerApp:
     def start(self):
         """Start control loop."""
 
-        self.worker = \
-            tornado.ioloop.PeriodicCallback(self.loop, self.every)
-        self.worker.start()
+        self.worker = get_scheduler().add_timer(self.loop, self.every)
 
     def stop(self):
         """Stop control loop."""
 
-        self.worker.stop()
+        self.worker.cancel()
 
     def to_dict(self):
         """Return JSON-serializable representation of the object."""
@@ -130,12 +128,17 @@ class EmpowerApp:
         if self.tenant_id not in RUNTIME.tenants:
             return None
 
-        lvaps = RUNTIME.tenants[self.tenant_id].lvaps.values()
+        lvaps = RUNTIME.tenants[self.tenant_id].lvaps
 
         if not block:
-            return lvaps
+            return lvaps.values()
 
-        return [x for x in lvaps if x.blocks[0] == block]
+        block = block.radio.block_for(block.hwaddr, block.channel, block.band)
+
+        if not block:
+            return []
+
+        return [x for x in block.downlinks.values() if x.addr in lvaps]
 
     def lvap(self, addr):
         """Return a particular LVAP in this tenant."""
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Packet size binning used by the bin counter modules.
+
+Samples are [size, count] pairs where count is the number of size-long
+packets (bytes, including the Ethernet 2 header) TX/RX by an LVAP. A packet
+falls in the first bin whose bound is larger than or equal to its size,
+packets larger than the last bound are not counted. The bin of each sample is
+found with a binary search over the bounds, the samples do not need to be
+sorted.
+"""
+
+from bisect import bisect_left
+
+
+class Binner:
+    """Classifies samples into bins.
+
+    Attributes:
+        bins: the bins upper bounds (monotonically increasing)
+    """
+
+    __slots__ = ('bins', )
+
+    def __init__(self, bins):
+
+        self.bins = list(bins)
+
+    def fill(self, samples, size=0, count=1):
+        """Bin a list of samples.
+
+        Args:
+            samples, a list of samples
+            size, the position of the size in each sample
+            count, the position of the count in each sample
+
+        Returns:
+            a (bytes, packets) tuple of lists with one entry per bin
+        """
+
+        bins = self.bins
+        nb_bins = len(bins)
+        out_bytes = [0] * nb_bins
+        out_packets = [0] * nb_bins
+
+        for entry in samples:
+
+            if not entry:
+                continue
+
+            index = bisect_left(bins, entry[size])
+
+            if index == nb_bins:
+                continue
+
+            out_bytes[index] += entry[size] * entry[count]
+            out_packets[index] += entry[count]
+
+        return out_bytes, out_packets
+
+    def fill_by_key(self, samples, key=0, size=1, count=2):
+        """Bin a list of samples of several entities in one pass.
+
+        Args:
+            samples, a list of samples
+            key, the position of the entity (e.g. the LVAP) in each sample
+            size, the position of the size in each sample
+            count, the position of the count in each sample
+
+        Returns:
+            a (bytes, packets) tuple of dicts mapping each entity to a list
+            with one entry per bin
+        """
+
+        bins = self.bins
+        nb_bins = len(bins)
+        out_bytes = {}
+        out_packets = {}
+
+        for entry in samples:
+
+            if not entry:
+                continue
+
+            entity = entry[key]
+
+            if entity not in out_bytes:
+                out_bytes[entity] = [0] * nb_bins
+                out_packets[entity] = [0] * nb_bins
+
+            index = bisect_left(bins, entry[size])
+
+            if index == nb_bins:
+                continue
+
+            out_bytes[entity][index] += entry[size] * entry[count]
+            out_packets[entity][index] += entry[count]
+
+        return out_bytes, out_packets
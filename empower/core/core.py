@@ -38,6 +38,7 @@ from empower.persistence.persistence import TblBelongs
 from empower.persistence.persistence import TblPendingTenant
 from empower.core.account import Account
 from empower.core.tenant import Tenant
+from empower.core.tenant import T_TYPE_SHARED
 from empower.core.acl import ACL
 from empower.persistence.persistence import TblAllow
 from empower.persistence.persistence import TblDeny
@@ -86,13 +87,22 @@ def generate_default_accounts():
 
 
 class EmpowerRuntime:
-    """EmPOWER Runtime."""
+    """EmPOWER Runtime.
+
+    Tenants are indexed by network name (SSID) and by PLMN id. The runtime
+    also keeps track of the SSIDs of the tenants using unique BSSIDs that are
+    available at each WTP. The indexes are updated when a tenant is added or
+    removed and when a PNFDev is added to or removed from a tenant.
+    """
 
     def __init__(self, options):
 
         self.components = {}
         self.accounts = {}
         self.tenants = {}
+        self.tenants_by_ssid = {}
+        self.tenants_by_plmn_id = {}
+        self.wtp_ssids = {}
         self.lvaps = {}
         self.ues = {}
         self.wtps = {}
@@ -174,13 +184,63 @@ class EmpowerRuntime:
             if tenant.tenant_id in self.tenants:
                 raise KeyError(tenant.tenant_id)
 
-            self.tenants[tenant.tenant_id] = \
-                Tenant(tenant.tenant_id,
-                       tenant.tenant_name,
-                       tenant.owner,
-                       tenant.desc,
-                       tenant.bssid_type,
-                       tenant.plmn_id)
+            self.__add_tenant(Tenant(tenant.tenant_id,
+                                     tenant.tenant_name,
+                                     tenant.owner,
+                                     tenant.desc,
+                                     tenant.bssid_type,
+                                     tenant.plmn_id))
+
+    def __add_tenant(self, tenant):
+        """Add a tenant to the runtime and to the tenant indexes."""
+
+        self.tenants[tenant.tenant_id] = tenant
+        self.tenants_by_ssid[tenant.tenant_name] = tenant
+
+        if tenant.plmn_id:
+            self.tenants_by_plmn_id[tenant.plmn_id] = tenant
+
+    def __remove_tenant(self, tenant):
+        """Remove a tenant from the runtime and from the tenant indexes."""
+
+        for wtp in tenant.wtps.values():
+            self.remove_tenant_pnfdev(tenant, wtp)
+
+        del self.tenants[tenant.tenant_id]
+
+        if self.tenants_by_ssid.get(tenant.tenant_name) == tenant:
+            del self.tenants_by_ssid[tenant.tenant_name]
+
+        if self.tenants_by_plmn_id.get(tenant.plmn_id) == tenant:
+            del self.tenants_by_plmn_id[tenant.plmn_id]
+
+    def add_tenant_pnfdev(self, tenant, pnfdev):
+        """Update the WTP SSIDs index after a PNFDev joined a tenant."""
+
+        from empower.core.wtp import WTP
+
+        if not isinstance(pnfdev, WTP):
+            return
+
+        if tenant.bssid_type == T_TYPE_SHARED:
+            return
+
+        if pnfdev.addr not in self.wtp_ssids:
+            self.wtp_ssids[pnfdev.addr] = set()
+
+        self.wtp_ssids[pnfdev.addr].add(tenant.tenant_name)
+
+    def remove_tenant_pnfdev(self, tenant, pnfdev):
+        """Update the WTP SSIDs index after a PNFDev left a tenant."""
+
+        if pnfdev.addr not in self.wtp_ssids:
+            return
+
+        ssids = self.wtp_ssids[pnfdev.addr]
+        ssids.discard(tenant.tenant_name)
+
+        if not ssids:
+            del self.wtp_ssids[pnfdev.addr]
 
     def __load_imsi2mac(self):
         """Load IMSI to MAC mapped values."""
@@ -499,13 +559,12 @@ class EmpowerRuntime:
             session.rollback()
             raise ValueError("Tenant name %s exists", tenant_name)
 
-        self.tenants[request.tenant_id] = \
-            Tenant(request.tenant_id,
-                   request.tenant_name,
-                   self.accounts[owner].username,
-                   desc,
-                   request.bssid_type,
-                   request.plmn_id)
+        self.__add_tenant(Tenant(request.tenant_id,
+                                 request.tenant_name,
+                                 self.accounts[owner].username,
+                                 desc,
+                                 request.bssid_type,
+                                 request.plmn_id))
 
         return request.tenant_id
 
@@ -599,7 +658,7 @@ class EmpowerRuntime:
             session.commit()
 
         # remove tenant
-        del self.tenants[tenant_id]
+        self.__remove_tenant(tenant)
 
         tenant = Session().query(TblTenant) \
                           .filter(TblTenant.tenant_id == tenant_id) \
@@ -627,20 +686,12 @@ class EmpowerRuntime:
     def load_tenant(self, tenant_name):
         """Load tenant from network name (SSID)."""
 
-        for tenant in self.tenants.values():
-            if tenant.tenant_name == tenant_name:
-                return tenant
-
-        return None
+        return self.tenants_by_ssid.get(tenant_name)
 
     def load_tenant_by_plmn_id(self, plmn_id):
         """Load tenant from network name."""
 
-        for tenant in self.tenants.values():
-            if tenant.plmn_id == plmn_id:
-                return tenant
-
-        return None
+        return self.tenants_by_plmn_id.get(plmn_id)
 
     def remove_lvap(self, lvap_addr):
         """Remove LVAP from the network"""
@@ -663,10 +714,18 @@ class EmpowerRuntime:
             lvapp_server = self.components[LVAPPServer.__module__]
             lvapp_server.send_lvap_leave_message_to_self(lvap)
 
+        # the blocks currently used by the LVAP (cleared by clear_lvap)
+        blocks = [block for block in lvap.blocks if block]
+
         # Reset LVAP
         self.log.info("Deleting LVAP (DL+UL): %s", lvap.addr)
         lvap.clear_lvap()
 
+        # Drop the transmission policies of the LVAP, the policies left on
+        # the blocks used before a handover are removed when idle
+        for block in blocks:
+            block.tx_policies.pop(lvap.addr, None)
+
         del self.lvaps[lvap.addr]
 
     def remove_ue(self, ue_id):
@@ -17,9 +17,12 @@
 
 """EmPOWER Light Virtual Access Point (LVAP) class."""
 
+from tornado.ioloop import IOLoop
+
 from empower.core.resourcepool import ResourceBlock
 from empower.core.resourcepool import BANDS
 from empower.core.resourcepool import BT_HT20
+from empower.core.transmissionpolicy import intern_mcs
 from empower.core.virtualport import VirtualPort
 from empower.core.utils import generate_bssid
 from empower.core.tenant import T_TYPE_SHARED
@@ -27,6 +30,13 @@ from empower.intentserver.intentserver import IntentServer
 
 from empower.main import RUNTIME
 
+# default transmission policy, shared by all the LVAPs
+MCS_5GHZ = intern_mcs([6.0, 9.0, 12.0, 18.0, 24.0, 36.0, 48.0, 54.0])
+MCS_2GHZ = intern_mcs([1.0, 2.0, 5.5, 11.0,
+                       6.0, 9.0, 12.0, 18.0, 24.0, 36.0, 48, 54.0])
+HT_MCS = intern_mcs(range(0, 16))
+NO_HT_MCS = intern_mcs([])
+
 
 class LVAP:
     """ The EmPOWER Light Virtual Access Point
@@ -68,6 +78,10 @@ class LVAP:
 
       lvap.txp.mcs = [1,2,3,4,5,6,7]
 
+    Several fields can be changed with a single message to the WTP:
+
+      lvap.txp.update(mcs=[6, 12], no_ack=True)
+
     Attributes:
         addr: The client's MAC Address as an EtherAddress instance.
         tx_samples: array of 2-tuples of the TX'ed packets
@@ -98,6 +112,18 @@ class LVAP:
         blocks: the concatenation of the downlink and uplink blocks
     """
 
+    __slots__ = ('addr', 'net_bssid', '_lvap_bssid', 'authentication_state',
+                 'association_state', '_ssids', '_encap', '_assoc_id',
+                 '_tenant', '_supported_band', '_downlink', '_uplink', 'ports',
+                 'poa_uuid', '__module_id', 'pending')
+
+    # LVAPs waiting for a refresh, indexed by id
+    __pending = {}
+
+    # number of refreshes sent to the WTPs and saved by coalescing
+    refreshes = 0
+    refreshes_saved = 0
+
     def __init__(self, addr, net_bssid_addr, lvap_bssid_addr):
 
         # read only params
@@ -156,18 +182,58 @@ class LVAP:
         return self.__module_id
 
     def refresh_lvap(self):
+        """Schedule an ADD_LVAP message for the downlink and uplinks blocks.
+
+        The message is not sent immediately: all the refreshes requested for
+        this LVAP during the current IOLoop iteration are coalesced and sent
+        at the next iteration, unless commit() is called first.
+        """
+
+        if id(self) in LVAP.__pending:
+            LVAP.refreshes_saved += 1
+            return
+
+        if not LVAP.__pending:
+            IOLoop.current().add_callback(LVAP.__flush)
+
+        LVAP.__pending[id(self)] = self
+
+    def commit(self):
+        """Send the pending refresh (if any) now."""
+
+        if LVAP.__pending.pop(id(self), None):
+            self.__send_refresh()
+
+    def __discard_refresh(self):
+        """Drop the pending refresh (if any)."""
+
+        if LVAP.__pending.pop(id(self), None):
+            LVAP.refreshes_saved += 1
+
+    def __send_refresh(self):
         """Send add lvap message for downlink and uplinks blocks."""
 
-        if not self.blocks:
+        if not self._downlink:
             return
 
-        self.blocks[0].radio.connection.send_add_lvap(self,
-                                                      self.blocks[0],
+        LVAP.refreshes += 1
+
+        self._downlink.radio.connection.send_add_lvap(self, self._downlink,
                                                       True)
 
-        for block in self.blocks[1:]:
+        for block in self._uplink:
             block.radio.connection.send_add_lvap(self, block, False)
 
+    @staticmethod
+    def __flush():
+        """Send the refreshes requested in the last IOLoop iteration."""
+
+        pending = LVAP.__pending
+        LVAP.__pending = {}
+
+        for lvap in pending.values():
+            lvap.__send_refresh()
+
     @property
     def encap(self):
         """Get the encap."""
@@ -277,10 +343,10 @@ class LVAP:
     def txp(self):
         """ Get downlink transmission policy. """
 
-        if not blocks:
+        if not self._downlink:
             return None
 
-        return self.blocks[0].tx_policies[self.addr]
+        return self._downlink.tx_policies[self.addr]
 
     @property
     def blocks(self):
@@ -346,6 +412,9 @@ class LVAP:
         # set uplink blocks
         self.__assign_uplink(pool[1:])
 
+        # the blocks have just been sent the current state of the LVAP
+        self.__discard_refresh()
+
         # delete all outgoing virtual link and then remove the entire port
         if self.ports:
             self.ports[0].clear()
@@ -376,24 +445,23 @@ class LVAP:
         txp = dl_block.tx_policies[self.addr]
 
         if dl_block.channel > 14:
-            txp._mcs = [6.0, 9.0, 12.0, 18.0, 24.0, 36.0, 48.0, 54.0]
+            txp._mcs = MCS_5GHZ
         else:
-            txp._mcs = [1.0, 2.0, 5.5, 11.0,
-                        6.0, 9.0, 12.0, 18.0, 24.0, 36.0, 48, 54.0]
+            txp._mcs = MCS_2GHZ
 
         if self.supported_band == BT_HT20:
-            txp._ht_mcs = \
-                [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+            txp._ht_mcs = HT_MCS
         else:
-            txp._ht_mcs = []
+            txp._ht_mcs = NO_HT_MCS
 
+        dl_block.tx_policies[self.addr] = txp
         dl_block.radio.connection.send_set_port(txp)
 
         # send add_lvap message
         dl_block.radio.connection.send_add_lvap(self, dl_block, True)
 
         # save block
-        self._downlink = dl_block
+        self.set_downlink(dl_block)
 
     def __assign_uplink(self, ul_blocks):
         """Set the downlink blocks."""
@@ -404,7 +472,24 @@ class LVAP:
             block.radio.connection.send_add_lvap(self, block, False)
 
             # save block into the list
-            self._uplink.append(block)
+            self.add_uplink(block)
+
+    def set_downlink(self, block):
+        """Set the downlink block and update the blocks' LVAP index."""
+
+        if self._downlink:
+            self._downlink.downlinks.pop(self.addr, None)
+
+        self._downlink = block
+
+        if block:
+            block.downlinks[self.addr] = self
+
+    def add_uplink(self, block):
+        """Add an uplink block and update the blocks' LVAP index."""
+
+        self._uplink.append(block)
+        block.uplinks[self.addr] = self
 
     @property
     def wtp(self):
@@ -431,20 +516,25 @@ class LVAP:
         """Clear all blocks."""
 
         if self.blocks[0]:
-            if self.blocks[0].channel != target_block.channel:
+            if target_block and \
+               self.blocks[0].channel != target_block.channel:
                 self.blocks[0].radio.connection.send_del_lvap(self, target_block)
             else:
                 self.blocks[0].radio.connection.send_del_lvap(self)
 
         for block in self.blocks[1:]:
             block.radio.connection.send_del_lvap(self)
+            block.uplinks.pop(self.addr, None)
 
-        self._downlink = None
+        self.set_downlink(None)
         self._uplink = []
 
     def clear_lvap(self):
         """Clear lvap."""
 
+        # the LVAP is going away, do not refresh it
+        self.__discard_refresh()
+
         # clear all blocks
         self.clear_blocks()
 
@@ -452,6 +542,7 @@ class LVAP:
         if self.poa_uuid:
             intent_server = RUNTIME.components[IntentServer.__module__]
             intent_server.remove_poa(self.poa_uuid)
+            self.poa_uuid = None
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the LVAP """
@@ -18,53 +18,26 @@
 """EmPOWER Primitive Base Class."""
 
 import re
-import json
 import types
-import xmlrpc.client
 
 import tornado.web
 import tornado.httpserver
-from tornado.ioloop import IOLoop
 
 from uuid import UUID
-from multiprocessing.pool import ThreadPool
 
 import empower.logger
 
 from empower.core.service import Service
-from empower.core.jsonserializer import EmpowerEncoder
+from empower.core.scheduler import get_scheduler
+from empower.core.sink import get_sink
+from empower.core.sink import is_webhook
+from empower.core.timeseries import get_timeseries
 from empower.restserver.apihandlers import EmpowerAPIHandlerAdminUsers
 from empower.restserver.restserver import RESTServer
 
 from empower.main import RUNTIME
 
 
-_WORKERS = ThreadPool(10)
-
-
-def exec_xmlrpc(callback, args=()):
-    """Execute XML-RPC call."""
-
-    proxy = xmlrpc.client.ServerProxy(callback[0])
-    func = getattr(proxy, callback[1])
-    run_background(func, on_complete, args)
-
-
-def run_background(func, callback, args=(), kwds={}):
-    """Run callback in background."""
-
-    def _callback(result):
-        IOLoop.instance().add_callback(lambda: callback(result))
-
-    _WORKERS.apply_async(func, args, kwds, _callback)
-
-
-def on_complete(res):
-    """XML RPC Callback."""
-
-    pass
-
-
 class ModuleHandler(EmpowerAPIHandlerAdminUsers):
     """ModuleHandler. Used to view and manipulate modules."""
 
@@ -204,6 +177,7 @@ class Module():
         self.__tenant_id = None
         self.__callback = None
         self.__periodic = None
+        self.__series = {}
         self.log = empower.logger.get_logger()
 
     def unload(self):
@@ -211,6 +185,49 @@ class Module():
 
         self.worker.remove_module(self.module_id)
 
+    def record(self, entity, metric, value, timestamp=None):
+        """Record a sample in the time series store.
+
+        Args:
+            entity, the measured entity (e.g. the LVAP address)
+            metric, the metric name
+            value, the sample value
+            timestamp, the sample timestamp (default is now)
+
+        Returns:
+            None
+        """
+
+        get_timeseries().append(self.module_type, entity, metric, value,
+                                timestamp)
+
+    def series(self, entity, metrics):
+        """Return the time series of the specified metrics of an entity.
+
+        The time series are fetched from the store once and cached, the
+        cache is refreshed when the metrics change (metrics should be a
+        tuple built once, e.g. when the module is configured) or when the
+        store removes time series.
+
+        Args:
+            entity, the measured entity (e.g. the LVAP address)
+            metrics, a tuple of metric names
+
+        Returns:
+            a list of time series, in the same order of metrics
+        """
+
+        store = get_timeseries()
+        cached = self.__series.get(entity)
+
+        if cached is None or cached[0] is not metrics or \
+           cached[1] != store.generation:
+            cached = (metrics, store.generation,
+                      store.get_many(self.module_type, entity, metrics))
+            self.__series[entity] = cached
+
+        return cached[2]
+
     def handle_callback(self, serializable):
         """Handle an module callback.
 
@@ -229,17 +246,18 @@ class Module():
 
         try:
 
-            as_dict = serializable.to_dict()
-            as_json = json.dumps(as_dict, cls=EmpowerEncoder)
-
+            # local callbacks get the object, no serialization
             if isinstance(callback, types.FunctionType) or \
                isinstance(callback, types.MethodType):
 
                 callback(serializable)
 
-            elif isinstance(callback, list) and len(callback) == 2:
+            # remote callbacks are serialized by the sink
+            elif (isinstance(callback, list) and len(callback) == 2) or \
+                    is_webhook(callback):
 
-                exec_xmlrpc(callback, (as_json, ))
+                get_sink(callback).send(serializable,
+                                        (self.tenant_id, self.module_id))
 
             else:
 
@@ -283,7 +301,7 @@ class Module():
         The callback is generated when the condition is verified. Callback can
         be either a reference to a fucntion or an tuple whose first entry is
         the URL of a remote xmlrpc server and the second entry is the method
-        to be called.
+        to be called, or the http(s) URL of a webhook.
         """
 
         if not callback:
@@ -299,6 +317,10 @@ class Module():
 
             self.__callback = callback
 
+        elif is_webhook(callback):
+
+            self.__callback = callback
+
         else:
 
             raise TypeError("Invalid callback type")
@@ -386,9 +408,7 @@ class ModulePeriodic(Module):
             self.run_once()
             return
 
-        self.__periodic = \
-            tornado.ioloop.PeriodicCallback(self.run_once, self.every)
-        self.__periodic.start()
+        self.__periodic = get_scheduler().add_timer(self.run_once, self.every)
 
     def stop(self):
         """Stop worker."""
@@ -396,7 +416,7 @@ class ModulePeriodic(Module):
         if self.every == -1:
             return
 
-        self.__periodic.stop()
+        self.__periodic.cancel()
 
     def to_dict(self):
         """Return JSON-serializable representation of the object."""
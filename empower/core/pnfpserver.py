@@ -263,10 +263,30 @@ class BaseTenantPNFDevHandler(EmpowerAPIHandlerAdminUsers):
 
 
 class PNFPServer(Service):
-    """Exposes the PNF Protocol API."""
+    """Exposes the PNF Protocol API.
+
+    Attributes:
+        pt_types: dictionary mapping message types to parsers
+        pt_types_handlers: dictionary mapping message types to the list of
+          handlers registered by modules
+        pt_types_gates: dictionary mapping message types to lists of gates.
+          A gate is a callable receiving the raw message and returning True
+          if the message is addressed to its consumer. A message is dropped
+          without parsing its body if no gate accepts it
+        orphans: dictionary mapping message types to the number of messages
+          dropped because no gate accepted them
+        dispatch: dictionary mapping message types to (parser, built-in
+          handler, handlers, gate) tuples. The gate accepts a message if
+          any of the gates registered for its type does. The built-in
+          handler is the connection method named after the parser (e.g.
+          _handle_hello), the handlers are the ones registered by modules.
+          Only message types with at least one consumer are included in this
+          table.
+    """
 
     PNFDEV = None
     TBL_PNFDEV = None
+    CONNECTION = None
 
     def __init__(self, port, pt_types, pt_types_handlers):
 
@@ -277,6 +297,12 @@ class PNFPServer(Service):
         self.__load_belongs()
         self.pt_types = pt_types
         self.pt_types_handlers = pt_types_handlers
+        self.pt_types_gates = {}
+        self.orphans = {}
+        self.dispatch = {}
+
+        for pt_type in self.pt_types:
+            self.__update_dispatch(pt_type)
 
     @property
     def pnfdevs(self):
@@ -314,6 +340,8 @@ class PNFPServer(Service):
 
             tenant_pnfdevs[pnfdev.addr] = pnfdev
 
+            RUNTIME.add_tenant_pnfdev(tenant, pnfdev)
+
     def to_dict(self):
         """ Return a dict representation of the object. """
 
@@ -360,6 +388,54 @@ class PNFPServer(Service):
         session.delete(pnfdev)
         session.commit()
 
+    def __update_dispatch(self, pt_type):
+        """ Update the dispatch table entry for the specified message type. """
+
+        parser = self.pt_types.get(pt_type)
+
+        if not parser:
+            self.dispatch.pop(pt_type, None)
+            return
+
+        builtin = None
+
+        if self.CONNECTION:
+            builtin = getattr(self.CONNECTION, "_handle_%s" % parser.name,
+                              None)
+
+        if pt_type not in self.pt_types_handlers:
+            self.pt_types_handlers[pt_type] = []
+
+        handlers = self.pt_types_handlers[pt_type]
+
+        if not builtin and not handlers:
+            self.dispatch.pop(pt_type, None)
+            return
+
+        gate = self.__gate(pt_type) if pt_type in self.pt_types_gates \
+            else None
+
+        self.dispatch[pt_type] = (parser, builtin, handlers, gate)
+
+    def __gate(self, pt_type):
+        """ Return a gate accepting a message if any of the gates registered
+        for the specified message type does. """
+
+        gates = self.pt_types_gates[pt_type]
+
+        def gate(frame):
+            """ Check the gates and count the orphans. """
+
+            for accept in gates:
+                if accept(frame):
+                    return True
+
+            self.orphans[pt_type] = self.orphans.get(pt_type, 0) + 1
+
+            return False
+
+        return gate
+
     def register_message(self, pt_type, parser, handler):
         """ Register new handler. This will be called after the default. """
 
@@ -372,6 +448,21 @@ class PNFPServer(Service):
         if handler:
             self.pt_types_handlers[pt_type].append(handler)
 
+        self.__update_dispatch(pt_type)
+
+    def register_message_gate(self, pt_type, gate):
+        """ Register a gate for the specified message type. The gates are
+        called with the raw message before parsing it, if none of the gates
+        registered for the message type returns True the message is dropped.
+        """
+
+        if pt_type not in self.pt_types_gates:
+            self.pt_types_gates[pt_type] = []
+
+        self.pt_types_gates[pt_type].append(gate)
+
+        self.__update_dispatch(pt_type)
+
     def register_message_handler(self, pt_type, handler):
         """ Register new handler. This will be called after the default. """
 
@@ -380,3 +471,5 @@ class PNFPServer(Service):
 
         if handler:
             self.pt_types_handlers[pt_type].append(handler)
+
+        self.__update_dispatch(pt_type)
@@ -17,8 +17,14 @@
 
 """EmPOWER resouce pool and resource block classes."""
 
+import time
+import heapq
+
+from operator import itemgetter
+
 from empower.datatypes.etheraddress import EtherAddress
 from empower.core.transmissionpolicy import TxPolicy
+from empower.core.transmissionpolicy import intern_mcs
 from empower.core.trafficrulequeue import TrafficRuleQueue
 
 BT_L20 = 0
@@ -33,37 +39,188 @@ BANDS = {BT_L20: L20,
 REVERSE_BANDS = {L20: BT_L20,
                  HT20: BT_HT20}
 
-class TxPolicyProp(dict):
-    """Override getitem behaviour by a default TxPolicy."""
+
+class PolicyProp(dict):
+    """Dictionary of policies indexed by key.
+
+    Reading a missing key returns a default policy which is not stored in
+    the dictionary, so looking up the policy of a station does not keep the
+    station in memory. Policies are stored when they are explicitly set,
+    i.e. when one of their fields is changed. Stored policies that have not
+    been accessed for a while can be removed with expire().
+
+    The default policy is an instance of POLICY built from the key (tuple
+    keys are expanded into positional arguments) and the block.
+
+    Attributes:
+        block: the resource block to which the policies refer to
+        last_seen: dictionary mapping each key to its last access time
+        evicted: number of policies removed from the dictionary
+    """
+
+    POLICY = None
 
     def __init__(self, block, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.block = block
+        self.last_seen = {key: time.time() for key in self}
+        self.evicted = 0
+
+    def default(self, key):
+        """Return the default policy for the specified key."""
+
+        args = key if isinstance(key, tuple) else (key, )
+
+        return self.POLICY(*args, block=self.block)
+
+    def is_pinned(self, key):
+        """Return True if the policy cannot expire."""
+
+        return False
 
     def __getitem__(self, key):
-        try:
-            return dict.__getitem__(self, key)
-        except KeyError:
-            value = TxPolicy(key, self.block)
-            dict.__setitem__(self, key, value)
+
+        if dict.__contains__(self, key):
+            self.last_seen[key] = time.time()
             return dict.__getitem__(self, key)
 
+        return self.default(key)
 
-class TrafficRuleQueueProp(dict):
-    """Override getitem behaviour by a default TxRule."""
+    def __setitem__(self, key, value):
+
+        dict.__setitem__(self, key, value)
+        self.last_seen[key] = time.time()
+
+    def __delitem__(self, key):
+
+        dict.__delitem__(self, key)
+        del self.last_seen[key]
+        self.evicted += 1
+
+    def pop(self, key, *args):
+
+        if dict.__contains__(self, key):
+            del self.last_seen[key]
+            self.evicted += 1
+
+        return dict.pop(self, key, *args)
+
+    def expire(self, idle):
+        """Remove the policies not accessed in the last idle seconds.
+
+        Returns the number of removed policies.
+        """
+
+        deadline = time.time() - idle
+
+        expired = [key for key, last_seen in self.last_seen.items()
+                   if last_seen < deadline and not self.is_pinned(key)]
+
+        for key in expired:
+            del self[key]
+
+        return len(expired)
 
-    def __init__(self, block, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.block = block
+
+class TxPolicyProp(PolicyProp):
+    """Transmission policies indexed by station address. The policies of
+    the LVAPs hosted by the block and the multicast policies never
+    expire."""
+
+    POLICY = TxPolicy
+
+    def is_pinned(self, key):
+        """Return True if the policy cannot expire."""
+
+        return key in self.block.downlinks or key.is_multicast()
+
+
+class TrafficRuleQueueProp(PolicyProp):
+    """Traffic rule queues indexed by (ssid, dscp). The queues of the
+    active tenants never expire."""
+
+    POLICY = TrafficRuleQueue
+
+    def is_pinned(self, key):
+        """Return True if the policy cannot expire."""
+
+        from empower.main import RUNTIME
+
+        return key[0] in RUNTIME.tenants_by_ssid
+
+
+class CQMEntry:
+    """A CQM entry, i.e. the RSSI statistics of a single station.
+
+    Entries can be accessed as dictionaries, e.g. entry['mov_rssi'].
+
+    Attributes:
+        addr: the station address
+        last_rssi_std: RSSI standard deviation in the last period
+        last_rssi_avg: RSSI average in the last period
+        last_packets: number of packets in the last period
+        hist_packets: number of packets since the entry was created
+        mov_rssi: RSSI moving average
+    """
+
+    __slots__ = ('addr', 'last_rssi_std', 'last_rssi_avg', 'last_packets',
+                 'hist_packets', 'mov_rssi')
+
+    def __init__(self, addr, last_rssi_std=-float("inf"),
+                 last_rssi_avg=-float("inf"), last_packets=0,
+                 hist_packets=0, mov_rssi=-float("inf")):
+
+        self.addr = addr
+        self.last_rssi_std = last_rssi_std
+        self.last_rssi_avg = last_rssi_avg
+        self.last_packets = last_packets
+        self.hist_packets = hist_packets
+        self.mov_rssi = mov_rssi
+
+    def keys(self):
+        """Return the fields names."""
+
+        return self.__slots__
+
+    def items(self):
+        """Return the (field, value) pairs."""
+
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self):
+        """Return a json-frinedly representation of the object."""
+
+        return dict(self.items())
 
     def __getitem__(self, key):
-        try:
-            return dict.__getitem__(self, key)
-        except KeyError:
-            value = \
-                TrafficRuleQueue(ssid=key[0], dscp=key[1], block=self.block)
-            dict.__setitem__(self, key, value)
-            return dict.__getitem__(self, key)
+
+        if key not in self.__slots__:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+
+        if key not in self.__slots__:
+            raise KeyError(key)
+
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, CQMEntry):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return False
+
+    def __repr__(self):
+        return "CQMEntry(%s)" % self.to_dict()
 
 
 class CQM(dict):
@@ -81,14 +238,7 @@ class CQM(dict):
 
         except KeyError:
 
-            inf = {'addr': key,
-                   'last_rssi_std': -float("inf"),
-                   'last_rssi_avg': -float("inf"),
-                   'last_packets': 0,
-                   'hist_packets': 0,
-                   'mov_rssi': -float("inf")}
-
-            return inf
+            return CQMEntry(key)
 
 
 class ResourcePool(list):
@@ -98,17 +248,71 @@ class ResourcePool(list):
     """
 
     def sortByRssi(self, addr):
-        blocks = sorted(self, key=lambda x: x.ucqm[addr]['mov_rssi'],
-                        reverse=True)
+        blocks = sorted(self, key=lambda x: x.rssi(addr), reverse=True)
         return ResourcePool(blocks)
 
+    def top(self, addr, k=1, metric='mov_rssi', band=None, channel=None,
+            min_rssi=None):
+        """Return the k blocks with the highest value of a CQM metric for a
+        station.
+
+        The pool is scanned once keeping the best k blocks in a heap, i.e.
+        the cost is O(n log k) and the pool is neither copied nor sorted.
+        Ties are broken by the position in the pool.
+
+        Args:
+            addr: the station address
+            k: the number of blocks
+            metric: the UCQM metric (e.g. mov_rssi, last_rssi_avg)
+            band: only blocks on this band are considered
+            channel: only blocks on this channel are considered
+            min_rssi: only blocks whose RSSI moving average is at least
+              min_rssi are considered (blocks that never heard the station
+              are then excluded)
+
+        Returns:
+            a ResourcePool sorted by decreasing value of the metric
+
+        Example:
+
+            lvap.blocks = self.blocks().top(lvap.addr, band=BT_HT20,
+                                            min_rssi=-80)
+        """
+
+        if metric not in CQMEntry.__slots__:
+            raise KeyError(metric)
+
+        blocks = (block for block in self
+                  if (band is None or block.band == band) and
+                  (channel is None or block.channel == channel))
+
+        if min_rssi is not None:
+            blocks = (block for block in blocks
+                      if block.rssi(addr) >= min_rssi)
+
+        values = ((block.quality(addr, metric), block) for block in blocks)
+
+        best = heapq.nlargest(k, values, key=itemgetter(0))
+
+        return ResourcePool([block for _, block in best])
+
     def first(self):
-        block = list.__getitem__(self, 0)
-        return ResourcePool([block])
+        """Return a pool with the first block (empty if the pool is empty).
+        """
+
+        if not self:
+            return ResourcePool()
+
+        return ResourcePool([list.__getitem__(self, 0)])
 
     def last(self):
-        selected = list.__getitem__(self, -1)
-        return ResourcePool([block])
+        """Return a pool with the last block (empty if the pool is empty).
+        """
+
+        if not self:
+            return ResourcePool()
+
+        return ResourcePool([list.__getitem__(self, -1)])
 
 
 class ResourceBlock:
@@ -130,21 +334,37 @@ class ResourceBlock:
           reported by the device, that is if the device is an 11a
           device it will report [6, 12, 18, 36, 54]. If the device is
           an 11n device it will report [0, 1, 2, 3, 4, 5, 6, 7]
+        downlinks: dictionary of LVAPs using this block in the downlink
+          direction (indexed by LVAP address)
+        uplinks: dictionary of LVAPs using this block in the uplink direction
+          (indexed by LVAP address)
+        vaps: dictionary of VAPs hosted by this block (indexed by net bssid)
+
+    The dictionaries are allocated on first use, while the sets of supported
+    MCS are shared by all the blocks supporting the same MCS.
     """
 
+    __slots__ = ('_radio', '_hwaddr', '_channel', '_band', '_ucqm', '_ncqm',
+                 '_wifi_stats', '_tx_policies', '_traffic_rule_queues',
+                 '_supports', '_ht_supports', '_downlinks', '_uplinks',
+                 '_vaps')
+
     def __init__(self, radio, hwaddr, channel, band):
 
         self._radio = radio
         self._hwaddr = hwaddr
         self._channel = channel
         self._band = band
-        self.ucqm = CQM()
-        self.ncqm = CQM()
-        self.wifi_stats = {}
-        self.tx_policies = TxPolicyProp(self)
-        self.traffic_rule_queues = TrafficRuleQueueProp(self)
-        self._supports = set()
-        self._ht_supports = set()
+        self._ucqm = None
+        self._ncqm = None
+        self._wifi_stats = None
+        self._tx_policies = None
+        self._traffic_rule_queues = None
+        self._supports = intern_mcs(())
+        self._ht_supports = intern_mcs(())
+        self._downlinks = None
+        self._uplinks = None
+        self._vaps = None
 
         if self.channel > 14:
             self.supports = [6.0, 9.0, 12.0, 18.0, 24.0, 36.0, 48.0, 54.0]
@@ -156,6 +376,99 @@ class ResourceBlock:
             self.ht_supports = [0, 1, 2, 3, 4, 5, 6, 7,
                                 8, 9, 10, 11, 12, 13, 14, 15]
 
+    @property
+    def ucqm(self):
+        """ Return the user interference matrix. """
+
+        if self._ucqm is None:
+            self._ucqm = CQM()
+
+        return self._ucqm
+
+    def rssi(self, addr):
+        """ Return the RSSI moving average of a station (-inf if unknown).
+        """
+
+        entry = dict.get(self._ucqm, addr) if self._ucqm else None
+
+        if entry is None:
+            return -float("inf")
+
+        return entry.mov_rssi
+
+    def quality(self, addr, metric='mov_rssi'):
+        """ Return a UCQM metric of a station (-inf if unknown). """
+
+        entry = dict.get(self._ucqm, addr) if self._ucqm else None
+
+        if entry is None:
+            return -float("inf")
+
+        return getattr(entry, metric)
+
+    @property
+    def ncqm(self):
+        """ Return the network interference matrix. """
+
+        if self._ncqm is None:
+            self._ncqm = CQM()
+
+        return self._ncqm
+
+    @property
+    def wifi_stats(self):
+        """ Return the WiFi stats. """
+
+        if self._wifi_stats is None:
+            self._wifi_stats = {}
+
+        return self._wifi_stats
+
+    @property
+    def tx_policies(self):
+        """ Return the transmission policies. """
+
+        if self._tx_policies is None:
+            self._tx_policies = TxPolicyProp(self)
+
+        return self._tx_policies
+
+    @property
+    def traffic_rule_queues(self):
+        """ Return the traffic rule queues. """
+
+        if self._traffic_rule_queues is None:
+            self._traffic_rule_queues = TrafficRuleQueueProp(self)
+
+        return self._traffic_rule_queues
+
+    @property
+    def downlinks(self):
+        """ Return the LVAPs using this block in the downlink. """
+
+        if self._downlinks is None:
+            self._downlinks = {}
+
+        return self._downlinks
+
+    @property
+    def uplinks(self):
+        """ Return the LVAPs using this block in the uplink. """
+
+        if self._uplinks is None:
+            self._uplinks = {}
+
+        return self._uplinks
+
+    @property
+    def vaps(self):
+        """ Return the VAPs hosted by this block. """
+
+        if self._vaps is None:
+            self._vaps = {}
+
+        return self._vaps
+
     @property
     def addr(self):
         """ Return the radio's address. """
@@ -184,8 +497,8 @@ class ResourceBlock:
     def supports(self, supports):
         """ Set the list of supported. """
 
-        for supported in supports:
-            self._supports.add(int(supported))
+        self._supports = \
+            intern_mcs(self._supports.union(int(x) for x in supports))
 
     @property
     def ht_supports(self):
@@ -197,8 +510,8 @@ class ResourceBlock:
     def ht_supports(self, ht_supports):
         """ Set the list of supported MCS (HT). """
 
-        for supported in ht_supports:
-            self._ht_supports.add(int(supported))
+        self._ht_supports = \
+            intern_mcs(self._ht_supports.union(int(x) for x in ht_supports))
 
     @property
     def hwaddr(self):
@@ -246,8 +559,9 @@ class ResourceBlock:
         """ Return a JSON-serializable dictionary representing the Resource
         Pool """
 
-        txps = {str(k): v for k, v in self.tx_policies.items()}
-        trqs = {"%s-%s" % k: v for k, v in self.traffic_rule_queues.items()}
+        txps = {str(k): v for k, v in (self._tx_policies or {}).items()}
+        trqs = {"%s-%s" % k: v
+                for k, v in (self._traffic_rule_queues or {}).items()}
 
         return {'addr': self.radio.addr,
                 'hwaddr': self.hwaddr,
@@ -257,9 +571,9 @@ class ResourceBlock:
                 'tx_policies': txps,
                 'band': BANDS[self.band],
                 'traffic_rule_queues': trqs,
-                'wifi_stats': self.wifi_stats,
-                'ucqm': {str(k): v for k, v in self.ucqm.items()},
-                'ncqm': {str(k): v for k, v in self.ncqm.items()}}
+                'wifi_stats': self._wifi_stats or {},
+                'ucqm': {str(k): v for k, v in (self._ucqm or {}).items()},
+                'ncqm': {str(k): v for k, v in (self._ncqm or {}).items()}}
 
     def __hash__(self):
 
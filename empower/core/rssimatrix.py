@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Station x block RSSI matrix.
+
+Each tenant keeps a dense matrix with the RSSI (moving average) of every
+station as reported by every block, one for the user channel quality maps
+(stations are LVAPs) and one for the network channel quality maps (stations
+are WTPs). The matrix is updated in place by the maps modules, reads are
+O(1), and the best blocks for a station are found with a single scan of the
+station row:
+
+    blocks = self.tenant.ucqm.best(lvap.addr, k=1, blocks=self.blocks())
+
+Each cell has a timestamp. Cells older than max_age are ignored by the
+queries and are periodically cleared, rows and columns with no valid cells
+left are reused by new stations and blocks.
+
+RSSI values are stored as signed bytes (as reported by the WTPs) and the
+timestamps as single precision offsets from the creation of the matrix, for
+a footprint of 5 bytes per cell.
+"""
+
+import time
+import heapq
+
+from array import array
+
+# cells not updated for this long (in s) are ignored and cleared
+DEFAULT_MAX_AGE = 60
+
+# how often stale cells are looked for (in s)
+EXPIRE_PERIOD = 30
+
+# RSSI of empty cells
+EMPTY = -128
+
+
+class RSSIMatrix:
+    """A station x block RSSI matrix.
+
+    Attributes:
+        max_age: cells older than this many seconds are ignored (0 means
+          never)
+        rows: dictionary mapping station addresses to row indexes
+        cols: dictionary mapping blocks ids to column indexes (blocks are
+          long lived objects, the matrix keeps a reference to each block with
+          a column so their ids cannot be reused)
+        stations: list mapping row indexes to station addresses
+        blocks: list mapping column indexes to blocks
+        rssi: one array of RSSI values for each row
+        updated: one array of timestamps (offsets from epoch) for each row
+        epoch: the time at which the matrix was created
+        expired: number of cells cleared because stale
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+
+        self.max_age = max_age
+        self.rows = {}
+        self.cols = {}
+        self.stations = []
+        self.blocks = []
+        self.rssi = []
+        self.updated = []
+        self.epoch = time.time()
+        self.expired = 0
+
+        self.__free_rows = []
+        self.__free_cols = []
+        self.__last_expire = self.epoch
+
+    def __add_row(self, station):
+        """Allocate a row for the station."""
+
+        if self.__free_rows:
+            row = self.__free_rows.pop()
+            self.stations[row] = station
+        else:
+            row = len(self.stations)
+            width = len(self.blocks)
+            self.stations.append(station)
+            self.rssi.append(array('b', [EMPTY]) * width)
+            self.updated.append(array('f', [0.0]) * width)
+
+        self.rows[station] = row
+
+        return row
+
+    def __add_col(self, block):
+        """Allocate a column for the block."""
+
+        if self.__free_cols:
+            col = self.__free_cols.pop()
+            self.blocks[col] = block
+        else:
+            col = len(self.blocks)
+            self.blocks.append(block)
+            for row in range(len(self.stations)):
+                self.rssi[row].append(EMPTY)
+                self.updated[row].append(0.0)
+
+        self.cols[id(block)] = col
+
+        return col
+
+    def __since(self, now=None):
+        """Return the oldest valid timestamp (as an offset from epoch)."""
+
+        if not self.max_age:
+            return -1.0
+
+        if now is None:
+            now = time.time()
+
+        return now - self.epoch - self.max_age
+
+    def update(self, station, block, rssi, timestamp=None):
+        """Set the RSSI of a station as reported by a block."""
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        row = self.rows.get(station)
+
+        if row is None:
+            self.expire()
+            row = self.__add_row(station)
+
+        col = self.cols.get(id(block))
+
+        if col is None:
+            col = self.__add_col(block)
+
+        self.rssi[row][col] = max(EMPTY + 1, min(127, int(rssi)))
+        self.updated[row][col] = timestamp - self.epoch
+
+    def clear(self, station, block):
+        """Clear the RSSI of a station as reported by a block."""
+
+        row = self.rows.get(station)
+        col = self.cols.get(id(block))
+
+        if row is None or col is None:
+            return
+
+        self.rssi[row][col] = EMPTY
+
+    def get(self, station, block, default=-float("inf")):
+        """Return the RSSI of a station as reported by a block."""
+
+        row = self.rows.get(station)
+        col = self.cols.get(id(block))
+
+        if row is None or col is None:
+            return default
+
+        value = self.rssi[row][col]
+
+        if value == EMPTY or self.updated[row][col] < self.__since():
+            return default
+
+        return value
+
+    def best(self, station, k=1, blocks=None):
+        """Return the k blocks with the highest RSSI for a station.
+
+        Args:
+            station, the station address
+            k, the number of blocks
+            blocks, only these blocks are considered (if specified). Blocks
+              without a valid RSSI rank last.
+
+        Returns:
+            a ResourcePool sorted by decreasing RSSI
+        """
+
+        from empower.core.resourcepool import ResourcePool
+
+        row = self.rows.get(station)
+        since = self.__since()
+
+        if blocks is not None:
+
+            if row is None:
+                return ResourcePool(list(blocks)[:k])
+
+            rssi = self.rssi[row]
+            updated = self.updated[row]
+            cols = self.cols
+
+            def key(block):
+                col = cols.get(id(block))
+                if col is None or rssi[col] == EMPTY or updated[col] < since:
+                    return EMPTY
+                return rssi[col]
+
+            return ResourcePool(heapq.nlargest(k, blocks, key=key))
+
+        if row is None:
+            return ResourcePool()
+
+        rssi = self.rssi[row]
+        updated = self.updated[row]
+
+        cols = heapq.nlargest(k, (col for col in range(len(rssi))
+                                  if rssi[col] != EMPTY and
+                                  updated[col] >= since),
+                              key=rssi.__getitem__)
+
+        return ResourcePool([self.blocks[col] for col in cols])
+
+    def remove_station(self, station):
+        """Remove a station."""
+
+        row = self.rows.pop(station, None)
+
+        if row is None:
+            return
+
+        self.rssi[row] = array('b', [EMPTY]) * len(self.blocks)
+        self.stations[row] = None
+        self.__free_rows.append(row)
+
+    def remove_block(self, block):
+        """Remove a block."""
+
+        col = self.cols.pop(id(block), None)
+
+        if col is None:
+            return
+
+        for row in self.rssi:
+            row[col] = EMPTY
+
+        self.blocks[col] = None
+        self.__free_cols.append(col)
+
+    def expire(self):
+        """Clear the stale cells and remove the stations and blocks without
+        valid cells. The matrix is scanned at most once every EXPIRE_PERIOD
+        seconds."""
+
+        now = time.time()
+
+        if not self.max_age or now - self.__last_expire < EXPIRE_PERIOD:
+            return
+
+        self.__last_expire = now
+
+        since = self.__since(now)
+        used_cols = set()
+
+        for station, row in list(self.rows.items()):
+
+            rssi = self.rssi[row]
+            updated = self.updated[row]
+            valid = False
+
+            for col, value in enumerate(rssi):
+                if value == EMPTY:
+                    continue
+                if updated[col] < since:
+                    rssi[col] = EMPTY
+                    self.expired += 1
+                else:
+                    valid = True
+                    used_cols.add(col)
+
+            if not valid:
+                self.remove_station(station)
+
+        for col in list(self.cols.values()):
+            if col not in used_cols:
+                self.remove_block(self.blocks[col])
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'max_age': self.max_age,
+                'stations': len(self.rows),
+                'blocks': len(self.cols),
+                'rows': len(self.stations),
+                'columns': len(self.blocks),
+                'expired': self.expired}
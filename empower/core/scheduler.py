@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER periodic timers scheduler.
+
+All the periodic activities of the controller (connection heartbeats,
+periodic modules, apps, and services) are driven by a single hierarchical
+timing wheel instead of one IOLoop timer each. The wheel advances in fixed
+ticks of TICK_MS milliseconds. Timers expiring within the next 256 ticks are
+kept in the first wheel, while timers further away are kept in the coarser
+wheels and cascaded down as time advances.
+
+Usage:
+
+    from empower.core.scheduler import get_scheduler
+
+    timer = get_scheduler().add_timer(self.loop, 5000)
+    ...
+    timer.cancel()
+"""
+
+import random
+import tornado.ioloop
+
+import empower.logger
+
+# wheel resolution in ms
+TICK_MS = 10
+
+# number of bits for each wheel (the first one is the finest)
+WHEEL_BITS = [8, 6, 6, 6]
+
+# default phase spreading, as a fraction of the timer period
+DEFAULT_JITTER = 1.0
+
+
+class Timer:
+    """A periodic timer.
+
+    Attributes:
+        callback: the method called when the timer fires
+        every: the timer period (in ms)
+        jitter: the phase spreading applied to the first expiration, as a
+          fraction of the period (0 means no spreading)
+        expires: the tick at which the timer will fire next
+        fired: number of times the timer has fired
+    """
+
+    def __init__(self, scheduler, callback, every, jitter):
+
+        self.scheduler = scheduler
+        self.callback = callback
+        self.every = every
+        self.jitter = jitter
+        self.expires = 0
+        self.fired = 0
+        self.slot = None
+
+    @property
+    def period(self):
+        """Return the timer period in ticks."""
+
+        return max(1, int(round(self.every / TICK_MS)))
+
+    @property
+    def active(self):
+        """Return True if the timer is scheduled."""
+
+        return self.slot is not None
+
+    def cancel(self):
+        """Stop the timer."""
+
+        self.scheduler.remove_timer(self)
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        callback = getattr(self.callback, '__qualname__',
+                           repr(self.callback))
+
+        return {'callback': callback,
+                'every': self.every,
+                'jitter': self.jitter,
+                'fired': self.fired}
+
+
+class Scheduler:
+    """Hierarchical timing wheel.
+
+    Attributes:
+        timers: number of active timers
+        fired: number of timer expirations
+        late_max: maximum lateness of a timer expiration (in ms)
+        late_total: accumulated lateness of timer expirations (in ms)
+        catchups: number of ticks processed to recover from IOLoop stalls
+          (a single late tick, e.g. because of the PeriodicCallback drift,
+          is not counted)
+    """
+
+    def __init__(self):
+
+        self.timers = 0
+        self.fired = 0
+        self.late_max = 0.0
+        self.late_total = 0.0
+        self.catchups = 0
+        self.log = empower.logger.get_logger()
+
+        self.__shifts = []
+        shift = 0
+        for bits in WHEEL_BITS:
+            self.__shifts.append(shift)
+            shift += bits
+
+        self.__wheels = [[set() for _ in range(1 << bits)]
+                         for bits in WHEEL_BITS]
+
+        self.__jiffies = 0
+        self.__start = None
+        self.__worker = None
+
+    def add_timer(self, callback, every, jitter=DEFAULT_JITTER):
+        """Add a new periodic timer.
+
+        Args:
+            callback: the method to be called when the timer fires
+            every: the period (in ms)
+            jitter: spread the first expiration uniformly over this
+              fraction of the period, so that timers created at the same
+              time do not all fire in the same tick
+
+        Returns:
+            a Timer object
+        """
+
+        if every <= 0:
+            raise ValueError("Invalid period %d" % every)
+
+        if jitter < 0 or jitter > 1:
+            raise ValueError("Invalid jitter %f" % jitter)
+
+        if not self.__worker:
+            self.__start_worker()
+
+        timer = Timer(self, callback, every, jitter)
+
+        delay = timer.period * (1 - jitter * random.random())
+        timer.expires = self.__jiffies + max(1, int(delay))
+
+        self.__insert(timer)
+        self.timers += 1
+
+        return timer
+
+    def remove_timer(self, timer):
+        """Remove a timer."""
+
+        if not timer.active:
+            return
+
+        timer.slot.discard(timer)
+        timer.slot = None
+        self.timers -= 1
+
+        if not self.timers:
+            self.__stop_worker()
+
+    def __start_worker(self):
+        """Start ticking."""
+
+        ioloop = tornado.ioloop.IOLoop.current()
+
+        self.__start = ioloop.time() - self.__jiffies * TICK_MS / 1000
+        self.__worker = \
+            tornado.ioloop.PeriodicCallback(self.__on_tick, TICK_MS)
+        self.__worker.start()
+
+    def __stop_worker(self):
+        """Stop ticking."""
+
+        self.__worker.stop()
+        self.__worker = None
+
+    def __insert(self, timer, cascade=False):
+        """Insert a timer in the suitable wheel."""
+
+        # never schedule a timer in a tick that has already been processed,
+        # cascading happens before the current tick is processed
+        first = self.__jiffies if cascade else self.__jiffies + 1
+
+        if timer.expires < first:
+            timer.expires = first
+
+        delta = timer.expires - self.__jiffies
+
+        for level, shift in enumerate(self.__shifts):
+
+            wheel = self.__wheels[level]
+            span = len(wheel) << shift
+
+            if delta < span or level == len(self.__shifts) - 1:
+                expires = timer.expires
+                # too far in the future, park it in the last wheel, it will
+                # be rescheduled when the wheel cascades
+                if delta >= span:
+                    expires = self.__jiffies + span - (1 << shift)
+                timer.slot = wheel[(expires >> shift) & (len(wheel) - 1)]
+                timer.slot.add(timer)
+                return
+
+    def __cascade(self, level):
+        """Move the timers of the current slot of a wheel to the lower
+        wheels. Return the index of the slot."""
+
+        wheel = self.__wheels[level]
+        index = (self.__jiffies >> self.__shifts[level]) & (len(wheel) - 1)
+
+        timers = wheel[index]
+        wheel[index] = set()
+
+        for timer in timers:
+            self.__insert(timer, cascade=True)
+
+        return index
+
+    def __on_tick(self):
+        """Process all the ticks elapsed since the last call."""
+
+        now = tornado.ioloop.IOLoop.current().time()
+        target = int((now - self.__start) * 1000 / TICK_MS)
+
+        if target - self.__jiffies > 1:
+            self.catchups += target - self.__jiffies - 1
+
+        while self.__jiffies <= target and self.__worker:
+            self.__run_tick(now, target)
+
+    def __run_tick(self, now, target):
+        """Process a single tick, target is the tick of the current time
+        (later than this tick if catching up after a stall)."""
+
+        wheel = self.__wheels[0]
+        index = self.__jiffies & (len(wheel) - 1)
+
+        if not index:
+            for level in range(1, len(self.__wheels)):
+                if self.__cascade(level):
+                    break
+
+        timers = wheel[index]
+        wheel[index] = set()
+
+        for timer in list(timers):
+
+            # timer cancelled by a previous callback
+            if timer.slot is not timers:
+                continue
+
+            timer.slot = None
+
+            scheduled = self.__start + timer.expires * TICK_MS / 1000
+            late = max(0.0, (now - scheduled) * 1000)
+
+            self.fired += 1
+            self.late_total += late
+            self.late_max = max(self.late_max, late)
+
+            # skip the expirations that have been missed, i.e. fire only
+            # once when catching up
+            timer.expires += timer.period
+            if timer.expires <= target:
+                missed = target - timer.expires
+                timer.expires += (missed // timer.period + 1) * timer.period
+
+            self.__insert(timer)
+            timer.fired += 1
+
+            try:
+                timer.callback()
+            except Exception as ex:
+                self.log.exception(ex)
+
+        self.__jiffies += 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        late_avg = self.late_total / self.fired if self.fired else 0.0
+
+        return {'tick': TICK_MS,
+                'timers': self.timers,
+                'fired': self.fired,
+                'late_max': self.late_max,
+                'late_avg': late_avg,
+                'catchups': self.catchups}
+
+
+SCHEDULER = None
+
+
+def get_scheduler():
+    """Return the controller scheduler."""
+
+    global SCHEDULER
+
+    if not SCHEDULER:
+        SCHEDULER = Scheduler()
+
+    return SCHEDULER
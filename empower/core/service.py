@@ -19,9 +19,9 @@
 
 import time
 import uuid
-import tornado.ioloop
 import empower.logger
 
+from empower.core.scheduler import get_scheduler
 from empower.main import RUNTIME
 
 DEFAULT_PERIOD = 5000
@@ -57,9 +57,7 @@ class Service:
         if self.every == -1:
             return
 
-        self.worker = \
-            tornado.ioloop.PeriodicCallback(self.loop, self.every)
-        self.worker.start()
+        self.worker = get_scheduler().add_timer(self.loop, self.every)
 
     def stop(self):
         """Stop control loop."""
@@ -67,7 +65,7 @@ class Service:
         if self.every == -1:
             return
 
-        self.worker.stop()
+        self.worker.cancel()
 
     def to_dict(self):
         """Return JSON-serializable representation of the object."""
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER remote callback sinks.
+
+Module callbacks can be delivered to remote sinks. Two sinks are supported:
+
+  XML-RPC: the callback is a list [url, method], the method of the XML-RPC
+    server at url is called with the JSON representation of the result.
+  Webhook: the callback is an http(s) url, the JSON representation of the
+    result is POSTed to url.
+
+There is a single sink for each url (and method) shared by all the modules
+using it. XML-RPC sinks keep a pool of proxies whose connections are kept
+alive across calls. Calls are executed by a pool of worker threads. Webhook
+sinks use Tornado's non-blocking HTTP client.
+
+At most max_concurrency calls can be in progress for each sink, further
+results are queued. The queue holds at most max_queue results, when it is
+full the drop policy of the sink is applied:
+
+  drop_oldest: the oldest queued result is dropped
+  drop_newest: the new result is dropped
+  coalesce: a new result replaces the queued result of the same module (if
+    any), otherwise the oldest queued result is dropped
+"""
+
+import abc
+import json
+import time
+import queue
+import itertools
+import xmlrpc.client
+
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from tornado.ioloop import IOLoop
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpclient import HTTPRequest
+
+import empower.logger
+
+from empower.core.jsonserializer import EmpowerEncoder
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_COALESCE = "coalesce"
+
+POLICIES = [POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_COALESCE]
+
+# defaults for new sinks
+DEFAULT_MAX_CONCURRENCY = 2
+DEFAULT_MAX_QUEUE = 100
+DEFAULT_POLICY = POLICY_DROP_OLDEST
+
+# webhook request timeout (in s)
+WEBHOOK_TIMEOUT = 5.0
+
+_WORKERS = ThreadPool(10)
+
+SINKS = {}
+
+_SINK_IDS = itertools.count(1)
+
+
+class Sink(metaclass=abc.ABCMeta):
+    """A remote callback sink.
+
+    Attributes:
+        sink_id: the sink id
+        max_concurrency: maximum number of calls in progress
+        max_queue: maximum number of queued results
+        policy: the drop policy applied when the queue is full
+        in_flight: number of calls in progress
+        calls: number of calls completed
+        errors: number of calls failed
+        drops: number of results dropped because the queue was full
+        coalesced: number of queued results replaced by a newer result of
+          the same module
+        max_depth: maximum number of queued results
+        latency_total: accumulated calls latency, including the time spent
+          in the queue (in s)
+        latency_max: maximum call latency (in s)
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_queue=DEFAULT_MAX_QUEUE, policy=DEFAULT_POLICY):
+
+        self.sink_id = next(_SINK_IDS)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.policy = policy
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.drops = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.log = empower.logger.get_logger()
+
+        self.__queue = OrderedDict()
+        self.__seq = itertools.count()
+
+    @property
+    def policy(self):
+        """Return the drop policy."""
+
+        return self.__policy
+
+    @policy.setter
+    def policy(self, policy):
+        """Set the drop policy."""
+
+        if policy not in POLICIES:
+            raise ValueError("Invalid policy %s" % policy)
+
+        self.__policy = policy
+
+    @property
+    def depth(self):
+        """Return the number of queued results."""
+
+        return len(self.__queue)
+
+    def send(self, serializable, key=None):
+        """Send a result to the sink.
+
+        Args:
+            serializable, an object implementing the to_dict() method
+            key, the key of the sender (e.g. the module), used by the
+              coalesce policy
+        """
+
+        if self.in_flight < self.max_concurrency and not self.__queue:
+            self.__dispatch(self.__serialize(serializable), time.time())
+            return
+
+        if self.policy == POLICY_COALESCE and key is not None and \
+           key in self.__queue:
+            self.__queue[key] = (self.__serialize(serializable), time.time())
+            self.coalesced += 1
+            return
+
+        if len(self.__queue) >= self.max_queue:
+
+            self.drops += 1
+
+            if self.policy == POLICY_DROP_NEWEST or not self.__queue:
+                return
+
+            self.__queue.popitem(last=False)
+
+        if self.policy != POLICY_COALESCE or key is None:
+            key = next(self.__seq)
+
+        self.__queue[key] = (self.__serialize(serializable), time.time())
+        self.max_depth = max(self.max_depth, len(self.__queue))
+
+    @staticmethod
+    def __serialize(serializable):
+        """Return the JSON representation of the result."""
+
+        return json.dumps(serializable.to_dict(), cls=EmpowerEncoder)
+
+    def __dispatch(self, payload, queued):
+        """Start a call."""
+
+        self.in_flight += 1
+
+        try:
+            self.deliver(payload, queued)
+        except Exception as ex:
+            self.done(queued, ex)
+
+    @abc.abstractmethod
+    def deliver(self, payload, started):
+        """Deliver a JSON payload. Must call done() when complete."""
+
+    def done(self, started, error=None):
+        """Record the completion of a call and start the next one."""
+
+        latency = time.time() - started
+
+        self.in_flight -= 1
+        self.calls += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+        if error:
+            self.errors += 1
+            self.log.error("Callback to %s failed: %s", self, error)
+
+        while self.__queue and self.in_flight < self.max_concurrency:
+            _, (payload, queued) = self.__queue.popitem(last=False)
+            self.__dispatch(payload, queued)
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        latency_avg = self.latency_total / self.calls if self.calls else 0.0
+
+        return {'sink_id': self.sink_id,
+                'sink': str(self),
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'policy': self.policy,
+                'in_flight': self.in_flight,
+                'depth': self.depth,
+                'max_depth': self.max_depth,
+                'calls': self.calls,
+                'errors': self.errors,
+                'drops': self.drops,
+                'coalesced': self.coalesced,
+                'latency_avg': latency_avg,
+                'latency_max': self.latency_max}
+
+
+class XMLRPCSink(Sink):
+    """XML-RPC sink.
+
+    Attributes:
+        url: the XML-RPC server url
+        method: the method to be called
+    """
+
+    def __init__(self, url, method):
+
+        super().__init__()
+
+        self.url = url
+        self.method = method
+        self.__proxies = queue.LifoQueue()
+        self.__ioloop = IOLoop.instance()
+
+    def deliver(self, payload, started):
+        """Deliver a JSON payload."""
+
+        def _callback(_):
+            self.__ioloop.add_callback(self.done, started)
+
+        def _error_callback(error):
+            self.__ioloop.add_callback(self.done, started, error)
+
+        _WORKERS.apply_async(self.__call, (payload, ), {}, _callback,
+                             _error_callback)
+
+    def __call(self, payload):
+        """Perform the call (in a worker thread)."""
+
+        try:
+            proxy = self.__proxies.get_nowait()
+        except queue.Empty:
+            proxy = xmlrpc.client.ServerProxy(self.url)
+
+        result = getattr(proxy, self.method)(payload)
+
+        # the proxy is reused only if the call succeeded
+        self.__proxies.put(proxy)
+
+        return result
+
+    def __str__(self):
+        return "xmlrpc %s %s" % (self.url, self.method)
+
+
+class WebhookSink(Sink):
+    """HTTP webhook sink.
+
+    Attributes:
+        url: the webhook url
+    """
+
+    def __init__(self, url):
+
+        super().__init__()
+
+        self.url = url
+
+    def deliver(self, payload, started):
+        """Deliver a JSON payload."""
+
+        request = HTTPRequest(self.url,
+                              method="POST",
+                              headers={'Content-type': 'application/json'},
+                              body=payload,
+                              connect_timeout=WEBHOOK_TIMEOUT,
+                              request_timeout=WEBHOOK_TIMEOUT)
+
+        future = AsyncHTTPClient().fetch(request, raise_error=False)
+
+        def _callback(future):
+            self.done(started, future.result().error)
+
+        future.add_done_callback(_callback)
+
+    def __str__(self):
+        return "webhook %s" % self.url
+
+
+def is_webhook(callback):
+    """Return True if the callback is a webhook url."""
+
+    return isinstance(callback, str) and \
+        callback.startswith(("http://", "https://"))
+
+
+def get_sink(callback):
+    """Return the sink for the specified remote callback."""
+
+    if is_webhook(callback):
+        key = (callback, )
+    else:
+        key = tuple(callback)
+
+    if key not in SINKS:
+        if len(key) == 1:
+            SINKS[key] = WebhookSink(callback)
+        else:
+            SINKS[key] = XMLRPCSink(key[0], key[1])
+
+    return SINKS[key]
+
+
+def get_sinks():
+    """Return all the sinks."""
+
+    return list(SINKS.values())
+
+
+def get_sink_by_id(sink_id):
+    """Return the sink with the specified id."""
+
+    for sink in SINKS.values():
+        if sink.sink_id == sink_id:
+            return sink
+
+    raise KeyError(sink_id)
@@ -23,6 +23,7 @@ from empower.datatypes.etheraddress import EtherAddress
 from empower.core.utils import ofmatch_d2s
 from empower.core.utils import ofmatch_s2d
 from empower.core.trafficrulequeue import TrafficRuleQueue
+from empower.core.rssimatrix import RSSIMatrix
 
 T_TYPE_SHARED = "shared"
 T_TYPE_UNIQUE = "unique"
@@ -94,7 +95,7 @@ class TrafficRuleProp(dict):
         # remove traffic rules
         if key in self.__uuids__:
             for uuid in self.__uuids__[key]:
-                intent_server.remove_rule(uuid)
+                intent_server.remove_traffic_rule(uuid)
             del self.__uuids__[key]
 
         # remove old entry
@@ -169,6 +170,10 @@ class Tenant:
         bssid_type: shared (VAP) or unique (LVAP)
         traffic_rules: dictionary mapping dscp values to traffic rules. 0 is
             the default traffic rule created when the WTP connects.
+        ucqm: the station x block RSSI matrix of the user channel quality
+            maps polled by this tenant
+        ncqm: the station x block RSSI matrix of the network channel quality
+            maps polled by this tenant
     """
 
     TO_DICT = ['tenant_id',
@@ -204,6 +209,8 @@ class Tenant:
         self.vaps = {}
         self.components = {}
         self.traffic_rules = TrafficRuleProp(self)
+        self.ucqm = RSSIMatrix()
+        self.ncqm = RSSIMatrix()
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the Poll """
@@ -276,6 +283,9 @@ class Tenant:
 
         pnfdevs[pnfdev.addr] = pnfdev
 
+        from empower.main import RUNTIME
+        RUNTIME.add_tenant_pnfdev(self, pnfdev)
+
         belongs = TblBelongs(tenant_id=self.tenant_id, addr=pnfdev.addr)
 
         session = Session()
@@ -301,6 +311,9 @@ class Tenant:
 
         del pnfdevs[pnfdev.addr]
 
+        from empower.main import RUNTIME
+        RUNTIME.remove_tenant_pnfdev(self, pnfdev)
+
         belongs = Session().query(TblBelongs) \
                            .filter(TblBelongs.tenant_id == self.tenant_id,
                                    TblBelongs.addr == pnfdev.addr) \
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Time-series store for the statistics modules.
+
+Statistics modules record their samples in a shared store where each time
+series is identified by a (module, entity, metric) key, for example:
+
+    ("bin_counter", "00:18:DE:CC:D3:40", "tx_bytes[8192]")
+
+Each time series is a fixed-capacity ring buffer backed by two arrays (the
+timestamps and the values), once full the oldest sample is overwritten.
+Recording a sample does not allocate memory. Apps can query the recent
+samples, rates, and aggregates of a time series:
+
+    from empower.core.timeseries import get_timeseries
+
+    series = get_timeseries().get("bin_counter", lvap.addr, "tx_bytes[8192]")
+    rate = series.rate(window=10)
+
+Modules recording many samples per response fetch their time series once
+(see Module.series()) and append to them directly, so that no key or metric
+name has to be built for each sample.
+
+Time series not updated for a while (e.g. because the LVAP left) are removed
+from the store.
+"""
+
+import time
+
+from array import array
+
+# default number of samples kept for each time series
+DEFAULT_CAPACITY = 120
+
+# time series not updated for this long (in s) are removed
+DEFAULT_IDLE = 600
+
+# how often idle time series are looked for (in s)
+EXPIRE_PERIOD = 60
+
+STORE = None
+
+
+class TimeSeries:
+    """A fixed-capacity time series.
+
+    Attributes:
+        capacity: the maximum number of samples
+        timestamps: the samples timestamps (ring buffer)
+        values: the samples values (ring buffer)
+        head: the position of the next sample
+        count: the number of samples
+    """
+
+    __slots__ = ('capacity', 'timestamps', 'values', 'head', 'count')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+
+        if capacity < 1:
+            raise ValueError("Invalid capacity %d" % capacity)
+
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0] * capacity)
+        self.values = array('d', [0.0] * capacity)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value, timestamp=None):
+        """Add a sample, overwriting the oldest one if full."""
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = value
+
+        self.head = (self.head + 1) % self.capacity
+
+        if self.count < self.capacity:
+            self.count += 1
+
+    def last(self):
+        """Return the most recent sample as a (timestamp, value) tuple."""
+
+        if not self.count:
+            return None
+
+        index = (self.head - 1) % self.capacity
+
+        return (self.timestamps[index], self.values[index])
+
+    def __indexes(self, window=None):
+        """Return the positions of the samples in the window (in s) ending
+        with the most recent sample, oldest first."""
+
+        start = (self.head - self.count) % self.capacity
+        indexes = [(start + i) % self.capacity for i in range(self.count)]
+
+        if window is None or not indexes:
+            return indexes
+
+        since = self.timestamps[indexes[-1]] - window
+
+        for position, index in enumerate(indexes):
+            if self.timestamps[index] >= since:
+                return indexes[position:]
+
+        return []
+
+    def samples(self, window=None):
+        """Return the samples as a list of [timestamp, value], oldest first.
+
+        Args:
+            window, only the samples taken in the last window seconds
+        """
+
+        return [[self.timestamps[i], self.values[i]]
+                for i in self.__indexes(window)]
+
+    def rate(self, window=None):
+        """Return the rate of change per second of a counter.
+
+        Args:
+            window, only the samples taken in the last window seconds
+        """
+
+        indexes = self.__indexes(window)
+
+        if len(indexes) < 2:
+            return 0.0
+
+        first, last = indexes[0], indexes[-1]
+        delta = self.timestamps[last] - self.timestamps[first]
+
+        if delta <= 0:
+            return 0.0
+
+        return (self.values[last] - self.values[first]) / delta
+
+    def aggregate(self, window=None):
+        """Return the minimum, maximum, and average value.
+
+        Args:
+            window, only the samples taken in the last window seconds
+        """
+
+        indexes = self.__indexes(window)
+
+        if not indexes:
+            return {'count': 0, 'min': None, 'max': None, 'avg': None}
+
+        values = [self.values[i] for i in indexes]
+
+        return {'count': len(values),
+                'min': min(values),
+                'max': max(values),
+                'avg': sum(values) / len(values)}
+
+    def to_dict(self, window=None):
+        """Return JSON-serializable representation of the object."""
+
+        return {'capacity': self.capacity,
+                'last': self.last(),
+                'rate': self.rate(window),
+                'aggregate': self.aggregate(window),
+                'samples': self.samples(window)}
+
+
+class TimeSeriesStore:
+    """The time series of all the statistics modules.
+
+    Attributes:
+        capacity: the number of samples of new time series
+        idle: time series not updated for this many seconds are removed (0
+          means never)
+        series: dict mapping (module, entity, metric) keys to time series
+        expired: number of time series removed because idle
+        generation: incremented whenever time series are removed (time series
+          cached by the modules must then be fetched again)
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, idle=DEFAULT_IDLE):
+
+        self.capacity = capacity
+        self.idle = idle
+        self.series = {}
+        self.expired = 0
+        self.generation = 0
+
+        self.__last_expire = time.time()
+
+    def get(self, module, entity, metric):
+        """Return a time series, creating it if needed."""
+
+        key = (module, str(entity), metric)
+
+        if key not in self.series:
+            self.expire()
+            self.series[key] = TimeSeries(self.capacity)
+
+        return self.series[key]
+
+    def get_many(self, module, entity, metrics):
+        """Return a list with the time series of the specified metrics of an
+        entity, creating them if needed."""
+
+        entity = str(entity)
+        keys = [(module, entity, metric) for metric in metrics]
+
+        # expire before creating, new time series are still empty
+        if any(key not in self.series for key in keys):
+            self.expire()
+
+        out = []
+
+        for key in keys:
+            if key not in self.series:
+                self.series[key] = TimeSeries(self.capacity)
+            out.append(self.series[key])
+
+        return out
+
+    def append(self, module, entity, metric, value, timestamp=None):
+        """Add a sample to a time series."""
+
+        self.get(module, entity, metric).append(value, timestamp)
+
+    def query(self, module=None, entity=None, metric=None):
+        """Return the time series matching the specified module, entity,
+        and metric (None matches everything)."""
+
+        if entity is not None:
+            entity = str(entity)
+
+        return {key: series for key, series in self.series.items()
+                if (module is None or key[0] == module) and
+                (entity is None or key[1] == entity) and
+                (metric is None or key[2] == metric)}
+
+    def remove(self, module=None, entity=None, metric=None):
+        """Remove the time series matching the specified module, entity,
+        and metric."""
+
+        for key in self.query(module, entity, metric):
+            del self.series[key]
+            self.generation += 1
+
+    def expire(self):
+        """Remove the time series not updated in the last idle seconds. The
+        store is scanned at most once every EXPIRE_PERIOD seconds."""
+
+        now = time.time()
+
+        if not self.idle or now - self.__last_expire < EXPIRE_PERIOD:
+            return
+
+        self.__last_expire = now
+
+        for key in list(self.series):
+            last = self.series[key].last()
+            if not last or now - last[0] > self.idle:
+                del self.series[key]
+                self.expired += 1
+                self.generation += 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'capacity': self.capacity,
+                'idle': self.idle,
+                'series': len(self.series),
+                'expired': self.expired}
+
+
+def get_timeseries():
+    """Return the time series store."""
+
+    global STORE
+
+    if not STORE:
+        STORE = TimeSeriesStore()
+
+    return STORE
@@ -36,6 +36,9 @@ class TrafficRuleQueue(object):
           be aggregated in A-MSDUs according to 802.11n settings
         quantum: the quantum to be assigned to this queue at each round
     """
+
+    __slots__ = ('ssid', 'dscp', 'block', '_quantum', '_amsdu_aggregation')
+
     def __init__(self, ssid, dscp, block):
 
         self.ssid = ssid
@@ -52,6 +55,12 @@ class TrafficRuleQueue(object):
                 'amsdu_aggregation': self.amsdu_aggregation,
                 'quantum': self.quantum}
 
+    def __commit(self):
+        """Store the queue in its block and send it to the WTP."""
+
+        self.block.traffic_rule_queues[(self.ssid, self.dscp)] = self
+        self.block.radio.connection.send_set_traffic_rule(self)
+
     def __repr__(self):
 
         return "%s-%s quantum %u amsdu_aggreagation %s" % \
@@ -69,7 +78,7 @@ class TrafficRuleQueue(object):
 
         self._amsdu_aggregation = bool(amsdu_aggregation)
 
-        self.block.radio.connection.send_set_traffic_rule(self)
+        self.__commit()
 
     @property
     def quantum(self):
@@ -83,4 +92,4 @@ class TrafficRuleQueue(object):
 
         self._quantum = int(quantum)
 
-        self.block.radio.connection.send_set_traffic_rule(self)
+        self.__commit()
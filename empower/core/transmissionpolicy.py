@@ -17,6 +17,10 @@
 
 """EmPOWER transmission policy class."""
 
+from contextlib import contextmanager
+
+from tornado.ioloop import IOLoop
+
 TX_MCAST_LEGACY = 0x0
 TX_MCAST_DMS = 0x1
 TX_MCAST_UR = 0x2
@@ -33,6 +37,21 @@ REVERSE_TX_MCAST = {TX_MCAST_LEGACY_H: TX_MCAST_LEGACY,
                     TX_MCAST_DMS_H: TX_MCAST_DMS,
                     TX_MCAST_UR_H: TX_MCAST_UR}
 
+# sets of MCS, shared by all the blocks and policies using the same MCS
+MCS_SETS = {}
+
+
+def intern_mcs(mcs):
+    """Return the shared (frozen) set of MCS equal to mcs."""
+
+    mcs = frozenset(mcs)
+
+    return MCS_SETS.setdefault(mcs, mcs)
+
+
+# the fields that can be changed with TxPolicy.update()
+TX_POLICY_FIELDS = ('no_ack', 'rts_cts', 'mcast', 'mcs', 'ht_mcs', 'ur_count')
+
 
 class TxPolicy:
     """Transmission policy.
@@ -51,8 +70,34 @@ class TxPolicy:
           reported by the device, that is if the device is an 11a
           device it will report [6, 12, 18, 36, 54]. If the device is
           an 11n device it will report [0, 1, 2, 3, 4, 5, 6, 7]
+
+    Each change to the policy sends a SET_PORT message to the WTP. Several
+    changes can be grouped in a single message using either update() or a
+    batch:
+
+      lvap.txp.update(mcast=TX_MCAST_LEGACY, ht_mcs=[7])
+
+      with lvap.txp.batch() as txp:
+          txp.mcast = TX_MCAST_LEGACY
+          txp.ht_mcs = [7]
+
+    If coalesce is True the SET_PORT messages are not sent immediately but
+    at the next IOLoop iteration, i.e. at most one message is sent for each
+    policy at each IOLoop iteration regardless of the number of changes.
     """
 
+    __slots__ = ('addr', 'block', '_no_ack', '_rts_cts', '_mcast', '_mcs',
+                 '_ht_mcs', '_ur_count', '_batch', '_dirty')
+
+    # coalesce the changes made within the same IOLoop iteration
+    coalesce = False
+
+    # policies to be sent at the next IOLoop iteration
+    __pending = {}
+
+    # deferred policies not sent because the WTP was disconnected
+    dropped = 0
+
     def __init__(self, addr, block):
 
         self.addr = addr
@@ -63,6 +108,8 @@ class TxPolicy:
         self._mcs = block.supports
         self._ht_mcs = block.ht_supports
         self._ur_count = 3
+        self._batch = 0
+        self._dirty = False
 
     def to_dict(self):
         """Return a json-frinedly representation of the object."""
@@ -74,6 +121,91 @@ class TxPolicy:
                 'ht_mcs': sorted(self.ht_mcs),
                 'ur_count': self.ur_count}
 
+    def __commit(self):
+        """Store the policy in its block and send it to the WTP (or defer
+        the message if coalescing is enabled). Within a batch the policy is
+        only marked as changed, it is stored and sent when the batch exits
+        without errors."""
+
+        if self._batch:
+            self._dirty = True
+            return
+
+        self.block.tx_policies[self.addr] = self
+
+        if TxPolicy.coalesce:
+            if not TxPolicy.__pending:
+                IOLoop.current().add_callback(TxPolicy.__flush)
+            TxPolicy.__pending[self] = None
+            return
+
+        self.block.radio.connection.send_set_port(self)
+
+    @staticmethod
+    def __flush():
+        """Send the policies changed in the last IOLoop iteration."""
+
+        pending = TxPolicy.__pending
+        TxPolicy.__pending = {}
+
+        for txp in pending:
+
+            connection = txp.block.radio.connection
+
+            # the WTP disconnected in the meanwhile
+            if not connection or connection.stream.closed():
+                TxPolicy.dropped += 1
+                continue
+
+            connection.send_set_port(txp)
+
+    @contextmanager
+    def batch(self):
+        """Group the changes made in the block in a single SET_PORT message.
+
+        The message is sent when the outermost batch exits. If an exception
+        is raised within the batch the policy is restored to its state
+        before the batch and no message is sent.
+        """
+
+        if not self._batch:
+            saved = (self._no_ack, self._rts_cts, self._mcast, self._mcs,
+                     self._ht_mcs, self._ur_count)
+
+        self._batch += 1
+
+        try:
+            yield self
+        except Exception:
+            self._batch -= 1
+            if not self._batch:
+                self._dirty = False
+                (self._no_ack, self._rts_cts, self._mcast, self._mcs,
+                 self._ht_mcs, self._ur_count) = saved
+            raise
+
+        self._batch -= 1
+
+        if not self._batch and self._dirty:
+            self._dirty = False
+            self.__commit()
+
+    def update(self, **fields):
+        """Change several fields with a single SET_PORT message.
+
+        Example:
+
+          txp.update(mcast=TX_MCAST_LEGACY, mcs=[6, 12])
+        """
+
+        for name in fields:
+            if name not in TX_POLICY_FIELDS:
+                raise KeyError("Invalid field %s" % name)
+
+        with self.batch():
+            for name, value in fields.items():
+                setattr(self, name, value)
+
     def __repr__(self):
 
         mcs = ", ".join([str(x) for x in self.mcs])
@@ -96,7 +228,7 @@ class TxPolicy:
 
         self._ur_count = int(ur_count)
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
 
     @property
     def mcast(self):
@@ -110,7 +242,7 @@ class TxPolicy:
 
         self._mcast = mcast if mcast in TX_MCAST else TX_MCAST_LEGACY
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
 
     @property
     def mcs(self):
@@ -122,12 +254,12 @@ class TxPolicy:
     def mcs(self, mcs):
         """ Set the list of MCS. """
 
-        self._mcs = self.block.supports & set(mcs)
+        self._mcs = intern_mcs(self.block.supports & set(mcs))
 
         if not self._mcs:
             self._mcs = self.block.supports
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
 
     @property
     def ht_mcs(self):
@@ -139,12 +271,12 @@ class TxPolicy:
     def ht_mcs(self, ht_mcs):
         """ Set the list of MCS. """
 
-        self._ht_mcs = self.block.ht_supports & set(ht_mcs)
+        self._ht_mcs = intern_mcs(self.block.ht_supports & set(ht_mcs))
 
         if not self._ht_mcs:
             self._ht_mcs = self.block.ht_supports
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
 
     @property
     def no_ack(self):
@@ -158,7 +290,7 @@ class TxPolicy:
 
         self._no_ack = True if no_ack else False
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
 
     @property
     def rts_cts(self):
@@ -172,4 +304,4 @@ class TxPolicy:
 
         self._rts_cts = int(rts_cts)
 
-        self.block.radio.connection.send_set_port(self)
+        self.__commit()
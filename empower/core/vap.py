@@ -39,6 +39,9 @@ class VAP:
         self.wtp = wtp
         self._tenant = tenant
 
+        # add vap to the block index
+        block.vaps[net_bssid] = self
+
     @property
     def ssid(self):
         """ Get the SSID assigned to this LVAP. """
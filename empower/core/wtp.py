@@ -33,7 +33,8 @@ class WTP(BasePNFDev):
         seq: Next sequence number (int)
         every: update period (in ms)
         ports: OVS ports
-        supports: set of resource blocks supported by the WTP
+        supports: set of resource blocks supported by the WTP, blocks are
+          also indexed by (hwaddr, channel, band) for fast lookups
     """
 
     ALIAS = "wtps"
@@ -41,7 +42,58 @@ class WTP(BasePNFDev):
 
     def __init__(self, addr, label):
         super().__init__(addr, label)
-        self.supports = set()
+        self.__supports = set()
+        self.__blocks = {}
+
+    @property
+    def supports(self):
+        """Return the set of resource blocks supported by the WTP."""
+
+        return self.__supports
+
+    @supports.setter
+    def supports(self, blocks):
+        """Set the resource blocks supported by the WTP."""
+
+        self.__supports = set()
+        self.__blocks = {}
+
+        for block in blocks:
+            self.add_block(block)
+
+    def add_block(self, block):
+        """Add a new resource block to the WTP."""
+
+        self.__supports.add(block)
+        self.__blocks[(block.hwaddr, block.channel, block.band)] = block
+
+    def block_for(self, hwaddr, channel, band):
+        """Return the resource block matching the specified hwaddr, channel,
+        and band. Return None if no block is found."""
+
+        return self.__blocks.get((hwaddr, channel, band))
+
+    def hosted_lvaps(self):
+        """Return the list of LVAPs having at least one block (downlink or
+        uplink) on this WTP."""
+
+        lvaps = {}
+
+        for block in self.__supports:
+            lvaps.update(block.downlinks)
+            lvaps.update(block.uplinks)
+
+        return list(lvaps.values())
+
+    def hosted_vaps(self):
+        """Return the list of VAPs hosted by this WTP."""
+
+        vaps = []
+
+        for block in self.__supports:
+            vaps.extend(block.vaps.values())
+
+        return vaps
 
     def to_dict(self):
         """Return a JSON-serializable dictionary representing the CPP."""
@@ -17,50 +17,88 @@
 
 """EmPOWER EtherAddress Class."""
 
+import weakref
+
 
 class EtherAddress:
-    """An Ethernet (MAC) address type."""
+    """An Ethernet (MAC) address type.
+
+    Addresses are immutable and interned: creating an EtherAddress for a MAC
+    address that is already in use returns the existing object. Each object
+    keeps the raw bytes, the integer value, the hash, and the canonical
+    string representation of the address so that none of them has to be
+    computed again.
+    """
+
+    __slots__ = ('_value', '_int', '_hash', '_str', '__weakref__')
 
-    def __init__(self, addr):
+    __INTERNED = weakref.WeakValueDictionary()
+
+    def __new__(cls, addr=None):
         """
         Understands Ethernet address is various forms. Hex strings, raw bytes
-        strings, etc.
+        strings, 48-bit integers, etc.
         """
+
+        # addresses are immutable, no need to create a new object
+        if type(addr) is EtherAddress:
+            return addr
+
         # Always stores as a 6 character string
         if isinstance(addr, bytes) and len(addr) == 6:
             # raw
-            self._value = addr
+            value = bytes(addr)
         elif isinstance(addr, str):
-            if len(addr) == 17 or addr.count(':') == 5:
-                # hex
-                if len(addr) == 17:
-                    if addr[2::3] != ':::::' and addr[2::3] != '-----':
-                        raise RuntimeError("Bad format for ethernet address")
-                    # Address of form xx:xx:xx:xx:xx:xx
-                    # Pick out the hex digits only
-                    addr = ''.join(
-                        (addr[x * 3:x * 3 + 2] for x in range(0, 6)))
-                else:
-                    # Assume it's hex digits but they may not all be in
-                    # two-digit groupings (e.g., xx:x:x:xx:x:x). This actually
-                    # comes up.
-                    addr = ''.join(["%02x" % (int(x, 16),)
-                                    for x in addr.split(":")])
-
-                # We should now have 12 hex digits (xxxxxxxxxxxx).
-                # Convert to 6 raw bytes.
-                addr = b''.join(bytes((int(addr[x * 2:x * 2 + 2], 16),))
-                                for x in range(0, 6))
-            else:
-                raise ValueError("Expected 6 raw bytes or some hex")
-            self._value = addr
+            value = cls.__parse(addr)
         elif isinstance(addr, EtherAddress):
-            self._value = addr.to_raw()
+            value = addr.to_raw()
+        elif isinstance(addr, int) and not isinstance(addr, bool):
+            if not 0 <= addr < 1 << 48:
+                raise ValueError("EtherAddress must be a 48-bit integer")
+            value = addr.to_bytes(6, 'big')
         elif addr is None:
-            self._value = b'\x00' * 6
+            value = b'\x00' * 6
         else:
             raise ValueError("EtherAddress must be a string of 6 raw bytes")
 
+        if cls is EtherAddress:
+            interned = cls.__INTERNED.get(value)
+            if interned is not None:
+                return interned
+
+        self = object.__new__(cls)
+
+        object.__setattr__(self, '_value', value)
+        object.__setattr__(self, '_int', int.from_bytes(value, 'big'))
+        object.__setattr__(self, '_hash', hash(value))
+        object.__setattr__(self, '_str', None)
+
+        if cls is EtherAddress:
+            cls.__INTERNED[value] = self
+
+        return self
+
+    @classmethod
+    def __parse(cls, addr):
+        """Convert a string to 6 raw bytes."""
+
+        if len(addr) == 17 or addr.count(':') == 5:
+            # hex
+            if len(addr) == 17:
+                if addr[2::3] != ':::::' and addr[2::3] != '-----':
+                    raise RuntimeError("Bad format for ethernet address")
+                # Address of form xx:xx:xx:xx:xx:xx
+                # Pick out the hex digits only
+                return bytes.fromhex(''.join(
+                    (addr[x * 3:x * 3 + 2] for x in range(0, 6))))
+
+            # Assume it's hex digits but they may not all be in
+            # two-digit groupings (e.g., xx:x:x:xx:x:x). This actually
+            # comes up.
+            return bytes((int(x, 16) for x in addr.split(":")))
+
+        raise ValueError("Expected 6 raw bytes or some hex")
+
     def is_global(self):
         """
         Returns True if this is a globally unique (OUI enforced) address.
@@ -97,14 +135,20 @@ class EtherAddress:
         Returns the address as string consisting of 12 hex chars separated
         by separator.
         """
-        return separator.join(('%02x' % (x,) for x in self._value)).upper()
+        if separator != ':':
+            return separator.join(('%02X' % (x,) for x in self._value))
+
+        if self._str is None:
+            object.__setattr__(self, '_str', ':'.join(
+                ('%02X' % (x,) for x in self._value)))
+
+        return self._str
 
     def to_int(self, separator=':'):
         """
-        Returns the address as string consisting of 12 hex chars separated
-        by separator.
+        Returns the address as an integer.
         """
-        return int(self.to_str().replace(":", ""), 16)
+        return self._int
 
     def match(self, other):
         """ Bitwise match. """
@@ -126,8 +170,10 @@ class EtherAddress:
         return self.to_str()
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if type(other) == EtherAddress:
-            other = other.to_raw()
+            return self._int == other._int
         elif type(other) == bytes:
             pass
         else:
@@ -140,15 +186,19 @@ class EtherAddress:
         return False
 
     def __hash__(self):
-        return self._value.__hash__()
+        return self._hash
 
     def __repr__(self):
         return self.__class__.__name__ + "('" + self.to_str() + "')"
 
     def __setattr__(self, a, v):
-        if hasattr(self, '_value'):
-            raise TypeError("This object is immutable")
-        object.__setattr__(self, a, v)
+        raise TypeError("This object is immutable")
+
+    def __delattr__(self, a):
+        raise TypeError("This object is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (self._value,))
 
     @classmethod
     def bcast(cls):
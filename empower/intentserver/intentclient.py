@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Non-blocking client for the intent interface of the SDN controller.
+
+Requests are issued with Tornado's AsyncHTTPClient and never block the
+IOLoop. At most max_clients requests are in flight at any time, further
+requests are queued by the HTTP client.
+
+The connections to the SDN controller are kept alive between requests.
+pycurl is an optional dependency: if it is available the curl based client is
+used, otherwise the pooled client (see pooledclient.py).
+"""
+
+import json
+import time
+
+from tornado import gen
+from tornado.httpclient import HTTPRequest
+
+from empower.core.jsonserializer import EmpowerEncoder
+from empower.intentserver.pooledclient import PooledHTTPClient
+
+import empower.logger
+
+try:
+    import pycurl  # pylint: disable=unused-import
+    from tornado.curl_httpclient import CurlAsyncHTTPClient
+except ImportError:
+    CurlAsyncHTTPClient = None
+
+# maximum number of concurrent requests
+DEFAULT_MAX_CLIENTS = 10
+
+# request timeout (in s)
+DEFAULT_TIMEOUT = 5.0
+
+
+class IntentClient:
+    """Intent client.
+
+    Attributes:
+        host: the intent interface address
+        port: the intent interface port
+        max_clients: maximum number of concurrent requests
+        timeout: connect and request timeout (in s)
+        requests: number of requests completed
+        failures: number of requests failed (connection errors, timeouts,
+          and error responses)
+        in_flight: number of requests currently in flight or queued
+        max_in_flight: maximum value of in_flight
+        latency_total: accumulated requests latency (in s)
+    """
+
+    def __init__(self, host, port, max_clients=DEFAULT_MAX_CLIENTS,
+                 timeout=DEFAULT_TIMEOUT):
+
+        self.host = host
+        self.port = port
+        self.max_clients = max_clients
+        self.timeout = timeout
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_total = 0.0
+        self.log = empower.logger.get_logger()
+
+        if CurlAsyncHTTPClient:
+            self.http_client = CurlAsyncHTTPClient(force_instance=True,
+                                                   max_clients=max_clients)
+        else:
+            self.http_client = PooledHTTPClient(max_clients=max_clients)
+
+    @gen.coroutine
+    def request(self, method, url, body=None):
+        """Send a request to the intent interface.
+
+        Returns a future resolving to a (status, reason, location, body)
+        tuple. Connection errors and timeouts are reported with status 599.
+        """
+
+        headers = {}
+
+        if body is not None:
+            body = json.dumps(body, indent=4, cls=EmpowerEncoder)
+            headers = {
+                'Content-type': 'application/json',
+                'Accept': 'application/json',
+            }
+            self.log.info("Intent %s %s:\n%s", method, url, body)
+        else:
+            self.log.info("Intent %s %s", method, url)
+
+        # tornado requires a body for POST and PUT
+        if body is None and method in ("POST", "PUT"):
+            body = ""
+
+        request = HTTPRequest("http://%s:%u%s" % (self.host, self.port, url),
+                              method=method,
+                              headers=headers,
+                              body=body,
+                              connect_timeout=self.timeout,
+                              request_timeout=self.timeout)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        started = time.time()
+
+        try:
+            response = yield self.http_client.fetch(request, raise_error=False)
+        finally:
+            self.in_flight -= 1
+
+        self.requests += 1
+        self.latency_total += time.time() - started
+
+        if response.error and response.code == 599:
+            self.failures += 1
+            self.log.warning("Intent %s %s failed: %s", method, url,
+                             response.error)
+        elif response.code >= 400:
+            self.failures += 1
+
+        ret = (response.code, response.reason,
+               response.headers.get("Location", None), response.body)
+
+        self.log.info("Result: %u %s", ret[0], ret[1])
+
+        return ret
+
+    def to_dict(self):
+        """Return a dict representation of the object."""
+
+        latency_avg = \
+            self.latency_total / self.requests if self.requests else 0.0
+
+        out = {'host': self.host,
+               'port': self.port,
+               'client': type(self.http_client).__name__,
+               'max_clients': self.max_clients,
+               'timeout': self.timeout,
+               'requests': self.requests,
+               'failures': self.failures,
+               'in_flight': self.in_flight,
+               'max_in_flight': self.max_in_flight,
+               'latency_avg': latency_avg}
+
+        if isinstance(self.http_client, PooledHTTPClient):
+            out['pool'] = self.http_client.to_dict()
+
+        return out
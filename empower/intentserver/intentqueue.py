@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Intent operations queue.
+
+Intent operations (add, update, remove) are not sent immediately but queued
+for a short flush window. Operations on the same intent queued within the
+same window are merged, for example:
+
+  add + update     -> add (with the last intent)
+  update + update  -> update (with the last intent)
+  add + remove     -> nothing
+  update + remove  -> remove
+
+At the end of the window all the queued operations are sent as a single
+burst of concurrent requests. Operations on the same intent are never sent
+concurrently: an operation waits for the previous one on the same intent to
+complete.
+"""
+
+import time
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.concurrent import chain_future
+from tornado.ioloop import IOLoop
+
+# flush window in ms
+DEFAULT_WINDOW = 10
+
+# histogram buckets (upper bounds)
+DEPTH_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500]
+LATENCY_BUCKETS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+
+class Histogram:
+    """A simple histogram.
+
+    Attributes:
+        buckets: the upper bounds of the buckets
+        counts: the number of samples in each bucket (the last one counts the
+          samples larger than the last bound)
+    """
+
+    def __init__(self, buckets):
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+
+    def add(self, value):
+        """Add a sample."""
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+
+        self.counts[-1] += 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        out = {str(bound): count
+               for bound, count in zip(self.buckets, self.counts)}
+        out['inf'] = self.counts[-1]
+
+        return out
+
+
+class IntentOp:
+    """A queued intent operation.
+
+    Attributes:
+        method: the HTTP method (POST, PUT, or DELETE)
+        url: the intent url
+        intent: the intent (None for DELETE)
+        uuid: the intent uuid
+        future: the future returned to the caller
+        queued: the time at which the operation was queued
+    """
+
+    __slots__ = ('method', 'url', 'intent', 'uuid', 'future', 'queued')
+
+    def __init__(self, method, url, intent=None, uuid=None):
+
+        self.method = method
+        self.url = url
+        self.intent = intent
+        self.uuid = uuid
+        self.future = Future()
+        self.queued = time.time()
+
+
+class IntentQueue:
+    """Queue of intent operations.
+
+    Attributes:
+        window: the flush window in ms (0 means that operations are queued
+          only within the current IOLoop iteration)
+        queued: number of operations queued
+        merged: number of operations removed by merging
+        submitted: number of operations sent
+        batches: number of bursts sent
+        depth: histogram of the number of operations per burst
+        latency: histogram of the operations latency (from queuing to
+          completion) in ms
+    """
+
+    def __init__(self, send_intent, remove_intent, window=DEFAULT_WINDOW):
+
+        self.window = window
+        self.queued = 0
+        self.merged = 0
+        self.submitted = 0
+        self.batches = 0
+        self.depth = Histogram(DEPTH_BUCKETS)
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+        self.__send_intent = send_intent
+        self.__remove_intent = remove_intent
+        self.__pending = {}
+        self.__inflight = {}
+        self.__scheduled = False
+
+    def add(self, url, intent, uuid):
+        """Queue a new intent. Returns a future resolving to its uuid."""
+
+        op = IntentOp("POST", url, intent, uuid)
+        self.__queue((url, uuid), op)
+
+        return op.future
+
+    def update(self, url, intent, uuid):
+        """Queue an intent update. Returns a future resolving to the uuid."""
+
+        key = (url, uuid)
+        pending = self.__pending.get(key)
+
+        if pending and pending.method in ("POST", "PUT"):
+            pending.intent = intent
+            self.merged += 1
+            return pending.future
+
+        if pending:
+            # the intent is going to be removed, nothing to update
+            self.merged += 1
+            future = Future()
+            future.set_result(None)
+            return future
+
+        op = IntentOp("PUT", url, intent, uuid)
+        self.__queue(key, op)
+
+        return op.future
+
+    def remove(self, url, uuid):
+        """Queue an intent removal. Returns a future resolved on completion.
+        """
+
+        # remove all the intents, do not queue
+        if uuid is None:
+            return self.__remove_intent(url)
+
+        key = (url, uuid)
+        pending = self.__pending.get(key)
+
+        if pending and pending.method == "POST":
+            # the intent has never been sent, drop both
+            del self.__pending[key]
+            pending.future.set_result(None)
+            self.merged += 2
+            future = Future()
+            future.set_result(None)
+            return future
+
+        if pending and pending.method == "PUT":
+            # the update is superseded by the removal
+            del self.__pending[key]
+            pending.future.set_result(None)
+            self.merged += 1
+
+        elif pending:
+            self.merged += 1
+            return pending.future
+
+        op = IntentOp("DELETE", url, None, uuid)
+        self.__queue(key, op)
+
+        return op.future
+
+    def busy(self, url):
+        """Return True if there are operations queued or in flight for the
+        specified url."""
+
+        return any(key[0] == url for key in self.__pending) or \
+            any(key[0] == url for key in self.__inflight)
+
+    def __queue(self, key, op):
+        """Add an operation to the queue and schedule the flush."""
+
+        self.queued += 1
+        self.__pending[key] = op
+
+        if self.__scheduled:
+            return
+
+        self.__scheduled = True
+
+        if self.window > 0:
+            IOLoop.current().call_later(self.window / 1000, self.flush)
+        else:
+            IOLoop.current().add_callback(self.flush)
+
+    def flush(self):
+        """Send all the queued operations."""
+
+        self.__scheduled = False
+
+        pending = self.__pending
+        self.__pending = {}
+
+        if not pending:
+            return
+
+        self.batches += 1
+        self.depth.add(len(pending))
+
+        for key, op in pending.items():
+            self.__submit(key, op)
+
+    def __submit(self, key, op):
+        """Send an operation after the previous one on the same intent."""
+
+        self.submitted += 1
+
+        future = self.__run(op, self.__inflight.get(key))
+        self.__inflight[key] = future
+
+        def done(_):
+            if self.__inflight.get(key) is future:
+                del self.__inflight[key]
+            self.latency.add((time.time() - op.queued) * 1000)
+
+        future.add_done_callback(done)
+        chain_future(future, op.future)
+
+    @gen.coroutine
+    def __run(self, op, previous):
+        """Wait for the previous operation and then send op."""
+
+        if previous:
+            try:
+                yield previous
+            except Exception:
+                pass
+
+        if op.method == "DELETE":
+            yield self.__remove_intent(op.url, op.uuid)
+            return None
+
+        uuid = yield self.__send_intent(op.method, op.url, op.intent, op.uuid)
+
+        return uuid
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'window': self.window,
+                'depth_current': len(self.__pending),
+                'queued': self.queued,
+                'merged': self.merged,
+                'submitted': self.submitted,
+                'batches': self.batches,
+                'depth': self.depth,
+                'latency': self.latency}
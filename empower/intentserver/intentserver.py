@@ -15,21 +15,65 @@
 # specific language governing permissions and limitations
 # under the License.
 
-"""Intent server module."""
+"""Intent server module.
+
+The intent server keeps the desired state of the intents (points of
+attachment, rules, and traffic rules) in memory and makes sure that the
+intent interface of the SDN controller converges to it. The add_* methods
+return the id of the new intent, which must then be used to update or remove
+it. Intent ids are assigned by the intent server and mapped internally to the
+uuids assigned by the SDN controller.
+
+Changes are applied as soon as possible: operations are queued for a short
+flush window, merged, and sent in bursts (see
+empower.intentserver.intentqueue). Periodically, and after every failure, a
+reconciliation pass fetches the intents reported by the SDN controller and
+applies only the delta: missing intents are created again, intents unknown
+to the intent server (e.g. left by a previous run) are removed, and failed
+changes are retried. After a failure the reconciliation is retried with
+exponential backoff.
+"""
 
-import tornado
 import json
-import http.client
+import tornado
 
 from uuid import UUID
+from uuid import uuid4
 from urllib.parse import urlparse
 
+from tornado import gen
+from tornado.ioloop import IOLoop
+
 from empower.core.service import Service
-from empower.core.jsonserializer import EmpowerEncoder
+from empower.core.scheduler import get_scheduler
+from empower.intentserver.intentclient import IntentClient
+from empower.intentserver.intentclient import DEFAULT_MAX_CLIENTS
+from empower.intentserver.intentclient import DEFAULT_TIMEOUT
+from empower.intentserver.intentqueue import IntentQueue
+from empower.intentserver.intentqueue import DEFAULT_WINDOW
 
 
 DEFAULT_PORT = 4444
 
+# how often the intents are reconciled (in ms)
+DEFAULT_RECONCILE_EVERY = 30000
+
+# retry delays after a failure (in s)
+MIN_BACKOFF = 1
+MAX_BACKOFF = 60
+
+
+def parse_uuids(body):
+    """Return the uuids of the intents in a GET response. The response can
+    be either a list of intents or a dictionary indexed by uuid."""
+
+    intents = json.loads(body.decode('UTF-8')) if body else []
+
+    if isinstance(intents, dict):
+        return set(UUID(uuid) for uuid in intents)
+
+    return set(UUID(intent['uuid']) for intent in intents)
+
 
 class IntentHandler(tornado.web.RequestHandler):
     """Datastreams handler."""
@@ -38,11 +82,29 @@ class IntentHandler(tornado.web.RequestHandler):
 
 
 class IntentServer(Service, tornado.web.Application):
-    """Intent Server."""
+    """Intent Server.
+
+    Attributes:
+        client: the non-blocking client used to reach the intent interface
+        queue: the queue merging the intent operations
+        desired: the desired intents, for each url a dictionary mapping
+          intent ids to intents
+        applied: the intents applied, for each url a dictionary mapping
+          intent ids to (controller uuid, intent) tuples
+        reconcile_every: the reconciliation period in ms
+        backoff: the current retry delay (in s)
+        reconciliations: number of reconciliation passes
+        failures: number of failed operations
+        recreated: number of intents created again because missing in the
+          SDN controller
+        removed_stale: number of intents removed because unknown
+    """
 
     handlers = [IntentHandler]
 
-    def __init__(self, port):
+    def __init__(self, port, max_clients=DEFAULT_MAX_CLIENTS,
+                 timeout=DEFAULT_TIMEOUT, flush_window=DEFAULT_WINDOW,
+                 reconcile_every=DEFAULT_RECONCILE_EVERY):
 
         Service.__init__(self, every=-1)
 
@@ -53,6 +115,29 @@ class IntentServer(Service, tornado.web.Application):
         self.intent_url_poa = "/intent/poas"
         self.intent_url_traffic_rules = "/intent/trs"
 
+        self.client = IntentClient(self.intent_host, self.intent_port,
+                                   max_clients, timeout)
+        self.queue = IntentQueue(self.__send_intent, self.__remove_intent,
+                                 flush_window)
+
+        self.urls = [self.intent_url_traffic_rules,
+                     self.intent_url_rules,
+                     self.intent_url_poa]
+
+        self.desired = {url: {} for url in self.urls}
+        self.applied = {url: {} for url in self.urls}
+
+        self.reconcile_every = reconcile_every
+        self.backoff = MIN_BACKOFF
+        self.reconciliations = 0
+        self.failures = 0
+        self.recreated = 0
+        self.removed_stale = 0
+
+        self.__retry = None
+        self.__reconciling = False
+        self.__failed = False
+
         handlers = []
         for handler in self.handlers:
             for url in handler.HANDLERS:
@@ -62,126 +147,258 @@ class IntentServer(Service, tornado.web.Application):
         http_server = tornado.httpserver.HTTPServer(self)
         http_server.listen(self.port)
 
-        self.get_traffic_rule()
-        self.get_rule()
-        self.get_poa()
+        # the first pass removes the intents left by a previous run
+        IOLoop.current().add_callback(self.reconcile)
 
-        self.remove_traffic_rule()
-        self.remove_rule()
-        self.remove_poa()
+        if self.reconcile_every > 0:
+            get_scheduler().add_timer(self.reconcile, self.reconcile_every)
 
     def __get_response(self, method, url, uuid=None, body=None):
         """Generic get intent."""
 
-        conn = http.client.HTTPConnection(self.intent_host, self.intent_port)
         url = url + "/%s" % uuid if uuid else url
-        headers = {}
-
-        if body:
-            body = json.dumps(body, indent=4, cls=EmpowerEncoder)
-            headers = {
-                'Content-type': 'application/json',
-                'Accept': 'application/json',
-            }
-            self.log.info("Intent %s %s:\n%s", method, url, body)
-        else:
-            self.log.info("Intent %s %s", method, url)
 
-        conn.request(method, url, body, headers)
-        response = conn.getresponse()
-        location = response.getheader("Location", None)
-        ret = (response.status, response.reason, location)
-        self.log.info("Result: %u %s", ret[0], ret[1])
-        conn.close()
+        return self.client.request(method, url, body)
+
+    def __failure(self):
+        """Record a failure and schedule a reconciliation pass."""
+
+        self.failures += 1
+        self.__schedule_retry()
+
+    def __schedule_retry(self):
+        """Schedule a reconciliation pass with exponential backoff."""
+
+        # the pass in progress will schedule the retry when done
+        if self.__reconciling:
+            self.__failed = True
+            return
+
+        if self.__retry:
+            return
+
+        self.log.warning("Intent failure, retrying in %.1fs", self.backoff)
+
+        self.__retry = \
+            IOLoop.current().call_later(self.backoff, self.__on_retry)
+
+        self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+
+    def __on_retry(self):
+        """Retry timer expired."""
+
+        self.__retry = None
+        self.reconcile()
+
+    @gen.coroutine
+    def reconcile(self):
+        """Reconcile the intents of the SDN controller with the desired
+        ones."""
 
-        return ret
+        if self.__reconciling:
+            return
 
+        self.__reconciling = True
+        self.__failed = False
+        self.reconciliations += 1
+
+        try:
+            yield [self.__reconcile_url(url) for url in self.urls]
+        except Exception as ex:
+            self.log.exception(ex)
+            self.failures += 1
+            self.__failed = True
+        finally:
+            self.__reconciling = False
+
+        if self.__failed:
+            self.__failed = False
+            self.__schedule_retry()
+        elif not self.__retry:
+            self.backoff = MIN_BACKOFF
+
+    @gen.coroutine
+    def __reconcile_url(self, url):
+        """Reconcile the intents of a single url."""
+
+        # the intents applied before the request
+        applied = dict(self.applied[url])
+
+        ret = yield self.__get_response("GET", url)
+
+        if ret[0] != 200:
+            self.__failure()
+            return
+
+        reported = parse_uuids(ret[3])
+
+        # intents lost by the SDN controller
+        for intent_id, (uuid, _) in applied.items():
+            if uuid not in reported and \
+               self.applied[url].get(intent_id, (None,))[0] == uuid:
+                del self.applied[url][intent_id]
+                self.recreated += 1
+
+        # intents unknown to the intent server, the response of a pending
+        # request could still be on its way so skip if busy
+        if not self.queue.busy(url):
+            known = set(uuid for uuid, _ in self.applied[url].values())
+            stale = reported - known
+            for uuid in stale:
+                self.log.info("Removing stale intent %s/%s", url, uuid)
+            self.removed_stale += len(stale)
+            yield [self.__get_response("DELETE", url, uuid)
+                   for uuid in stale]
+
+        # apply the delta
+        for intent_id, intent in self.desired[url].items():
+            if self.applied[url].get(intent_id, (None, None))[1] != intent:
+                self.queue.update(url, intent, intent_id)
+
+        for intent_id in self.applied[url]:
+            if intent_id not in self.desired[url]:
+                self.queue.remove(url, intent_id)
+
+    @gen.coroutine
     def __get_intent(self, url, uuid=None):
+
         try:
-            self.__get_response("GET", url, uuid)
-        except ConnectionRefusedError:
-            self.log.error("Intent interface not found")
+            yield self.__get_response("GET", url, uuid)
         except Exception as ex:
             self.log.exception(ex)
 
     def get_traffic_rule(self, uuid=None):
-        self.__get_intent(self.intent_url_traffic_rules, uuid)
+        return self.__get_intent(self.intent_url_traffic_rules, uuid)
 
     def get_rule(self, uuid=None):
-        self.__get_intent(self.intent_url_rules, uuid)
+        return self.__get_intent(self.intent_url_rules, uuid)
 
     def get_poa(self, uuid=None):
-        self.__get_intent(self.intent_url_poa, uuid)
+        return self.__get_intent(self.intent_url_poa, uuid)
+
+    @gen.coroutine
+    def __send_intent(self, method, url, intent, intent_id):
+        """Create or update an intent."""
+
+        # the intent has been removed in the meanwhile
+        if intent_id not in self.desired[url]:
+            return None
 
-    def __send_intent(self, method, url, intent, uuid=None):
-        """Create new intent."""
+        uuid, applied = self.applied[url].get(intent_id, (None, None))
+
+        # already applied
+        if uuid and applied == intent:
+            return intent_id
 
         try:
-            ret = self.__get_response(method, url, uuid, intent)
-            if ret[0] == 201:
-                url = urlparse(ret[2])
-                uuid = UUID(url.path.split("/")[-1])
-                return uuid
-            if ret[0] == 204:
-                return uuid
-        except ConnectionRefusedError:
-            self.log.warning("Intent interface not found")
+            if uuid:
+                ret = yield self.__get_response("PUT", url, uuid, intent)
+            else:
+                ret = yield self.__get_response("POST", url, None, intent)
         except Exception as ex:
             self.log.exception(ex)
+            self.__failure()
+            return intent_id
+
+        if ret[0] == 201:
+            uuid = UUID(urlparse(ret[2]).path.split("/")[-1])
+            self.applied[url][intent_id] = (uuid, intent)
+        elif ret[0] == 204:
+            self.applied[url][intent_id] = (uuid, intent)
+        else:
+            # the intent has been lost, it will be created again
+            if ret[0] == 404:
+                self.applied[url].pop(intent_id, None)
+            self.__failure()
+
+        return intent_id
+
+    def __add_intent(self, url, intent):
+        """Add a new intent."""
+
+        intent_id = uuid4()
+        self.desired[url][intent_id] = intent
+        self.queue.add(url, intent, intent_id)
+
+        return intent_id
 
-        return None
+    def __update_intent(self, url, intent, intent_id):
+        """Update an intent. Unknown intents (e.g. removed in the meanwhile)
+        are created again with the same id."""
+
+        if intent_id not in self.desired[url]:
+            self.desired[url][intent_id] = intent
+            return self.queue.add(url, intent, intent_id)
+
+        self.desired[url][intent_id] = intent
+
+        return self.queue.update(url, intent, intent_id)
 
     def add_traffic_rule(self, intent):
-        return self.__send_intent(method="POST",
-                                  url=self.intent_url_traffic_rules,
-                                  intent=intent)
+        return self.__add_intent(self.intent_url_traffic_rules, intent)
 
     def add_rule(self, intent):
-        return self.__send_intent(method="POST",
-                                  url=self.intent_url_rules,
-                                  intent=intent)
+        return self.__add_intent(self.intent_url_rules, intent)
 
     def add_poa(self, intent):
-        return self.__send_intent(method="POST",
-                                  url=self.intent_url_poa,
-                                  intent=intent)
+        return self.__add_intent(self.intent_url_poa, intent)
 
     def update_traffic_rule(self, intent, uuid):
-        self.__send_intent(method="PUT",
-                           url=self.intent_url_traffic_rules,
-                           intent=intent,
-                           uuid=uuid)
+        return self.__update_intent(self.intent_url_traffic_rules, intent,
+                                    uuid)
 
     def update_rule(self, intent, uuid):
-        self.__send_intent(method="PUT",
-                           url=self.intent_url_rules,
-                           intent=intent,
-                           uuid=uuid)
+        return self.__update_intent(self.intent_url_rules, intent, uuid)
 
     def update_poa(self, intent, uuid):
-        self.__send_intent(method="PUT",
-                           url=self.intent_url_poa,
-                           intent=intent,
-                           uuid=uuid)
+        return self.__update_intent(self.intent_url_poa, intent, uuid)
 
-    def __remove_intent(self, url, uuid=None):
-        """Remove intent."""
+    @gen.coroutine
+    def __remove_intent(self, url, intent_id=None):
+        """Remove an intent (or all the intents if intent_id is None)."""
+
+        if intent_id is None:
+            uuids = [None]
+        else:
+            uuids = [self.applied[url].get(intent_id, (None, None))[0]]
+            # never created
+            if not uuids[0]:
+                return
 
         try:
-            self.__get_response("DELETE", url, uuid)
-        except ConnectionRefusedError:
-            self.log.error("Intent interface not found")
+            ret = yield self.__get_response("DELETE", url, uuids[0])
         except Exception as ex:
-            Self.log.exception(ex)
+            self.log.exception(ex)
+            self.__failure()
+            return
+
+        if ret[0] not in (200, 204, 404):
+            self.__failure()
+            return
+
+        if intent_id is None:
+            self.applied[url].clear()
+        else:
+            self.applied[url].pop(intent_id, None)
+
+    def __remove(self, url, intent_id):
+        """Remove an intent (or all the intents if intent_id is None)."""
+
+        if intent_id is None:
+            self.desired[url].clear()
+        else:
+            self.desired[url].pop(intent_id, None)
+
+        return self.queue.remove(url, intent_id)
 
     def remove_rule(self, uuid=None):
-        self.__remove_intent(self.intent_url_rules, uuid)
+        return self.__remove(self.intent_url_rules, uuid)
 
     def remove_poa(self, uuid=None):
-        self.__remove_intent(self.intent_url_poa, uuid)
+        return self.__remove(self.intent_url_poa, uuid)
 
     def remove_traffic_rule(self, uuid=None):
-        self.__remove_intent(self.intent_url_traffic_rules, uuid)
+        return self.__remove(self.intent_url_traffic_rules, uuid)
 
     def to_dict(self):
         """Return a dict representation of the object."""
@@ -190,13 +407,26 @@ class IntentServer(Service, tornado.web.Application):
         out['port'] = self.port
         out['intent_host'] = self.intent_host
         out['intent_port'] = self.intent_port
+        out['client'] = self.client
+        out['queue'] = self.queue
+        out['desired'] = {url: len(self.desired[url]) for url in self.urls}
+        out['applied'] = {url: len(self.applied[url]) for url in self.urls}
+        out['reconcile_every'] = self.reconcile_every
+        out['backoff'] = self.backoff
+        out['reconciliations'] = self.reconciliations
+        out['failures'] = self.failures
+        out['recreated'] = self.recreated
+        out['removed_stale'] = self.removed_stale
 
         return out
 
 
-def launch(port=DEFAULT_PORT):
+def launch(port=DEFAULT_PORT, max_clients=DEFAULT_MAX_CLIENTS,
+           timeout=DEFAULT_TIMEOUT, flush_window=DEFAULT_WINDOW,
+           reconcile_every=DEFAULT_RECONCILE_EVERY):
     """Start the Intent Server Module."""
 
-    server = IntentServer(port)
+    server = IntentServer(port, int(max_clients), float(timeout),
+                          int(flush_window), int(reconcile_every))
     server.log.info("Intent Server available at %u", server.port)
     return server
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""HTTP/1.1 client keeping the connections alive.
+
+Tornado's simple HTTP client opens a new TCP connection for every request.
+This client keeps a pool of idle connections for each host and sends the
+next request over one of them. Each request uses a new HTTP1Connection over
+the pooled IOStream. If the server closed an idle connection before any
+response is received, the request is sent again over a new connection.
+
+The client implements the subset of the AsyncHTTPClient interface used by
+the intent client:
+
+    client = PooledHTTPClient(max_clients=10)
+    response = yield client.fetch(request, raise_error=False)
+"""
+
+import time
+
+from io import BytesIO
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from tornado import gen
+from tornado import httputil
+from tornado.locks import Semaphore
+from tornado.iostream import StreamClosedError
+from tornado.tcpclient import TCPClient
+from tornado.httpclient import HTTPError
+from tornado.httpclient import HTTPResponse
+from tornado.http1connection import HTTP1Connection
+from tornado.http1connection import HTTP1ConnectionParameters
+
+# default connect and request timeout (in s)
+DEFAULT_TIMEOUT = 20.0
+
+
+class _ResponseDelegate(httputil.HTTPMessageDelegate):
+    """Collects a response."""
+
+    def __init__(self):
+
+        self.start_line = None
+        self.headers = None
+        self.chunks = []
+
+    def headers_received(self, start_line, headers):
+
+        self.start_line = start_line
+        self.headers = headers
+
+    def data_received(self, chunk):
+
+        self.chunks.append(chunk)
+
+
+class PooledHTTPClient:
+    """HTTP/1.1 client keeping the connections alive.
+
+    Attributes:
+        max_clients: maximum number of concurrent requests, further requests
+          are queued (this also bounds the connections to each host)
+        opened: number of connections opened
+        reused: number of requests sent over an idle connection
+        retried: number of requests sent again because the server closed
+          the idle connection
+    """
+
+    def __init__(self, max_clients=10):
+
+        self.max_clients = max_clients
+        self.opened = 0
+        self.reused = 0
+        self.retried = 0
+
+        self.__idle = {}
+        self.__slots = Semaphore(max_clients)
+        self.__tcp_client = TCPClient()
+
+    @property
+    def idle(self):
+        """Return the number of idle connections."""
+
+        return sum(len(streams) for streams in self.__idle.values())
+
+    @gen.coroutine
+    def fetch(self, request, raise_error=True):
+        """Send a request. Returns a future resolving to a HTTPResponse.
+
+        Connection errors and timeouts are reported with status 599.
+        """
+
+        yield self.__slots.acquire()
+
+        try:
+            response = yield self.__fetch(request)
+        finally:
+            self.__slots.release()
+
+        if raise_error and response.error:
+            raise response.error
+
+        return response
+
+    @gen.coroutine
+    def __fetch(self, request):
+        """Send a request over an idle or a new connection."""
+
+        started = time.time()
+
+        url = urlsplit(request.url)
+        key = (url.hostname, url.port or 80)
+
+        stream = self.__get_idle(key)
+
+        if stream:
+
+            self.reused += 1
+
+            response = yield self.__exchange(stream, key, request, url,
+                                             started)
+
+            if response:
+                return response
+
+            # the server closed the idle connection
+            self.retried += 1
+
+        try:
+            stream = yield gen.with_timeout(
+                timedelta(seconds=request.connect_timeout or DEFAULT_TIMEOUT),
+                self.__tcp_client.connect(*key),
+                quiet_exceptions=(StreamClosedError, ))
+        except Exception as ex:
+            return HTTPResponse(request, 599, error=ex,
+                                request_time=time.time() - started)
+
+        self.opened += 1
+
+        response = yield self.__exchange(stream, key, request, url, started)
+
+        if not response:
+            error = HTTPError(599, "Connection closed")
+            response = HTTPResponse(request, 599, error=error,
+                                    request_time=time.time() - started)
+
+        return response
+
+    def __get_idle(self, key):
+        """Return an idle connection to the host (None if there is none)."""
+
+        streams = self.__idle.get(key)
+
+        while streams:
+            stream = streams.pop()
+            if not stream.closed():
+                return stream
+
+        return None
+
+    @gen.coroutine
+    def __exchange(self, stream, key, request, url, started):
+        """Send the request and read the response. Returns None if the
+        connection was closed before any response was received."""
+
+        body = request.body or b""
+
+        headers = httputil.HTTPHeaders(request.headers)
+        headers["Host"] = url.netloc
+
+        if body or request.method in ("POST", "PUT", "PATCH"):
+            headers["Content-Length"] = str(len(body))
+
+        path = url.path or "/"
+
+        if url.query:
+            path += "?" + url.query
+
+        start_line = httputil.RequestStartLine(request.method, path,
+                                               "HTTP/1.1")
+
+        params = HTTP1ConnectionParameters(decompress=False)
+        connection = HTTP1Connection(stream, True, params)
+        delegate = _ResponseDelegate()
+
+        try:
+
+            connection.write_headers(start_line, headers)
+
+            if body:
+                connection.write(body)
+
+            connection.finish()
+
+            yield gen.with_timeout(
+                timedelta(seconds=request.request_timeout or DEFAULT_TIMEOUT),
+                connection.read_response(delegate),
+                quiet_exceptions=(StreamClosedError, ))
+
+        except StreamClosedError:
+            stream.close()
+            if not delegate.start_line:
+                return None
+            error = HTTPError(599, "Connection closed")
+            return HTTPResponse(request, 599, error=error,
+                                request_time=time.time() - started)
+
+        except Exception as ex:
+            stream.close()
+            if isinstance(ex, gen.TimeoutError):
+                ex = HTTPError(599, "Timeout")
+            return HTTPResponse(request, 599, error=ex,
+                                request_time=time.time() - started)
+
+        if not delegate.start_line:
+            stream.close()
+            return None
+
+        # the connection can be used for the next request
+        if not stream.closed():
+            self.__idle.setdefault(key, []).append(stream)
+
+        return HTTPResponse(request, delegate.start_line.code,
+                            reason=delegate.start_line.reason,
+                            headers=delegate.headers,
+                            buffer=BytesIO(b"".join(delegate.chunks)),
+                            effective_url=request.url,
+                            request_time=time.time() - started)
+
+    def close(self):
+        """Close the idle connections."""
+
+        for streams in self.__idle.values():
+            for stream in streams:
+                stream.close()
+
+        self.__idle.clear()
+
+    def to_dict(self):
+        """Return a dict representation of the object."""
+
+        return {'max_clients': self.max_clients,
+                'opened': self.opened,
+                'reused': self.reused,
+                'retried': self.retried,
+                'idle': self.idle}
@@ -17,6 +17,8 @@
 
 """LVAP statistics module."""
 
+import time
+
 from construct import UBInt8
 from construct import UBInt16
 from construct import UBInt32
@@ -145,7 +147,7 @@ class LVAPStats(ModulePeriodic):
                       lvap.addr, lvap.wtp.addr, self.module_id)
 
         msg = RATES_REQUEST.build(rates_req)
-        lvap.wtp.connection.stream.write(msg)
+        self.worker.send_request(lvap.wtp, msg)
 
     def handle_response(self, response):
         """Handle an incoming RATES_RESPONSE message.
@@ -176,6 +178,15 @@ class LVAPStats(ModulePeriodic):
         self.best_prob = \
             max([k for k, v in self.rates.items() if v['prob'] == max_val])
 
+        now = time.time()
+
+        for rate, value in self.rates.items():
+            self.record(self.lvap, "prob[%s]" % rate, value['prob'], now)
+            self.record(self.lvap, "cur_prob[%s]" % rate, value['cur_prob'],
+                        now)
+
+        self.record(self.lvap, "best_prob", self.best_prob, now)
+
         # call callback
         self.handle_callback(self)
 
@@ -64,6 +64,8 @@ PT_DEL_TRAFFIC_RULE = 0x57
 PT_STATUS_TRAFFIC_RULE = 0x58
 PT_TRAFFIC_RULE_STATUS_REQUEST = 0x61
 PT_PORT_STATUS_REQUEST = 0x62
+PT_MULTI_REQUEST = 0x63
+PT_MULTI_RESPONSE = 0x64
 
 HEADER = Struct("header", UBInt8("version"),
                 UBInt8("type"),
@@ -352,6 +354,21 @@ STATUS_TRAFFIC_RULE = Struct("status_traffic_rule",
                              UBInt8("dscp"),
                              Bytes("ssid", lambda ctx: ctx.length - 31))
 
+MULTI_REQUEST = Struct("multi_request", UBInt8("version"),
+                       UBInt8("type"),
+                       UBInt32("length"),
+                       UBInt32("seq"),
+                       UBInt16("nb_requests"),
+                       Bytes("requests", lambda ctx: ctx.length - 12))
+
+MULTI_RESPONSE = Struct("multi_response", UBInt8("version"),
+                        UBInt8("type"),
+                        UBInt32("length"),
+                        UBInt32("seq"),
+                        Bytes("wtp", 6),
+                        UBInt16("nb_responses"),
+                        Bytes("responses", lambda ctx: ctx.length - 18))
+
 PT_TYPES = {PT_BYE: None,
             PT_REGISTER: None,
             PT_LVAP_JOIN: None,
@@ -380,7 +397,9 @@ PT_TYPES = {PT_BYE: None,
             PT_ADD_LVAP_RESPONSE: ADD_DEL_LVAP_RESPONSE,
             PT_DEL_LVAP_RESPONSE: ADD_DEL_LVAP_RESPONSE,
             PT_SET_TRAFFIC_RULE: SET_TRAFFIC_RULE,
-            PT_DEL_TRAFFIC_RULE: DEL_TRAFFIC_RULE}
+            PT_DEL_TRAFFIC_RULE: DEL_TRAFFIC_RULE,
+            PT_MULTI_REQUEST: MULTI_REQUEST,
+            PT_MULTI_RESPONSE: MULTI_RESPONSE}
 
 
 PT_TYPES_HANDLERS = {}
@@ -22,7 +22,6 @@ import tornado.httpserver
 
 from empower.datatypes.etheraddress import EtherAddress
 from empower.restserver.apihandlers import EmpowerAPIHandler
-from empower.core.resourcepool import ResourceBlock
 
 from empower.main import RUNTIME
 
@@ -104,7 +103,12 @@ class LVAPHandler(EmpowerAPIHandler):
                     channel = int(block['channel'])
                     band = int(block['band'])
 
-                    r_block = ResourceBlock(wtp, hwaddr, channel, band)
+                    r_block = wtp.block_for(hwaddr, channel, band)
+
+                    if not r_block:
+                        raise ValueError("Invalid block %s/%u/%u" %
+                                         (hwaddr, channel, band))
+
                     pool.append(r_block)
 
                 lvap.blocks = pool
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""LVAPP precompiled codec.
+
+This module provides an alternative to the construct-based message
+definitions in empower.lvapp. Each codec precompiles the fixed part of a
+message into a struct.Struct layout and decodes it with unpack_from directly
+on the receive buffer. The variable part of a message (if any) is handled by
+a tail object. Codecs expose the same parse()/build() interface and the same
+name of the construct Struct they replace, so they can be used as drop-in
+replacements in the PT_TYPES table and in LVAPPConnection.send_message().
+"""
+
+import struct
+
+CODEC_CONSTRUCT = "construct"
+CODEC_STRUCT = "struct"
+
+CODEC_TYPES = [CODEC_CONSTRUCT, CODEC_STRUCT]
+
+
+class Message:
+    """A decoded LVAPP message.
+
+    Fields are exposed as attributes, like a construct Container.
+    """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def __contains__(self, key):
+        return key in self.__dict__
+
+    def __eq__(self, other):
+        if isinstance(other, Message):
+            return self.__dict__ == other.__dict__
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        fields = ", ".join("%s=%r" % (k, v) for k, v in self.__dict__.items())
+        return "%s(%s)" % (self.__class__.__name__, fields)
+
+
+class Flags:
+    """A 16 bits wide flags field.
+
+    Bits are listed starting from the most significant one among the
+    non-padding bits, i.e. the last entry is the least significant bit.
+    """
+
+    def __init__(self, *bits):
+        self.bits = [(name, 1 << shift)
+                     for shift, name in enumerate(reversed(bits))]
+
+    def decode(self, value):
+        """Return a Message with one attribute for each bit."""
+
+        flags = Message()
+
+        for name, mask in self.bits:
+            flags.__dict__[name] = 1 if value & mask else 0
+
+        return flags
+
+    def encode(self, flags):
+        """Return the integer representation of the flags."""
+
+        value = 0
+
+        for name, mask in self.bits:
+            if getattr(flags, name):
+                value |= mask
+
+        return value
+
+
+class VarBytes:
+    """A trailing bytes field whose length is the message length minus the
+    size of the fixed part."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def parse(self, msg, buf, offset, end):
+        """Decode field."""
+
+        msg.__dict__[self.name] = bytes(buf[offset:end])
+
+    def build(self, msg):
+        """Encode field."""
+
+        return bytes(getattr(msg, self.name))
+
+
+class SSIDList:
+    """A list of 1 to 10 length-prefixed SSIDs spanning until the end of
+    the message."""
+
+    MAX_SSIDS = 10
+
+    def parse(self, msg, buf, offset, end):
+        """Decode field."""
+
+        ssids = []
+        end = min(end, len(buf))
+
+        while offset < end and len(ssids) < self.MAX_SSIDS:
+            length = buf[offset]
+            if offset + 1 + length > end:
+                break
+            ssids.append(Message(length=length,
+                                 ssid=bytes(buf[offset + 1:
+                                                offset + 1 + length])))
+            offset += 1 + length
+
+        if not ssids:
+            raise ValueError("Expected at least one SSID")
+
+        msg.ssids = ssids
+
+    @classmethod
+    def build(cls, msg):
+        """Encode field."""
+
+        accum = []
+
+        for entry in msg.ssids:
+            accum.append(bytes((entry.length,)))
+            accum.append(entry.ssid)
+
+        return b''.join(accum)
+
+
+class UInt8Arrays:
+    """A sequence of arrays of bytes whose sizes are specified by fields of
+    the fixed part of the message."""
+
+    def __init__(self, *arrays):
+        self.arrays = arrays
+
+    def parse(self, msg, buf, offset, end):
+        """Decode field."""
+
+        for name, counter in self.arrays:
+            count = msg.__dict__[counter]
+            msg.__dict__[name] = list(buf[offset:offset + count])
+            offset += count
+
+    def build(self, msg):
+        """Encode field."""
+
+        return b''.join(bytes(getattr(msg, name)) for name, _ in self.arrays)
+
+
+class Records:
+    """A sequence of arrays of fixed size records whose sizes are specified
+    by fields of the fixed part of the message. Records are returned as lists
+    like construct Sequences."""
+
+    def __init__(self, *arrays):
+        self.arrays = [(name, counter, struct.Struct("!" + fmt))
+                       for name, counter, fmt in arrays]
+
+    def parse(self, msg, buf, offset, end):
+        """Decode field."""
+
+        for name, counter, layout in self.arrays:
+            count = msg.__dict__[counter]
+            size = layout.size
+            stop = offset + count * size
+            msg.__dict__[name] = \
+                [list(x) for x in layout.iter_unpack(buf[offset:stop])]
+            offset = stop
+
+    def build(self, msg):
+        """Encode field."""
+
+        accum = []
+
+        for name, _, layout in self.arrays:
+            for record in getattr(msg, name):
+                accum.append(layout.pack(*record))
+
+        return b''.join(accum)
+
+
+class Codec:
+    """Precompiled message codec.
+
+    Attributes:
+        name: the message name (the same of the construct Struct)
+        fields: the names of the fields in the fixed part of the message
+        layout: the struct.Struct layout of the fixed part of the message
+        flags: a Flags object, used to decode/encode the 'flags' field
+        tail: an object handling the variable part of the message (if any)
+    """
+
+    def __init__(self, name, fields, fmt, flags=None, tail=None):
+
+        self.name = name
+        self.fields = fields
+        self.layout = struct.Struct("!" + fmt)
+        self.flags = flags
+        self.tail = tail
+
+        if len(self.fields) != len(self.layout.unpack(bytes(self.size))):
+            raise ValueError("Invalid format for %s" % name)
+
+        self.__flags_idx = fields.index('flags') if flags else None
+
+    @property
+    def size(self):
+        """Return the size of the fixed part of the message."""
+
+        return self.layout.size
+
+    def parse(self, buf, offset=0):
+        """Decode a message from a bytes-like object."""
+
+        msg = Message()
+        msg.__dict__.update(zip(self.fields,
+                                self.layout.unpack_from(buf, offset)))
+
+        if self.flags:
+            msg.flags = self.flags.decode(msg.flags)
+
+        if self.tail:
+            self.tail.parse(msg, buf, offset + self.layout.size,
+                            offset + msg.length)
+
+        return msg
+
+    def build(self, msg):
+        """Encode a message. Accepts any object exposing the message fields as
+        attributes (e.g. a Message or a construct Container)."""
+
+        values = [getattr(msg, field) for field in self.fields]
+
+        if self.flags:
+            values[self.__flags_idx] = self.flags.encode(msg.flags)
+
+        out = self.layout.pack(*values)
+
+        if self.tail:
+            out += self.tail.build(msg)
+
+        return out
+
+
+HDR = ('version', 'type', 'length')
+SEQ = HDR + ('seq',)
+
+HEADER = Codec("header", HDR, "BBL")
+
+HELLO = Codec("hello", SEQ + ('wtp', 'period'), "BBLL6sL")
+
+PROBE_REQUEST = \
+    Codec("probe_request",
+          SEQ + ('wtp', 'sta', 'hwaddr', 'channel', 'band', 'supported_band'),
+          "BBLL6s6s6sBBB", tail=VarBytes("ssid"))
+
+PROBE_RESPONSE = Codec("probe_response", SEQ + ('sta',), "BBLL6s",
+                       tail=VarBytes("ssid"))
+
+AUTH_REQUEST = Codec("auth_request", SEQ + ('wtp', 'sta', 'bssid'),
+                     "BBLL6s6s6s")
+
+AUTH_RESPONSE = Codec("auth_response", SEQ + ('sta',), "BBLL6s")
+
+ASSOC_REQUEST = \
+    Codec("assoc_request",
+          SEQ + ('wtp', 'sta', 'bssid', 'hwaddr', 'channel', 'band',
+                 'supported_band'),
+          "BBLL6s6s6s6sBBB", tail=VarBytes("ssid"))
+
+ASSOC_RESPONSE = Codec("assoc_response", SEQ + ('sta',), "BBLL6s")
+
+LVAP_FLAGS = Flags("set_mask", "associated", "authenticated")
+
+ADD_LVAP = \
+    Codec("add_lvap",
+          SEQ + ('module_id', 'flags', 'assoc_id', 'hwaddr', 'channel',
+                 'band', 'supported_band', 'sta', 'encap', 'net_bssid',
+                 'lvap_bssid'),
+          "BBLLLHH6sBBB6s6s6s6s", flags=LVAP_FLAGS, tail=SSIDList())
+
+DEL_LVAP = \
+    Codec("del_lvap",
+          SEQ + ('module_id', 'sta', 'target_hwaddr', 'target_channel',
+                 'tagert_band', 'csa_switch_mode', 'csa_switch_count'),
+          "BBLLL6s6sBBBB")
+
+STATUS_LVAP = \
+    Codec("status_lvap",
+          SEQ + ('flags', 'assoc_id', 'wtp', 'sta', 'encap', 'hwaddr',
+                 'channel', 'band', 'supported_band', 'net_bssid',
+                 'lvap_bssid'),
+          "BBLLHH6s6s6s6sBBB6s6s", flags=LVAP_FLAGS, tail=SSIDList())
+
+CAPS_RESPONSE = \
+    Codec("caps",
+          SEQ + ('wtp', 'nb_resources_elements', 'nb_ports_elements'),
+          "BBLL6sBB",
+          tail=Records(("blocks", "nb_resources_elements", "6sBB"),
+                       ("ports", "nb_ports_elements", "6sH10s")))
+
+CAPS_REQUEST = Codec("caps_request", SEQ, "BBLL")
+
+LVAP_STATUS_REQUEST = Codec("lvap_status_request", SEQ, "BBLL")
+
+TRAFFIC_RULE_STATUS_REQUEST = Codec("traffic_rule_status_request", SEQ,
+                                    "BBLL")
+
+PORT_STATUS_REQUEST = Codec("port_status_request", SEQ, "BBLL")
+
+VAP_STATUS_REQUEST = Codec("vap_status_request", SEQ, "BBLL")
+
+NO_ACK_FLAGS = Flags("no_ack")
+
+SET_PORT = \
+    Codec("set_port",
+          SEQ + ('flags', 'hwaddr', 'channel', 'band', 'sta', 'rts_cts',
+                 'tx_mcast', 'ur_mcast_count', 'nb_mcses', 'nb_ht_mcses'),
+          "BBLLH6sBB6sHBBBB", flags=NO_ACK_FLAGS,
+          tail=UInt8Arrays(("mcs", "nb_mcses"), ("ht_mcs", "nb_ht_mcses")))
+
+DEL_PORT = Codec("del_port", SEQ + ('hwaddr', 'channel', 'band', 'sta'),
+                 "BBLL6sBB6s")
+
+STATUS_PORT = \
+    Codec("status_port",
+          SEQ + ('flags', 'wtp', 'sta', 'hwaddr', 'channel', 'band',
+                 'rts_cts', 'tx_mcast', 'ur_mcast_count', 'nb_mcses',
+                 'nb_ht_mcses'),
+          "BBLLH6s6s6sBBHBBBB", flags=NO_ACK_FLAGS,
+          tail=UInt8Arrays(("mcs", "nb_mcses"), ("ht_mcs", "nb_ht_mcses")))
+
+ADD_VAP = Codec("add_vap",
+                SEQ + ('hwaddr', 'channel', 'band', 'net_bssid'),
+                "BBLL6sBB6s", tail=VarBytes("ssid"))
+
+DEL_VAP = Codec("del_vap", SEQ + ('net_bssid',), "BBLL6s")
+
+STATUS_VAP = Codec("status_vap",
+                   SEQ + ('wtp', 'hwaddr', 'channel', 'band', 'net_bssid'),
+                   "BBLL6s6sBB6s", tail=VarBytes("ssid"))
+
+ADD_DEL_LVAP_RESPONSE = Codec("add_del_lvap",
+                              SEQ + ('wtp', 'sta', 'module_id', 'status'),
+                              "BBLL6s6sLL")
+
+AMSDU_FLAGS = Flags("amsdu_aggregation")
+
+SET_TRAFFIC_RULE = \
+    Codec("set_traffic_rule",
+          SEQ + ('flags', 'hwaddr', 'channel', 'band', 'quantum', 'dscp'),
+          "BBLLH6sBBLB", flags=AMSDU_FLAGS, tail=VarBytes("ssid"))
+
+DEL_TRAFFIC_RULE = \
+    Codec("del_traffic_rule",
+          SEQ + ('hwaddr', 'channel', 'band', 'dscp'),
+          "BBLL6sBBB", tail=VarBytes("ssid"))
+
+STATUS_TRAFFIC_RULE = \
+    Codec("status_traffic_rule",
+          SEQ + ('wtp', 'flags', 'hwaddr', 'channel', 'band', 'quantum',
+                 'dscp'),
+          "BBLL6sH6sBBLB", flags=AMSDU_FLAGS, tail=VarBytes("ssid"))
+
+MULTI_REQUEST = Codec("multi_request", SEQ + ('nb_requests',), "BBLLH",
+                      tail=VarBytes("requests"))
+
+MULTI_RESPONSE = Codec("multi_response", SEQ + ('wtp', 'nb_responses'),
+                       "BBLL6sH", tail=VarBytes("responses"))
+
+CODECS = {}
+
+for codec in [HELLO, PROBE_REQUEST, PROBE_RESPONSE, AUTH_REQUEST,
+              AUTH_RESPONSE, ASSOC_REQUEST, ASSOC_RESPONSE, ADD_LVAP,
+              DEL_LVAP, STATUS_LVAP, CAPS_RESPONSE, CAPS_REQUEST,
+              LVAP_STATUS_REQUEST, TRAFFIC_RULE_STATUS_REQUEST,
+              PORT_STATUS_REQUEST, VAP_STATUS_REQUEST, SET_PORT, DEL_PORT,
+              STATUS_PORT, ADD_VAP, DEL_VAP, STATUS_VAP,
+              ADD_DEL_LVAP_RESPONSE, SET_TRAFFIC_RULE, DEL_TRAFFIC_RULE,
+              STATUS_TRAFFIC_RULE, MULTI_REQUEST, MULTI_RESPONSE]:
+    CODECS[codec.name] = codec
+
+
+def register_codec(codec):
+    """Register a new codec. The codec will be used in place of any parser
+    with the same name."""
+
+    CODECS[codec.name] = codec
+
+
+def compile_types(pt_types, codecs=None):
+    """Return a copy of the pt_types dictionary in which every parser with a
+    matching codec is replaced by the codec."""
+
+    if codecs is None:
+        codecs = CODECS
+
+    return {k: codecs.get(v.name, v) if v else v
+            for k, v in pt_types.items()}
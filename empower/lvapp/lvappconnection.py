@@ -18,14 +18,16 @@
 """LVAP Connection."""
 
 import time
-import tornado.ioloop
+
+from tornado.ioloop import IOLoop
 
 from construct import Container
 
 from empower.datatypes.etheraddress import EtherAddress
 from empower.datatypes.ssid import SSID
 from empower.core.resourcepool import ResourceBlock
-from empower.lvapp import HEADER
+from empower.core.transmissionpolicy import intern_mcs
+from empower.lvapp.lvappcodec import HEADER
 from empower.lvapp import PT_VERSION
 from empower.lvapp import PT_BYE
 from empower.lvapp import PT_REGISTER
@@ -65,6 +67,7 @@ from empower.core.tenant import T_TYPE_SHARED
 from empower.core.tenant import T_TYPE_UNIQUE
 from empower.core.utils import generate_bssid
 from empower.core.virtualport import VirtualPort
+from empower.core.scheduler import get_scheduler
 
 from empower.main import RUNTIME
 
@@ -73,6 +76,8 @@ LOG = empower.logger.get_logger()
 
 BASE_MAC = EtherAddress("02:ca:fe:00:00:00")
 
+RECV_CHUNK_SIZE = 65536
+
 
 class LVAPPConnection:
     """LVAPP Connection.
@@ -115,6 +120,15 @@ class LVAPPConnection:
         address: The connection source address, i.e. the WTP IP address.
         server: Pointer to the server object.
         wtp: Pointer to a WTP object.
+        tx_flushes: Number of writes performed on the stream.
+        tx_messages: Number of messages sent to the WTP.
+        tx_bytes: Number of bytes sent to the WTP.
+        last_flush: Messages and bytes sent by the last write.
+
+    Outgoing messages are not written immediately to the stream. Instead
+    they are queued and all the messages generated within the same IOLoop
+    iteration are sent to the WTP with a single write. The queue can also be
+    flushed explicitly with the flush() method.
     """
 
     def __init__(self, stream, addr, server):
@@ -124,11 +138,16 @@ class LVAPPConnection:
         self.server = server
         self.wtp = None
         self.stream.set_close_callback(self._on_disconnect)
-        self.__buffer = b''
+        self.__buffer = bytearray()
+        self.__outbox = []
+        self.__flush_scheduled = False
+        self.tx_flushes = 0
+        self.tx_messages = 0
+        self.tx_bytes = 0
+        self.last_flush = {'messages': 0, 'bytes': 0}
         self._hb_interval_ms = 500
-        self._hb_worker = tornado.ioloop.PeriodicCallback(self._heartbeat_cb,
-                                                          self._hb_interval_ms)
-        self._hb_worker.start()
+        self._hb_worker = get_scheduler().add_timer(self._heartbeat_cb,
+                                                    self._hb_interval_ms)
         self._wait()
 
     def to_dict(self):
@@ -145,59 +164,119 @@ class LVAPPConnection:
                 LOG.info('Client inactive %s at %r', self.wtp.addr, self.addr)
                 self.stream.close()
 
-    def _on_read(self, line):
-        """ Appends bytes read from socket to a buffer. Once the full packet
-        has been read the parser is invoked and the buffers is cleared. The
-        parsed packet is then passed to the suitable method or dropped if the
-        packet type in unknown. """
+    def _on_read(self, data):
+        """ Appends bytes read from socket to a buffer. Every complete packet
+        in the buffer is passed (as a memoryview slice of the buffer) to the
+        suitable method or dropped if the packet type in unknown. The bytes
+        of a trailing incomplete packet are kept in the buffer until the
+        next read. """
 
-        self.__buffer = self.__buffer + line
-        hdr = HEADER.parse(self.__buffer)
+        self.__buffer += data
 
-        if len(self.__buffer) < hdr.length:
-            remaining = hdr.length - len(self.__buffer)
-            self.stream.read_bytes(remaining, self._on_read)
-            return
+        offset = self._process_buffer()
 
-        try:
-            self._trigger_message(hdr.type)
-        except Exception as ex:
-            LOG.exception(ex)
-            self.stream.close()
+        # drop processed bytes, the buffer is reused for the next read
+        del self.__buffer[:offset]
 
         if not self.stream.closed():
             self._wait()
 
-    def _trigger_message(self, msg_type):
+    def _process_buffer(self):
+        """ Frame and dispatch all the complete packets in the buffer.
+        Returns the number of bytes consumed. """
+
+        hdr_size = HEADER.size
+        unpack_hdr = HEADER.layout.unpack_from
+
+        with memoryview(self.__buffer) as view:
+
+            offset = 0
+            available = len(view)
+
+            while available - offset >= hdr_size:
+
+                _, msg_type, length = unpack_hdr(view, offset)
+
+                if length < hdr_size:
+                    LOG.error("Invalid message length %u, closing connection",
+                              length)
+                    self.stream.close()
+                    break
+
+                if available - offset < length:
+                    break
+
+                with view[offset:offset + length] as frame:
+
+                    try:
+                        self._trigger_message(msg_type, frame)
+                    except Exception as ex:
+                        LOG.exception(ex)
+                        self.stream.close()
+
+                offset += length
+
+                if self.stream.closed():
+                    break
+
+        return offset
 
-        if msg_type not in self.server.pt_types:
-            LOG.error("Unknown message type %u", msg_type)
+    def _trigger_message(self, msg_type, frame):
+
+        try:
+            parser, builtin, handlers, gate = self.server.dispatch[msg_type]
+        except KeyError:
+            if msg_type not in self.server.pt_types:
+                LOG.error("Unknown message type %u", msg_type)
             return
 
-        if self.server.pt_types[msg_type]:
+        if gate and not gate(frame):
+            return
+
+        msg = parser.parse(frame)
+        addr = EtherAddress(msg.wtp)
+
+        try:
+            wtp = RUNTIME.wtps[addr]
+        except KeyError:
+            LOG.error("Unknown WTP (%s), closing connection", addr)
+            self.stream.close()
+            return
 
-            #LOG.info("Got message type %u (%s)", msg_type,
-            #         self.server.pt_types[msg_type].name)
+        if builtin:
+            builtin(self, wtp, msg)
 
-            msg = self.server.pt_types[msg_type].parse(self.__buffer)
-            addr = EtherAddress(msg.wtp)
+        for handler in handlers:
+            handler(wtp, msg)
 
-            try:
-                wtp = RUNTIME.wtps[addr]
-            except KeyError:
-                LOG.error("Unknown WTP (%s), closing connection", addr)
-                self.stream.close()
-                return
+    def _handle_multi_response(self, wtp, multi_response):
+        """Handle an incoming MULTI_RESPONSE message. Every response carried
+        by the message is dispatched as if it was received by itself.
+        Args:
+            multi_response, a MULTI_RESPONSE message
+        Returns:
+            None
+        """
+
+        hdr_size = HEADER.size
+        unpack_hdr = HEADER.layout.unpack_from
 
-            handler_name = "_handle_%s" % self.server.pt_types[msg_type].name
+        with memoryview(multi_response.responses) as view:
 
-            if hasattr(self, handler_name):
-                handler = getattr(self, handler_name)
-                handler(wtp, msg)
+            offset = 0
 
-            if msg_type in self.server.pt_types_handlers:
-                for handler in self.server.pt_types_handlers[msg_type]:
-                    handler(wtp, msg)
+            while len(view) - offset >= hdr_size:
+
+                _, msg_type, length = unpack_hdr(view, offset)
+
+                if length < hdr_size or len(view) - offset < length:
+                    LOG.error("Invalid multi response from %s", wtp.addr)
+                    return
+
+                with view[offset:offset + length] as frame:
+                    self._trigger_message(msg_type, frame)
+
+                offset += length
 
     def send_message(self, msg, parser):
         """Send message and set common parameters."""
@@ -211,7 +290,61 @@ class LVAPPConnection:
 
         LOG.info("Sending %s message to %s", parser.name, self.wtp)
 
-        self.stream.write(parser.build(msg))
+        # use the precompiled codec for this message (if available)
+        parser = self.server.codecs.get(parser.name, parser)
+
+        self.write(parser.build(msg))
+
+    def write(self, data):
+        """Queue an already built message. The queue is flushed at the end of
+        the current IOLoop iteration."""
+
+        if self.stream.closed():
+            LOG.warning("Stream closed, dropping message to %s", self.wtp)
+            return
+
+        self.__outbox.append(data)
+
+        if not self.__flush_scheduled:
+            self.__flush_scheduled = True
+            IOLoop.current().add_callback(self.flush)
+
+    def flush(self):
+        """Send all the queued messages with a single write."""
+
+        self.__flush_scheduled = False
+
+        if not self.__outbox:
+            return
+
+        outbox = self.__outbox
+        self.__outbox = []
+
+        if self.stream.closed():
+            LOG.warning("Stream closed, dropping %u messages to %s",
+                        len(outbox), self.wtp)
+            return
+
+        data = b''.join(outbox)
+
+        self.stream.write(data)
+
+        self.tx_flushes += 1
+        self.tx_messages += len(outbox)
+        self.tx_bytes += len(data)
+        self.last_flush = {'messages': len(outbox), 'bytes': len(data)}
+
+    def tx_stats(self):
+        """Return the outbound counters."""
+
+        flushes = self.tx_flushes if self.tx_flushes else 1
+
+        return {'flushes': self.tx_flushes,
+                'messages': self.tx_messages,
+                'bytes': self.tx_bytes,
+                'messages_per_flush': self.tx_messages / flushes,
+                'bytes_per_flush': self.tx_bytes / flushes,
+                'last_flush': self.last_flush}
 
     def _handle_add_del_lvap(self, wtp, status):
         """Handle an incoming ADD_DEL_LVAP message.
@@ -357,14 +490,7 @@ class LVAPPConnection:
             LOG.info("Probe request from %s ssid %s", sta, ssid)
 
         # generate list of available SSIDs
-        ssids = set()
-
-        for tenant in RUNTIME.tenants.values():
-            if tenant.bssid_type == T_TYPE_SHARED:
-                continue
-            for wtp_in_tenant in tenant.wtps.values():
-                if wtp.addr == wtp_in_tenant.addr:
-                    ssids.add(tenant.tenant_name)
+        ssids = RUNTIME.wtp_ssids.get(wtp.addr, set())
 
         if not ssids:
             LOG.info("No SSIDs available at this WTP")
@@ -380,17 +506,15 @@ class LVAPPConnection:
         lvap._supported_band = request.supported_band
 
         # Check if block is valid
-        incoming = ResourceBlock(wtp, EtherAddress(request.hwaddr),
-                                 request.channel, request.band)
-
-        valid = [block for block in wtp.supports if block == incoming]
+        valid = wtp.block_for(EtherAddress(request.hwaddr), request.channel,
+                              request.band)
 
         if not valid:
             LOG.warning("No valid intersection found. Ignoring request.")
             return
 
         # This will trigger an LVAP ADD message (and REMOVE if necessary)
-        lvap.blocks = valid[0]
+        lvap.blocks = valid
 
         # save LVAP in the runtime
         RUNTIME.lvaps[sta] = lvap
@@ -455,6 +579,9 @@ class LVAPPConnection:
         # this will trigger an add lvap message to update the bssid
         lvap.lvap_bssid = lvap_bssid
 
+        # the update must reach the agent before the response
+        lvap.commit()
+
         LOG.info("Auth request from %s for BSSID %s, replying", sta, bssid)
 
         self.send_auth_response(lvap)
@@ -517,6 +644,10 @@ class LVAPPConnection:
         lvap.assoc_id = self.server.assoc_id
         lvap.supported_band = request.supported_band
 
+        # send a single add lvap message with all the updates before the
+        # response
+        lvap.commit()
+
         LOG.info("Assoc request sta %s ssid %s bssid %s assoc id %u, replying",
                  lvap.addr, lvap.ssid, lvap.lvap_bssid, lvap.assoc_id)
 
@@ -524,30 +655,28 @@ class LVAPPConnection:
 
     def _wait(self):
         """ Wait for incoming packets on signalling channel """
-        self.__buffer = b''
-        self.stream.read_bytes(6, self._on_read)
+        self.stream.read_bytes(RECV_CHUNK_SIZE, self._on_read, partial=True)
 
     def _on_disconnect(self):
         """ Handle WTP disconnection """
 
+        self._hb_worker.cancel()
+
         if not self.wtp:
             return
 
         LOG.info("WTP disconnected: %s", self.wtp.addr)
 
         # remove hosted lvaps
-        for lvap in list(RUNTIME.lvaps.values()):
-            wtps = [x.radio for x in lvap.blocks]
-            if self.wtp in wtps:
-                RUNTIME.remove_lvap(lvap.addr)
+        for lvap in self.wtp.hosted_lvaps():
+            RUNTIME.remove_lvap(lvap.addr)
 
         # remove hosted vaps
-        for tenant_id in RUNTIME.tenants.keys():
-            for vap_id in list(RUNTIME.tenants[tenant_id].vaps.keys()):
-                vap = RUNTIME.tenants[tenant_id].vaps[vap_id]
-                if vap.wtp == self.wtp:
-                    LOG.info("Deleting VAP: %s", vap.net_bssid)
-                    del RUNTIME.tenants[tenant_id].vaps[vap.net_bssid]
+        for vap in self.wtp.hosted_vaps():
+            LOG.info("Deleting VAP: %s", vap.net_bssid)
+            del vap.block.vaps[vap.net_bssid]
+            if vap.tenant.vaps.get(vap.net_bssid) == vap:
+                del vap.tenant.vaps[vap.net_bssid]
 
         # reset state
         self.wtp.set_disconnected()
@@ -634,10 +763,8 @@ class LVAPPConnection:
         lvap = RUNTIME.lvaps[sta]
 
         # Check if block is valid
-        incoming = ResourceBlock(wtp, EtherAddress(status.hwaddr),
-                                 status.channel, status.band)
-
-        valid = [block for block in wtp.supports if block == incoming]
+        valid = wtp.block_for(EtherAddress(status.hwaddr), status.channel,
+                              status.band)
 
         if not valid:
             LOG.warning("No valid intersection found. Removing block.")
@@ -646,13 +773,13 @@ class LVAPPConnection:
 
         # received downlink block but a different downlink block is already
         # present, delete before going any further
-        if set_mask and lvap._downlink and lvap._downlink != valid[0]:
+        if set_mask and lvap._downlink and lvap._downlink != valid:
             lvap._downlink.radio.connection.send_del_lvap(lvap)
 
         if set_mask:
-            lvap._downlink = valid[0]
-        else:
-            lvap._uplink.append(valid[0])
+            lvap.set_downlink(valid)
+        elif valid not in lvap._uplink:
+            lvap.add_uplink(valid)
 
         # update ports
         if not lvap.ports:
@@ -706,8 +833,7 @@ class LVAPPConnection:
             # Raise LVAP join event
             self.server.send_lvap_join_message_to_self(lvap)
 
-    @classmethod
-    def _handle_status_port(cls, wtp, status):
+    def _handle_status_port(self, wtp, status):
         """Handle an incoming PORT message.
         Args:
             status, a STATUS_PORT message
@@ -722,26 +848,25 @@ class LVAPPConnection:
         sta_addr = EtherAddress(status.sta)
 
         # incoming block
-        incoming = ResourceBlock(wtp, EtherAddress(status.hwaddr),
-                                 status.channel, status.band)
+        hwaddr = EtherAddress(status.hwaddr)
+        block = wtp.block_for(hwaddr, status.channel, status.band)
 
-        valid = [block for block in wtp.supports if block == incoming]
-
-        if not valid:
-            LOG.error("Incoming block %s is invalid", incoming)
+        if not block:
+            LOG.error("Incoming block %s/%u/%u is invalid", hwaddr,
+                      status.channel, status.band)
             return
 
-        block = valid[0]
-
         tx_policy = block.tx_policies[sta_addr]
 
-        tx_policy._mcs = set([float(x) / 2 for x in status.mcs])
-        tx_policy._ht_mcs = set([int(x) for x in status.ht_mcs])
+        tx_policy._mcs = intern_mcs(float(x) / 2 for x in status.mcs)
+        tx_policy._ht_mcs = intern_mcs(int(x) for x in status.ht_mcs)
         tx_policy._rts_cts = int(status.rts_cts)
         tx_policy._mcast = int(status.tx_mcast)
         tx_policy._ur_count = int(status.ur_mcast_count)
         tx_policy._no_ack = bool(status.flags.no_ack)
 
+        block.tx_policies[sta_addr] = tx_policy
+
         LOG.info("Port status %s", tx_policy)
 
     def _handle_caps(self, wtp, caps):
@@ -757,7 +882,7 @@ class LVAPPConnection:
         for block in caps.blocks:
             hwaddr = EtherAddress(block[0])
             r_block = ResourceBlock(wtp, hwaddr, block[1], block[2])
-            wtp.supports.add(r_block)
+            wtp.add_block(r_block)
 
         for port in caps.ports:
 
@@ -857,22 +982,20 @@ class LVAPPConnection:
             LOG.info("Traffic rule status from unknown tenant %s", ssid)
             return
 
-        incoming = ResourceBlock(wtp, EtherAddress(status.hwaddr),
-                                 status.channel, status.band)
-
-        valid = [block for block in self.wtp.supports if block == incoming]
+        block = wtp.block_for(EtherAddress(status.hwaddr), status.channel,
+                              status.band)
 
-        if not valid:
+        if not block:
             LOG.warning("No valid intersection found. Ignoring request.")
             return
 
-        block = valid[0]
-
         trq = block.traffic_rule_queues[(ssid, dscp)]
 
         trq._quantum = quantum
         trq._amsdu_aggregation = amsdu_aggregation
 
+        block.traffic_rule_queues[(ssid, dscp)] = trq
+
         LOG.info("Transmission rule status %s", trq)
 
     def send_caps_request(self):
@@ -892,8 +1015,7 @@ class LVAPPConnection:
 
         LOG.info("Sending caps request to %s", self.wtp.addr)
 
-        msg = CAPS_REQUEST.build(caps_request)
-        self.stream.write(msg)
+        self.send_message(caps_request, CAPS_REQUEST)
 
     def send_lvap_status_request(self):
         """Send a LVAP_STATUS_REQUEST message.
@@ -912,8 +1034,7 @@ class LVAPPConnection:
 
         LOG.info("Sending lvap status request to %s", self.wtp.addr)
 
-        msg = LVAP_STATUS_REQUEST.build(lvap_request)
-        self.stream.write(msg)
+        self.send_message(lvap_request, LVAP_STATUS_REQUEST)
 
     def send_vap_status_request(self):
         """Send a VAP_STATUS_REQUEST message.
@@ -932,8 +1053,7 @@ class LVAPPConnection:
 
         LOG.info("Sending vap status request to %s", self.wtp.addr)
 
-        msg = VAP_STATUS_REQUEST.build(vap_request)
-        self.stream.write(msg)
+        self.send_message(vap_request, VAP_STATUS_REQUEST)
 
     def send_traffic_rule_status_request(self):
         """Send a TRAFFIC_RULE_STATUS_REQUEST message.
@@ -952,8 +1072,7 @@ class LVAPPConnection:
 
         LOG.info("Sending traffic rule status request to %s", self.wtp.addr)
 
-        msg = TRAFFIC_RULE_STATUS_REQUEST.build(lvap_request)
-        self.stream.write(msg)
+        self.send_message(lvap_request, TRAFFIC_RULE_STATUS_REQUEST)
 
     def send_port_status_request(self):
         """Send a PORT_STATUS_REQUEST message.
@@ -972,11 +1091,9 @@ class LVAPPConnection:
 
         LOG.info("Sending port status request to %s", self.wtp.addr)
 
-        msg = PORT_STATUS_REQUEST.build(lvap_request)
-        self.stream.write(msg)
+        self.send_message(lvap_request, PORT_STATUS_REQUEST)
 
-    @classmethod
-    def _handle_status_vap(cls, wtp, status):
+    def _handle_status_vap(self, wtp, status):
         """Handle an incoming STATUS_VAP message.
         Args:
             status, a STATUS_VAP message
@@ -996,14 +1113,18 @@ class LVAPPConnection:
             LOG.info("VAP %s from unknown tenant %s", net_bssid_addr, ssid)
             return
 
-        incoming = ResourceBlock(wtp, EtherAddress(status.hwaddr),
-                                 status.channel, status.band)
+        block = wtp.block_for(EtherAddress(status.hwaddr), status.channel,
+                              status.band)
+
+        if not block:
+            LOG.warning("VAP %s on unknown block. Ignoring.", net_bssid_addr)
+            return
 
         LOG.info("VAP status update from %s", net_bssid_addr)
 
         # If the VAP does not exists, then create a new one
         if net_bssid_addr not in tenant.vaps:
-            vap = VAP(net_bssid_addr, incoming, wtp, tenant)
+            vap = VAP(net_bssid_addr, block, wtp, tenant)
             tenant.vaps[net_bssid_addr] = vap
 
         vap = tenant.vaps[net_bssid_addr]
@@ -1033,8 +1154,7 @@ class LVAPPConnection:
         add_vap.length = add_vap.length + len(vap.ssid)
         LOG.info("Add vap %s", vap)
 
-        msg = ADD_VAP.build(add_vap)
-        self.stream.write(msg)
+        self.send_message(add_vap, ADD_VAP)
 
     def send_del_vap(self, vap):
         """Send a DEL_VAP message.
@@ -1054,8 +1174,7 @@ class LVAPPConnection:
 
         LOG.info("Del vap %s", vap)
 
-        msg = DEL_VAP.build(del_vap)
-        self.stream.write(msg)
+        self.send_message(del_vap, DEL_VAP)
 
     def send_assoc_response(self, lvap):
         """Send a ASSOC_RESPONSE message.
@@ -1073,8 +1192,7 @@ class LVAPPConnection:
                              seq=self.wtp.seq,
                              sta=lvap.addr.to_raw())
 
-        msg = ASSOC_RESPONSE.build(response)
-        self.stream.write(msg)
+        self.send_message(response, ASSOC_RESPONSE)
 
     def send_auth_response(self, lvap):
         """Send a AUTH_RESPONSE message.
@@ -1093,8 +1211,7 @@ class LVAPPConnection:
                              sta=lvap.addr.to_raw(),
                              bssid=lvap.lvap_bssid.to_raw())
 
-        msg = AUTH_RESPONSE.build(response)
-        self.stream.write(msg)
+        self.send_message(response, AUTH_RESPONSE)
 
     def send_probe_response(self, lvap, ssid):
         """Send a PROBE_RESPONSE message.
@@ -1113,8 +1230,7 @@ class LVAPPConnection:
                              sta=lvap.addr.to_raw(),
                              ssid=ssid.to_raw())
 
-        msg = PROBE_RESPONSE.build(response)
-        self.stream.write(msg)
+        self.send_message(response, PROBE_RESPONSE)
 
     def send_del_lvap(self, lvap, target_block=None):
         """Send a DEL_LVAP message.
@@ -1184,8 +1300,7 @@ class LVAPPConnection:
 
         LOG.info("Set tx policy %s", tx_policy)
 
-        msg = SET_PORT.build(set_port)
-        self.stream.write(msg)
+        self.send_message(set_port, SET_PORT)
 
     def send_del_port(self, tx_policy):
         """Send a DEL_PORT message.
@@ -1208,8 +1323,7 @@ class LVAPPConnection:
 
         LOG.info("Del tx policy %s", tx_policy)
 
-        msg = DEL_PORT.build(del_port)
-        self.stream.write(msg)
+        self.send_message(del_port, DEL_PORT)
 
     def send_add_lvap(self, lvap, block, set_mask):
         """Send a ADD_LVAP message.
@@ -1266,5 +1380,4 @@ class LVAPPConnection:
 
         print(add_lvap)
 
-        msg = ADD_LVAP.build(add_lvap)
-        self.stream.write(msg)
+        self.send_message(add_lvap, ADD_LVAP)
@@ -17,6 +17,8 @@
 
 """LVAP Protocol Server."""
 
+import struct
+
 from tornado.tcpserver import TCPServer
 
 from empower.core.pnfpserver import BaseTenantPNFDevHandler
@@ -26,6 +28,15 @@ from empower.core.pnfpserver import PNFPServer
 from empower.core.module import ModuleWorker
 from empower.core.module import ModuleEventWorker
 from empower.lvapp.lvappconnection import LVAPPConnection
+from empower.lvapp.lvappcodec import CODECS
+from empower.lvapp.lvappcodec import CODEC_STRUCT
+from empower.lvapp.lvappcodec import CODEC_TYPES
+from empower.lvapp.lvappcodec import compile_types
+from empower.lvapp.pollaggregator import PollAggregator
+from empower.lvapp.pollaggregator import DEFAULT_WINDOW
+from empower.core.scheduler import get_scheduler
+from empower.core.transmissionpolicy import TxPolicy
+from empower.core.lvap import LVAP
 from empower.persistence.persistence import TblWTP
 from empower.core.wtp import WTP
 
@@ -44,6 +55,16 @@ from empower.main import RUNTIME
 
 DEFAULT_PORT = 4433
 
+# stored policies not accessed for this long (in s) are removed, 0 disables
+DEFAULT_POLICY_IDLE = 600
+
+# how often idle policies are looked for (in ms)
+POLICY_EXPIRE_PERIOD = 60000
+
+# module id field of module responses (after version, type, length, seq)
+MODULE_ID = struct.Struct("!L")
+MODULE_ID_OFFSET = 10
+
 
 class TenantWTPHandler(BaseTenantPNFDevHandler):
     """TenantWTPHandler Handler."""
@@ -79,6 +100,11 @@ class ModuleLVAPPWorker(ModuleWorker):
 
     Keeps track of the currently defined modules for each tenant (events only)
 
+    Responses are checked before being parsed: if the module that generated
+    the request is not active anymore the response is dropped without
+    decoding its body. Several workers can share the same response type, a
+    response is parsed if any of them accepts it.
+
     Attributes:
         module_id: Next module id
         modules: dictionary of modules currently active in this tenant
@@ -88,10 +114,33 @@ class ModuleLVAPPWorker(ModuleWorker):
         ModuleWorker.__init__(self, LVAPPServer.__module__, module, pt_type,
                               pt_packet)
 
+        self.pnfp_server.register_message_gate(self.pt_type,
+                                               self.accept_packet)
         self.pnfp_server.register_message(PT_BYE, None, self.handle_bye)
         self.pnfp_server.register_message(PT_LVAP_LEAVE, None, self.
                                           handle_lvap_leave)
 
+    def to_dict(self):
+        """Return json representation."""
+
+        out = super().to_dict()
+        out['orphans'] = self.pnfp_server.orphans.get(self.pt_type, 0)
+        return out
+
+    def send_request(self, wtp, msg):
+        """Send a poll request to a WTP. Requests are not written directly to
+        the WTP connection but grouped with the other requests due for the
+        same WTP by the server poll aggregator."""
+
+        self.pnfp_server.aggregator.send(wtp.connection, msg)
+
+    def accept_packet(self, frame):
+        """Check if a raw response is addressed to an active module."""
+
+        module_id = MODULE_ID.unpack_from(frame, MODULE_ID_OFFSET)[0]
+
+        return module_id in self.modules
+
     def handle_lvap_leave(self, lvap):
         """LVAP left."""
 
@@ -117,14 +166,38 @@ class ModuleLVAPPWorker(ModuleWorker):
 
 
 class LVAPPServer(PNFPServer, TCPServer):
-    """Exposes the LVAP API."""
+    """Exposes the LVAP API.
+
+    Attributes:
+        codec: the codec used for LVAPP messages, either "struct" (messages
+          with a precompiled codec are parsed and built with it) or
+          "construct" (messages are always parsed and built with construct)
+        codecs: dictionary mapping message names to precompiled codecs
+        aggregator: groups the modules poll requests per WTP
+        policy_idle: transmission policies and traffic rule queues not
+          accessed for this many seconds are removed (0 means never)
+        expired_policies: number of policies removed because idle
+    """
 
     PNFDEV = WTP
     TBL_PNFDEV = TblWTP
+    CONNECTION = LVAPPConnection
+
+    def __init__(self, port, pt_types, pt_types_handlers,
+                 codec=CODEC_STRUCT, poll_window=DEFAULT_WINDOW,
+                 multi_request=False, policy_idle=DEFAULT_POLICY_IDLE):
 
-    def __init__(self, port, pt_types, pt_types_handlers):
+        if codec not in CODEC_TYPES:
+            raise ValueError("Invalid codec %s" % codec)
 
-        PNFPServer.__init__(self, port, pt_types, pt_types_handlers)
+        self.codec = codec
+        self.codecs = CODECS if codec == CODEC_STRUCT else {}
+        self.aggregator = PollAggregator(self, poll_window, multi_request)
+        self.policy_idle = policy_idle
+        self.expired_policies = 0
+
+        PNFPServer.__init__(self, port, compile_types(pt_types, self.codecs),
+                            pt_types_handlers)
         TCPServer.__init__(self)
 
         self.connection = None
@@ -133,6 +206,59 @@ class LVAPPServer(PNFPServer, TCPServer):
 
         self.__assoc_id = 0
 
+        if self.policy_idle > 0:
+            get_scheduler().add_timer(self.expire_policies,
+                                      POLICY_EXPIRE_PERIOD)
+
+    def expire_policies(self):
+        """Remove the idle policies from all the blocks."""
+
+        for wtp in self.pnfdevs.values():
+            for block in wtp.supports:
+                self.expired_policies += \
+                    block.tx_policies.expire(self.policy_idle)
+                self.expired_policies += \
+                    block.traffic_rule_queues.expire(self.policy_idle)
+
+    def policies(self):
+        """Return the number of policies currently stored."""
+
+        out = {'policy_idle': self.policy_idle,
+               'tx_policies': 0,
+               'traffic_rule_queues': 0,
+               'evicted': 0,
+               'expired': self.expired_policies}
+
+        for wtp in self.pnfdevs.values():
+            for block in wtp.supports:
+                out['tx_policies'] += len(block.tx_policies)
+                out['traffic_rule_queues'] += len(block.traffic_rule_queues)
+                out['evicted'] += block.tx_policies.evicted + \
+                    block.traffic_rule_queues.evicted
+
+        return out
+
+    def to_dict(self):
+        """ Return a dict representation of the object. """
+
+        out = super().to_dict()
+        out['codec'] = self.codec
+        out['aggregator'] = self.aggregator
+        out['policies'] = self.policies()
+        out['coalesce_set_port'] = TxPolicy.coalesce
+        out['lvap_refreshes'] = {'sent': LVAP.refreshes,
+                                 'saved': LVAP.refreshes_saved}
+        return out
+
+    def register_message(self, pt_type, parser, handler):
+        """ Register new handler. If a precompiled codec for the parser is
+        available then the codec will be used in place of the parser. """
+
+        if parser:
+            parser = self.codecs.get(parser.name, parser)
+
+        super().register_message(pt_type, parser, handler)
+
     def handle_stream(self, stream, address):
         self.log.info('Incoming connection from %r', address)
         self.connection = LVAPPConnection(stream, address, server=self)
@@ -159,10 +285,31 @@ class LVAPPServer(PNFPServer, TCPServer):
             handler(lvap)
 
 
-def launch(port=DEFAULT_PORT):
+def _to_bool(value):
+    """Parse a boolean command line option (e.g. True, false, 1, no)."""
+
+    if isinstance(value, bool):
+        return value
+
+    if str(value).lower() in ("true", "yes", "on", "1"):
+        return True
+
+    if str(value).lower() in ("false", "no", "off", "0"):
+        return False
+
+    raise ValueError("Invalid boolean %s" % value)
+
+
+def launch(port=DEFAULT_PORT, codec=CODEC_STRUCT, poll_window=DEFAULT_WINDOW,
+           multi_request=False, policy_idle=DEFAULT_POLICY_IDLE,
+           coalesce_set_port=False):
     """Start LVAPP Server Module."""
 
-    server = LVAPPServer(int(port), PT_TYPES, PT_TYPES_HANDLERS)
+    TxPolicy.coalesce = _to_bool(coalesce_set_port)
+
+    server = LVAPPServer(int(port), PT_TYPES, PT_TYPES_HANDLERS, codec,
+                         int(poll_window), _to_bool(multi_request),
+                         int(policy_idle))
 
     rest_server = RUNTIME.components[RESTServer.__module__]
     rest_server.add_handler_class(TenantWTPHandler, server)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Per-WTP aggregation of module poll requests.
+
+Periodic modules (bin_counter, lvap_stats, nif_stats, ...) send their
+requests through the aggregator rather than writing them directly to the
+WTP connection. Requests due within the same aggregation window are grouped
+per connection and sent as one burst at the end of the window.
+
+If multi requests are enabled (opt-in, the agent must support them) every
+burst with more than one request is wrapped in a single MULTI_REQUEST
+message. The agent can then reply with a single MULTI_RESPONSE carrying all
+the responses.
+"""
+
+from construct import Container
+from tornado.ioloop import IOLoop
+
+from empower.lvapp import PT_VERSION
+from empower.lvapp import PT_MULTI_REQUEST
+from empower.lvapp import MULTI_REQUEST
+
+# aggregation window in ms
+DEFAULT_WINDOW = 50
+
+# maximum number of requests in a multi request message
+MAX_REQUESTS = 0xFFFF
+
+
+class PollAggregator:
+    """Groups poll requests per WTP connection.
+
+    Attributes:
+        server: the LVAPP server
+        window: the aggregation window in ms (0 means that requests are
+          grouped only within the current IOLoop iteration)
+        multi_request: if True requests bursts are sent as MULTI_REQUEST
+          messages
+        requests: number of requests received
+        bursts: number of bursts sent
+        multi_requests: number of MULTI_REQUEST messages sent
+        max_burst: largest burst sent
+        dropped: number of requests dropped because the connection was
+          closed
+    """
+
+    def __init__(self, server, window=DEFAULT_WINDOW, multi_request=False):
+
+        self.server = server
+        self.window = int(window)
+        self.multi_request = multi_request
+        self.requests = 0
+        self.bursts = 0
+        self.multi_requests = 0
+        self.max_burst = 0
+        self.dropped = 0
+        self.__pending = {}
+        self.__scheduled = False
+
+    def send(self, connection, msg):
+        """Queue a request for the specified connection."""
+
+        self.requests += 1
+
+        if connection not in self.__pending:
+            self.__pending[connection] = []
+
+        self.__pending[connection].append(msg)
+
+        if self.__scheduled:
+            return
+
+        self.__scheduled = True
+
+        if self.window > 0:
+            IOLoop.current().call_later(self.window / 1000, self.flush)
+        else:
+            IOLoop.current().add_callback(self.flush)
+
+    def flush(self):
+        """Send all the pending requests."""
+
+        self.__scheduled = False
+
+        pending = self.__pending
+        self.__pending = {}
+
+        for connection, msgs in pending.items():
+
+            if connection.stream.closed():
+                self.dropped += len(msgs)
+                continue
+
+            self.bursts += 1
+            self.max_burst = max(self.max_burst, len(msgs))
+
+            if self.multi_request and len(msgs) > 1:
+                for i in range(0, len(msgs), MAX_REQUESTS):
+                    self.__send_multi(connection, msgs[i:i + MAX_REQUESTS])
+            else:
+                for msg in msgs:
+                    connection.write(msg)
+
+            connection.flush()
+
+    def __send_multi(self, connection, msgs):
+        """Wrap a list of requests in a MULTI_REQUEST message."""
+
+        requests = b''.join(msgs)
+
+        multi_request = Container(version=PT_VERSION,
+                                  type=PT_MULTI_REQUEST,
+                                  length=12 + len(requests),
+                                  seq=connection.wtp.seq,
+                                  nb_requests=len(msgs),
+                                  requests=requests)
+
+        parser = self.server.codecs.get(MULTI_REQUEST.name, MULTI_REQUEST)
+        connection.write(parser.build(multi_request))
+
+        self.multi_requests += 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'window': self.window,
+                'multi_request': self.multi_request,
+                'requests': self.requests,
+                'bursts': self.bursts,
+                'multi_requests': self.multi_requests,
+                'max_burst': self.max_burst,
+                'dropped': self.dropped}
@@ -23,7 +23,6 @@ import uuid
 
 from empower.datatypes.etheraddress import EtherAddress
 from empower.restserver.apihandlers import EmpowerAPIHandlerUsers
-from empower.core.resourcepool import ResourceBlock
 
 from empower.main import RUNTIME
 
@@ -118,7 +117,12 @@ class TenantLVAPHandler(EmpowerAPIHandlerUsers):
                     channel = int(block['channel'])
                     band = int(block['band'])
 
-                    r_block = ResourceBlock(wtp, hwaddr, channel, band)
+                    r_block = wtp.block_for(hwaddr, channel, band)
+
+                    if not r_block:
+                        raise ValueError("Invalid block %s/%u/%u" %
+                                         (hwaddr, channel, band))
+
                     pool.append(r_block)
 
                 lvap.blocks = pool
@@ -17,6 +17,8 @@
 
 """Common channel quality and conflict maps module."""
 
+import time
+
 from construct import UBInt8
 from construct import UBInt16
 from construct import UBInt32
@@ -30,6 +32,7 @@ from construct import Array
 from empower.datatypes.etheraddress import EtherAddress
 from empower.core.module import ModulePeriodic
 from empower.core.resourcepool import CQM
+from empower.core.resourcepool import CQMEntry
 from empower.core.resourcepool import ResourceBlock
 from empower.lvapp import PT_VERSION
 
@@ -113,19 +116,14 @@ class Maps(ModulePeriodic):
                 raise ValueError("Missing field: wtp")
 
             # Check if block is valid
-            incoming = ResourceBlock(wtp, EtherAddress(value['hwaddr']),
-                                     int(value['channel']),
-                                     int(value['band']))
-
-            match = [block for block in wtp.supports if block == incoming]
+            block = wtp.block_for(EtherAddress(value['hwaddr']),
+                                  int(value['channel']),
+                                  int(value['band']))
 
-            if not match:
+            if not block:
                 raise ValueError("No block specified")
 
-            if len(match) > 1:
-                raise ValueError("More than one block specified")
-
-            self._block = match[0]
+            self._block = block
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary. """
@@ -171,7 +169,7 @@ class Maps(ModulePeriodic):
                       self.MODULE_NAME, self.block, self.module_id)
 
         msg = POLLER_REQUEST.build(req)
-        wtp.connection.stream.write(msg)
+        self.worker.send_request(wtp, msg)
 
     def handle_response(self, response):
         """Handle an incoming poller response message.
@@ -181,33 +179,44 @@ class Maps(ModulePeriodic):
             None
         """
 
-        # update cache
+        # update the block map and the tenant matrix in place, the map of
+        # this module is a snapshot of the response (the block map is shared
+        # by all the modules polling the block and changes at every response)
         map_entry_block = getattr(self.block, self.MODULE_NAME)
+        matrix = getattr(RUNTIME.tenants[self.tenant_id], self.MODULE_NAME)
 
-        lvap_addrs = [EtherAddress(entry[0]) for entry in response.img_entries]
+        now = time.time()
+        maps = CQM()
 
-        keys = [entry for entry in map_entry_block.keys()]
+        for entry in response.img_entries:
 
-        for key in keys:
-            if key not in lvap_addrs:
-                del map_entry_block[key]
+            addr = EtherAddress(entry[0])
 
-        # update this object
-        self.maps = CQM()
+            maps[addr] = CQMEntry(addr, entry[1], entry[2], entry[3],
+                                  entry[4], entry[5])
 
-        for entry in response.img_entries:
+            value = dict.get(map_entry_block, addr)
 
-            addr = EtherAddress(entry[0])
+            if value is None:
+                map_entry_block[addr] = CQMEntry(addr, entry[1], entry[2],
+                                                 entry[3], entry[4], entry[5])
+            else:
+                value.last_rssi_std = entry[1]
+                value.last_rssi_avg = entry[2]
+                value.last_packets = entry[3]
+                value.hist_packets = entry[4]
+                value.mov_rssi = entry[5]
 
-            value = {'addr': addr,
-                     'last_rssi_std': entry[1],
-                     'last_rssi_avg': entry[2],
-                     'last_packets': entry[3],
-                     'hist_packets': entry[4],
-                     'mov_rssi': entry[5]}
+            matrix.update(addr, self.block, entry[5], now)
 
-            map_entry_block[addr] = value
-            self.maps[addr] = value
+        # drop the stations not reported anymore
+        if len(map_entry_block) != len(maps):
+            for addr in [k for k in map_entry_block if k not in maps]:
+                del map_entry_block[addr]
+                matrix.clear(addr, self.block)
+
+        # update this object
+        self.maps = maps
 
         # call callback
         self.handle_callback(self)
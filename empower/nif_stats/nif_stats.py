@@ -17,6 +17,8 @@
 
 """NIF statistics module."""
 
+import time
+
 from construct import UBInt8
 from construct import UBInt16
 from construct import UBInt32
@@ -153,7 +155,7 @@ class NIFStats(ModulePeriodic):
                       lvap.addr, lvap.wtp.addr, self.module_id)
 
         msg = NIF_STATS_REQUEST.build(nif_req)
-        lvap.wtp.connection.stream.write(msg)
+        self.worker.send_request(lvap.wtp, msg)
 
     def handle_response(self, response):
         """Handle an incoming NIF_STATS_RESPONSE message.
@@ -191,6 +193,14 @@ class NIFStats(ModulePeriodic):
         self.best_prob = \
             max([k for k, v in self.rates.items() if v['prob'] == max_val])
 
+        now = time.time()
+
+        for rate, value in self.rates.items():
+            for metric, sample in value.items():
+                self.record(self.lvap, "%s[%s]" % (metric, rate), sample, now)
+
+        self.record(self.lvap, "best_prob", self.best_prob, now)
+
         # call callback
         self.handle_callback(self)
 
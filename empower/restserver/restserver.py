@@ -24,6 +24,11 @@ from tornado.web import MissingArgumentError
 from uuid import UUID
 from empower import settings
 from empower.core.service import Service
+from empower.core.scheduler import get_scheduler
+from empower.core.sink import get_sinks
+from empower.core.sink import get_sink_by_id
+from empower.core.sink import POLICIES
+from empower.core.timeseries import get_timeseries
 from empower.core.account import ROLE_ADMIN, ROLE_USER
 from empower.restserver.apihandlers import EmpowerAPIHandler
 from empower.restserver.apihandlers import EmpowerAPIHandlerUsers
@@ -812,6 +817,187 @@ class ComponentsHandler(EmpowerAPIHandler):
         self.set_status(201, None)
 
 
+class SchedulerHandler(EmpowerAPIHandler):
+    """Scheduler handler. Used to view the periodic timers statistics."""
+
+    HANDLERS = [r"/api/v1/scheduler/?"]
+
+    def get(self, *args):
+        """ Return the statistics of the periodic timers scheduler.
+
+        Example URLs:
+
+            GET /api/v1/scheduler
+
+        """
+
+        try:
+
+            if len(args) > 0:
+                raise ValueError("Invalid url")
+
+            self.write_as_json(get_scheduler().to_dict())
+
+        except ValueError as ex:
+            self.send_error(400, message=ex)
+
+
+class SinksHandler(EmpowerAPIHandler):
+    """Sinks handler. Used to view and configure the remote callback sinks.
+    """
+
+    HANDLERS = [r"/api/v1/sinks/?",
+                r"/api/v1/sinks/([0-9]*)/?"]
+
+    def get(self, *args):
+        """ Return the statistics of the remote callback sinks.
+
+        Args:
+            sink_id: the id of a sink
+
+        Example URLs:
+
+            GET /api/v1/sinks
+            GET /api/v1/sinks/1
+
+        """
+
+        try:
+
+            if len(args) > 1:
+                raise ValueError("Invalid url")
+
+            if len(args) == 0:
+                self.write_as_json(get_sinks())
+            else:
+                self.write_as_json(get_sink_by_id(int(args[0])))
+
+        except ValueError as ex:
+            self.send_error(400, message=ex)
+        except KeyError as ex:
+            self.send_error(404, message=ex)
+
+    def put(self, *args):
+        """ Update the dispatch parameters of a sink.
+
+        Args:
+            sink_id: the id of a sink
+
+        Request:
+            version: protocol version (1.0)
+            params: dictionary of parameters, any of max_concurrency,
+                    max_queue, and policy (drop_oldest, drop_newest,
+                    coalesce)
+
+        Example URLs:
+
+            PUT /api/v1/sinks/1
+            {
+              "version" : 1.0,
+              "params" : { "max_queue": 500, "policy": "coalesce" }
+            }
+
+        """
+
+        try:
+
+            if len(args) != 1:
+                raise ValueError("Invalid url")
+
+            request = tornado.escape.json_decode(self.request.body)
+
+            if "version" not in request:
+                raise ValueError("missing version element")
+
+            if "params" not in request:
+                raise ValueError("missing params element")
+
+            sink = get_sink_by_id(int(args[0]))
+            params = request['params']
+
+            for param in params:
+                if param not in ('max_concurrency', 'max_queue', 'policy'):
+                    raise ValueError("Invalid param %s" % param)
+
+            policy = params.get('policy', sink.policy)
+            max_concurrency = int(params.get('max_concurrency',
+                                             sink.max_concurrency))
+            max_queue = int(params.get('max_queue', sink.max_queue))
+
+            if policy not in POLICIES:
+                raise ValueError("Invalid policy %s" % policy)
+
+            if max_concurrency < 1:
+                raise ValueError("Invalid max_concurrency %d" %
+                                 max_concurrency)
+
+            if max_queue < 0:
+                raise ValueError("Invalid max_queue %d" % max_queue)
+
+            sink.policy = policy
+            sink.max_concurrency = max_concurrency
+            sink.max_queue = max_queue
+
+        except ValueError as ex:
+            self.send_error(400, message=ex)
+        except KeyError as ex:
+            self.send_error(404, message=ex)
+
+        self.set_status(204, None)
+
+
+class TimeSeriesHandler(EmpowerAPIHandler):
+    """Time series handler. Used to query the statistics time series."""
+
+    HANDLERS = [r"/api/v1/timeseries/?"]
+
+    def get(self, *args):
+        """ Return the time series matching the query.
+
+        Query arguments:
+            module: the module type (e.g. bin_counter)
+            entity: the measured entity (e.g. an LVAP address)
+            metric: the metric name
+            window: only the samples taken in the last window seconds
+
+        Example URLs:
+
+            GET /api/v1/timeseries
+            GET /api/v1/timeseries?module=lvap_stats&metric=best_prob
+            GET /api/v1/timeseries?entity=00:18:DE:CC:D3:40&window=10
+
+        """
+
+        try:
+
+            if len(args) > 0:
+                raise ValueError("Invalid url")
+
+            window = self.get_argument("window", None)
+
+            if window is not None:
+                window = float(window)
+
+            store = get_timeseries()
+            matches = store.query(self.get_argument("module", None),
+                                  self.get_argument("entity", None),
+                                  self.get_argument("metric", None))
+
+            out = []
+
+            for (module, entity, metric), series in sorted(matches.items()):
+                entry = series.to_dict(window)
+                entry['module'] = module
+                entry['entity'] = entity
+                entry['metric'] = metric
+                out.append(entry)
+
+            self.write_as_json(out)
+
+        except ValueError as ex:
+            self.send_error(400, message=ex)
+
+
 class PendingTenantHandler(EmpowerAPIHandler):
     """Pending Tenant handler. Used to view and manipulate tenant requests."""
 
@@ -1450,7 +1636,8 @@ class RESTServer(Service, tornado.web.Application):
                            ComponentsHandler, TenantComponentsHandler,
                            PendingTenantHandler, TenantHandler,
                            AllowHandler, DenyHandler, IMSI2MACHandler,
-                           TenantTrafficRuleHandler]
+                           TenantTrafficRuleHandler, SchedulerHandler,
+                           SinksHandler, TimeSeriesHandler]
 
         for handler_class in handler_classes:
             self.add_handler_class(handler_class, http_server)
@@ -27,7 +27,6 @@ from construct import UBInt16
 from construct import UBInt32
 from construct import Bytes
 
-from empower.core.resourcepool import ResourceBlock
 from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.lvapp import PT_VERSION
 from empower.core.app import EmpowerApp
@@ -211,7 +210,7 @@ class RSSI(ModuleTrigger):
         self.wtps.append(wtp)
 
         msg = ADD_RSSI_TRIGGER.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def remove_rssi_from_wtp(self, wtp):
         """Remove RSSI to WTP."""
@@ -234,7 +233,7 @@ class RSSI(ModuleTrigger):
         self.wtps.remove(wtp)
 
         msg = DEL_RSSI_TRIGGER.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, message):
         """ Handle an incoming RSSI_TRIGGER message.
@@ -257,12 +256,13 @@ class RSSI(ModuleTrigger):
         hwaddr = EtherAddress(message.hwaddr)
         channel = message.channel
         band = message.band
-        incoming = ResourceBlock(wtp, hwaddr, channel, band)
+        block = wtp.block_for(hwaddr, channel, band)
 
-        match = [block for block in wtp.supports if block == incoming]
+        if not block:
+            return
 
         self.event = \
-            {'block': matches[0],
+            {'block': block,
              'timestamp': datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
              'current': message.current}
 
@@ -17,6 +17,8 @@
 
 """Traffic rules statistics module."""
 
+import time
+
 from construct import UBInt8
 from construct import UBInt16
 from construct import UBInt32
@@ -125,19 +127,14 @@ class TRQStats(ModulePeriodic):
                 raise ValueError("Missing field: wtp")
 
             # Check if block is valid
-            incoming = ResourceBlock(wtp, EtherAddress(value['hwaddr']),
-                                     int(value['channel']),
-                                     int(value['band']))
-
-            match = [block for block in wtp.supports if block == incoming]
+            block = wtp.block_for(EtherAddress(value['hwaddr']),
+                                  int(value['channel']),
+                                  int(value['band']))
 
-            if not match:
+            if not block:
                 raise ValueError("No block specified")
 
-            if len(match) > 1:
-                raise ValueError("More than one block specified")
-
-            self._block = match[0]
+            self._block = block
 
     def to_dict(self):
         """ Return a JSON-serializable."""
@@ -186,7 +183,7 @@ class TRQStats(ModulePeriodic):
                               ssid=tenant.tenant_name.to_raw())
 
         msg = TRQ_STATS_REQUEST.build(stats_req)
-        wtp.connection.stream.write(msg)
+        self.worker.send_request(wtp, msg)
 
     def handle_response(self, response):
         """Handle an incoming TRQ_STATS_RESPONSE message.
@@ -204,6 +201,12 @@ class TRQStats(ModulePeriodic):
             'max_queue_length': response.max_queue_length,
         }
 
+        now = time.time()
+        entity = "%s/%s" % (self.block.hwaddr, self.dscp)
+
+        for metric, value in self.trq_stats.items():
+            self.record(entity, metric, value, now)
+
         # call callback
         self.handle_callback(self)
 
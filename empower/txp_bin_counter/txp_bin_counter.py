@@ -29,6 +29,7 @@ from construct import Array
 from empower.datatypes.etheraddress import EtherAddress
 from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.core.module import ModulePeriodic
+from empower.core.binning import Binner
 from empower.core.app import EmpowerApp
 from empower.core.resourcepool import ResourceBlock
 from empower.lvapp import PT_VERSION
@@ -157,19 +158,14 @@ class TXPBinCounter(ModulePeriodic):
                 raise ValueError("Missing field: wtp")
 
             # Check if block is valid
-            incoming = ResourceBlock(wtp, EtherAddress(value['hwaddr']),
-                                     int(value['channel']),
-                                     int(value['band']))
+            block = wtp.block_for(EtherAddress(value['hwaddr']),
+                                  int(value['channel']),
+                                  int(value['band']))
 
-            match = [block for block in wtp.supports if block == incoming]
-
-            if not match:
+            if not block:
                 raise ValueError("No block specified")
 
-            if len(match) > 1:
-                raise ValueError("More than one block specified")
-
-            self._block = match[0]
+            self._block = block
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the Stats """
@@ -220,12 +216,12 @@ class TXPBinCounter(ModulePeriodic):
                       self.module_id)
 
         msg = TXP_BIN_COUNTER_REQUEST.build(stats_req)
-        wtp.connection.stream.write(msg)
+        self.worker.send_request(wtp, msg)
 
     def fill_bytes_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -234,25 +230,12 @@ class TXPBinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if len(entry) == 0:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + size * count
-                    break
-
-        return out
+        return Binner(self.bins).fill(data)[0]
 
     def fill_packets_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -261,20 +244,7 @@ class TXPBinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if len(entry) == 0:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + count
-                    break
-
-        return out
+        return Binner(self.bins).fill(data)[1]
 
     def handle_response(self, response):
         """Handle an incoming STATS_RESPONSE message.
@@ -285,8 +255,8 @@ class TXPBinCounter(ModulePeriodic):
         """
 
         # update this object
-        self.tx_bytes = self.fill_bytes_samples(response.stats)
-        self.tx_packets = self.fill_packets_samples(response.stats)
+        self.tx_bytes, self.tx_packets = \
+            Binner(self.bins).fill(response.stats)
 
         # call callback
         self.handle_callback(self)
@@ -20,7 +20,6 @@
 import random
 import uuid
 import time
-import tornado.ioloop
 
 from construct import Container
 
@@ -48,6 +47,7 @@ from empower.vbsp import UE_REPORT_REQUEST
 from empower.vbsp import EP_OPERATION_SUCCESS
 from empower.vbsp import EP_ACT_HANDOVER
 from empower.core.utils import hex_to_ether
+from empower.core.scheduler import get_scheduler
 from empower.core.utils import ether_to_hex
 from empower.core.utils import get_xid
 from empower.core.vbs import Cell
@@ -82,9 +82,8 @@ class VBSPConnection:
         self.stream.set_close_callback(self._on_disconnect)
         self.__buffer = b''
         self._hb_interval_ms = 500
-        self._hb_worker = tornado.ioloop.PeriodicCallback(self._heartbeat_cb,
-                                                          self._hb_interval_ms)
-        self._hb_worker.start()
+        self._hb_worker = get_scheduler().add_timer(self._heartbeat_cb,
+                                                    self._hb_interval_ms)
         self._wait()
         self.log = empower.logger.get_logger()
 
@@ -184,6 +183,8 @@ class VBSPConnection:
     def _on_disconnect(self):
         """ Handle VBS disconnection """
 
+        self._hb_worker.cancel()
+
         if not self.vbs:
             return
 
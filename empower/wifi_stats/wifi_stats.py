@@ -15,7 +15,22 @@
 # specific language governing permissions and limitations
 # under the License.
 
-""" WiFi Stats module. """
+""" WiFi Stats module.
+
+The channel utilization samples of a WiFi stats response are decoded into
+columns (one typed array for the entries types, one for the timestamps, and
+one for the samples) for each metric (tx, rx, and ed). When the struct codec
+is in use the columns are unpacked directly from the receive buffer without
+creating a Python object per entry. Summaries (mean and percentiles) are
+computed on demand and the per-entry JSON representation is built only when
+the module is serialized.
+"""
+
+import math
+import time
+import struct
+
+from array import array
 
 from construct import UBInt8
 from construct import UBInt16
@@ -34,6 +49,9 @@ from empower.core.module import ModulePeriodic
 from empower.core.resourcepool import CQM
 from empower.core.resourcepool import ResourceBlock
 from empower.lvapp import PT_VERSION
+from empower.lvapp.lvappcodec import Codec
+from empower.lvapp.lvappcodec import SEQ
+from empower.lvapp.lvappcodec import register_codec
 
 from empower.main import RUNTIME
 
@@ -63,6 +81,142 @@ WIFI_STATS_RESPONSE = Struct("wifi_stats_response", UBInt8("version"),
                              UBInt16("nb_entries"),
                              Array(lambda ctx: ctx.nb_entries, ENTRY_TYPE))
 
+# samples are reported as fractions of 180
+SAMPLE_SCALE = 180.0
+
+# number of entries for each metric (tx, rx, ed)
+NB_METRIC_ENTRIES = 100
+
+METRICS = ['tx', 'rx', 'ed']
+
+PERCENTILES = [50, 90, 99]
+
+
+class WiFiSamples:
+    """Columnar channel utilization samples of one metric.
+
+    Attributes:
+        types: the entries types
+        timestamps: the entries timestamps
+        samples: the raw samples (fractions of SAMPLE_SCALE)
+    """
+
+    __slots__ = ('types', 'timestamps', 'samples', '_summary')
+
+    def __init__(self, types=None, timestamps=None, samples=None):
+
+        self.types = types if types is not None else array('B')
+        self.timestamps = timestamps if timestamps is not None else array('L')
+        self.samples = samples if samples is not None else array('L')
+        self._summary = None
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build the columns from a list of [type, timestamp, sample]."""
+
+        return cls(array('B', [entry[0] for entry in entries]),
+                   array('L', [entry[1] for entry in entries]),
+                   array('L', [entry[2] for entry in entries]))
+
+    def __len__(self):
+        return len(self.samples)
+
+    def mean(self):
+        """Return the mean utilization."""
+
+        if not self.samples:
+            return None
+
+        return sum(self.samples) / len(self.samples) / SAMPLE_SCALE
+
+    def summary(self):
+        """Return the mean, minimum, maximum, and percentiles of the
+        utilization."""
+
+        if self._summary is not None:
+            return self._summary
+
+        if not self.samples:
+            self._summary = {'count': 0}
+            return self._summary
+
+        ordered = sorted(self.samples)
+        count = len(ordered)
+
+        self._summary = {'count': count,
+                         'mean': self.mean(),
+                         'min': ordered[0] / SAMPLE_SCALE,
+                         'max': ordered[-1] / SAMPLE_SCALE}
+
+        for pct in PERCENTILES:
+            index = max(0, math.ceil(pct / 100 * count) - 1)
+            self._summary['p%u' % pct] = ordered[index] / SAMPLE_SCALE
+
+        return self._summary
+
+    def to_list(self):
+        """Return the samples as a list of dictionaries."""
+
+        return [{'type': etype,
+                 'timestamp': timestamp,
+                 'sample': sample / SAMPLE_SCALE}
+                for etype, timestamp, sample in
+                zip(self.types, self.timestamps, self.samples)]
+
+
+class WiFiStatsEntries:
+    """The entries of a WiFi stats response, decoded into WiFiSamples
+    columns. Sets the tx, rx, and ed attributes of the message."""
+
+    ENTRY = "BLL"
+
+    def __init__(self):
+        self.__layouts = {}
+
+    def __layout(self, count):
+        """Return the struct layout for count entries."""
+
+        if count not in self.__layouts:
+            self.__layouts[count] = struct.Struct("!" + self.ENTRY * count)
+
+        return self.__layouts[count]
+
+    def parse(self, msg, buf, offset, end):
+        """Decode field."""
+
+        values = self.__layout(msg.nb_entries).unpack_from(buf, offset)
+
+        types = array('B', values[0::3])
+        timestamps = array('L', values[1::3])
+        samples = array('L', values[2::3])
+
+        for index, metric in enumerate(METRICS):
+            start = index * NB_METRIC_ENTRIES
+            stop = start + NB_METRIC_ENTRIES
+            msg.__dict__[metric] = WiFiSamples(types[start:stop],
+                                               timestamps[start:stop],
+                                               samples[start:stop])
+
+    def build(self, msg):
+        """Encode field."""
+
+        accum = []
+
+        for metric in METRICS:
+            columns = getattr(msg, metric)
+            for entry in zip(columns.types, columns.timestamps,
+                             columns.samples):
+                accum.append(struct.pack("!" + self.ENTRY, *entry))
+
+        return b''.join(accum)
+
+
+WIFI_STATS_CODEC = Codec("wifi_stats_response",
+                         SEQ + ('module_id', 'wtp', 'nb_entries'),
+                         "BBLLL6sH", tail=WiFiStatsEntries())
+
+register_codec(WIFI_STATS_CODEC)
+
 
 class WiFiStats(ModulePeriodic):
     """ A maps poller. """
@@ -78,7 +232,9 @@ class WiFiStats(ModulePeriodic):
         self._block = None
 
         # data structures
-        self.wifi_stats = {}
+        self.tx = WiFiSamples()
+        self.rx = WiFiSamples()
+        self.ed = WiFiSamples()
 
     def __eq__(self, other):
         return super().__eq__(other) and self.block == other.block
@@ -111,24 +267,26 @@ class WiFiStats(ModulePeriodic):
                 raise ValueError("Missing field: wtp")
 
             # Check if block is valid
-            incoming = ResourceBlock(wtp, EtherAddress(value['hwaddr']),
-                                     int(value['channel']),
-                                     int(value['band']))
-
-            match = [block for block in wtp.supports if block == incoming]
+            block = wtp.block_for(EtherAddress(value['hwaddr']),
+                                  int(value['channel']),
+                                  int(value['band']))
 
-            if not match:
+            if not block:
                 raise ValueError("No block specified")
 
-            if len(match) > 1:
-                raise ValueError("More than one block specified")
-
-            self._block = match[0]
+            self._block = block
 
         else:
 
             raise ValueError("Invalid block")
 
+    @property
+    def wifi_stats(self):
+        """Return the samples as a dictionary of lists of dictionaries."""
+
+        return {metric: getattr(self, metric).to_list()
+                for metric in METRICS}
+
     def to_dict(self):
         """ Return a JSON-serializable dictionary. """
 
@@ -173,7 +331,7 @@ class WiFiStats(ModulePeriodic):
                       self.MODULE_NAME, self.block, self.module_id)
 
         msg = WIFI_STATS_REQUEST.build(req)
-        wtp.connection.stream.write(msg)
+        self.worker.send_request(wtp, msg)
 
     def handle_response(self, response):
         """Handle an incoming poller response message.
@@ -184,35 +342,24 @@ class WiFiStats(ModulePeriodic):
         """
 
         # update this object
-        self.wifi_stats = {}
-
-        tx = response.entries[0:100]
-        rx = response.entries[100:200]
-        ed = response.entries[200:300]
-
-        self.wifi_stats['tx'] = []
-
-        for entry in tx:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['tx'].append(value)
-
-        self.wifi_stats['rx'] = []
-
-        for entry in rx:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['rx'].append(value)
+        if 'entries' in response:
+            # construct parser, entries are lists
+            for index, metric in enumerate(METRICS):
+                start = index * NB_METRIC_ENTRIES
+                stop = start + NB_METRIC_ENTRIES
+                setattr(self, metric, WiFiSamples.from_entries(
+                    response.entries[start:stop]))
+        else:
+            self.tx = response.tx
+            self.rx = response.rx
+            self.ed = response.ed
 
-        self.wifi_stats['ed'] = []
+        now = time.time()
 
-        for entry in ed:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['ed'].append(value)
+        for metric in METRICS:
+            value = getattr(self, metric).mean()
+            if value is not None:
+                self.record(self.block.hwaddr, metric, value, now)
 
         # call callback
         self.handle_callback(self)
@@ -34,6 +34,7 @@ from empower.lvapp.lvappserver import LVAPPServer
 from empower.datatypes.etheraddress import EtherAddress
 from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.core.module import ModulePeriodic
+from empower.core.binning import Binner
 from empower.core.app import EmpowerApp
 
 from empower.main import RUNTIME
@@ -208,7 +209,7 @@ class WTPBinCounter(ModulePeriodic):
                               module_id=self.module_id)
 
         msg = WTP_STATS_REQUEST.build(stats_req)
-        wtp.connection.stream.write(msg)
+        self.worker.send_request(wtp, msg)
 
     def update_stats(self, delta, last, current):
         """Update stats."""
@@ -228,67 +229,37 @@ class WTPBinCounter(ModulePeriodic):
 
         return stats
 
-    def fill_packets_sample(self, values):
-
-        out = {}
-
-        for value in values:
-            lvap = EtherAddress(value[0])
-            if lvap not in out:
-                out[lvap] = []
-            out[lvap].append([value[1], value[2]])
-
-        for lvap in out.keys():
-
-            data = out[lvap]
-
-            samples = sorted(data, key=lambda entry: entry[0])
-            new_out = [0] * len(self.bins)
-
-            for entry in samples:
-                if len(entry) == 0:
-                    continue
-                size = entry[0]
-                count = entry[1]
-                for i in range(0, len(self.bins)):
-                    if size <= self.bins[i]:
-                        new_out[i] = new_out[i] + count
-                        break
+    def fill_samples(self, values):
+        """ Compute samples.
 
-            out[lvap] = new_out
+        Samples are in the following format:
 
-        return out
+        [[lvap, 60, 3], [lvap, 66, 2], [lvap, 1466, 1762]]
 
-    def fill_bytes_sample(self, values):
+        Each 3-tuple has format [ lvap, size, count ] where count is the
+        number of size-long (bytes, including the Ethernet 2 header) TX/RX by
+        the LVAP. The samples of all the LVAPs are binned in one pass.
 
-        out = {}
+        Returns a (bytes, packets) tuple of dicts mapping each LVAP to its
+        bins.
+        """
 
-        for value in values:
-            lvap = EtherAddress(value[0])
-            if lvap not in out:
-                out[lvap] = []
-            out[lvap].append([value[1], value[2]])
+        out_bytes, out_packets = Binner(self.bins).fill_by_key(values)
 
-        for lvap in out.keys():
+        lvaps = {raw: EtherAddress(raw) for raw in out_bytes}
 
-            data = out[lvap]
+        return ({lvaps[raw]: value for raw, value in out_bytes.items()},
+                {lvaps[raw]: value for raw, value in out_packets.items()})
 
-            samples = sorted(data, key=lambda entry: entry[0])
-            new_out = [0] * len(self.bins)
+    def fill_packets_sample(self, values):
+        """ Compute packets samples. """
 
-            for entry in samples:
-                if len(entry) == 0:
-                    continue
-                size = entry[0]
-                count = entry[1]
-                for i in range(0, len(self.bins)):
-                    if size <= self.bins[i]:
-                        new_out[i] = new_out[i] + size * count
-                        break
+        return self.fill_samples(values)[1]
 
-            out[lvap] = new_out
+    def fill_bytes_sample(self, values):
+        """ Compute bytes samples. """
 
-        return out
+        return self.fill_samples(values)[0]
 
     def handle_response(self, response):
         """Handle an incoming STATS_RESPONSE message.
@@ -299,7 +270,7 @@ class WTPBinCounter(ModulePeriodic):
         """
 
         tx_samples = response.stats[0:response.nb_tx]
-        rx_samples = response.stats[response.nb_tx:-1]
+        rx_samples = response.stats[response.nb_tx:]
 
         old_tx_bytes = self.tx_bytes
         old_rx_bytes = self.rx_bytes
@@ -307,11 +278,8 @@ class WTPBinCounter(ModulePeriodic):
         old_tx_packets = self.tx_packets
         old_rx_packets = self.rx_packets
 
-        self.tx_bytes = self.fill_bytes_sample(tx_samples)
-        self.rx_bytes = self.fill_bytes_sample(rx_samples)
-
-        self.tx_packets = self.fill_packets_sample(tx_samples)
-        self.rx_packets = self.fill_packets_sample(rx_samples)
+        self.tx_bytes, self.tx_packets = self.fill_samples(tx_samples)
+        self.rx_bytes, self.rx_packets = self.fill_samples(rx_samples)
 
         if self.last:
             delta = time.time() - self.last
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""WTP agent stand-in.
+
+The agent replaces the IOStream of a WTP connection: the messages written by
+the controller are split and answered by the responder registered for their
+type, the responses are fed back to the connection when reply() is called.
+MULTI_REQUEST messages are unpacked and, if multi responses are enabled,
+answered with a single MULTI_RESPONSE carrying all the responses.
+
+    agent = Agent(wtp.addr.to_raw())
+    agent.responders[PT_POLLER_REQUEST] = agent.poller_response
+    wtp.connection = LVAPPConnection(agent, addr, server)
+    agent.connection = wtp.connection
+"""
+
+import time
+import struct
+
+from construct import Container
+
+from empower.lvapp import PT_VERSION
+from empower.lvapp import PT_MULTI_REQUEST
+from empower.lvapp import PT_MULTI_RESPONSE
+from empower.lvapp import MULTI_RESPONSE
+from empower.maps.maps import POLLER_RESPONSE
+
+HEADER = struct.Struct("!BBL")
+
+# module id field of module requests (after version, type, length, seq)
+MODULE_ID = struct.Struct("!L")
+MODULE_ID_OFFSET = 10
+
+
+class Agent:
+    """A WTP agent answering poll requests.
+
+    Attributes:
+        wtp: the WTP address (raw)
+        connection: the controller side of the connection
+        responders: dictionary mapping request types to callables receiving
+          the raw request and returning the raw response (or None)
+        multi_response: if True MULTI_REQUEST messages are answered with a
+          single MULTI_RESPONSE message
+        writes: number of writes received
+        messages: number of messages received
+        requests: number of requests answered
+        multi_requests: number of MULTI_REQUEST messages received
+        responses: number of messages sent back to the controller
+        busy: time spent by the agent answering requests (in s)
+    """
+
+    def __init__(self, wtp, multi_response=True):
+
+        self.wtp = wtp
+        self.connection = None
+        self.responders = {}
+        self.multi_response = multi_response
+        self.writes = 0
+        self.messages = 0
+        self.requests = 0
+        self.multi_requests = 0
+        self.responses = 0
+        self.busy = 0.0
+        self.__outbox = []
+        self.__closed = False
+
+    def set_nodelay(self, value):
+        """Set TCP_NODELAY."""
+
+        pass
+
+    def set_close_callback(self, callback):
+        """Set the close callback."""
+
+        pass
+
+    def read_bytes(self, num_bytes, callback, partial=False):
+        """Read bytes (responses are delivered by reply)."""
+
+        pass
+
+    def closed(self):
+        """Return True if the stream is closed."""
+
+        return self.__closed
+
+    def close(self):
+        """Close the stream."""
+
+        self.__closed = True
+
+    def write(self, data):
+        """Receive a write from the controller."""
+
+        start = time.process_time()
+
+        self.writes += 1
+        self.__outbox.extend(self.__answer(memoryview(data)))
+
+        self.busy += time.process_time() - start
+
+    def __split(self, data):
+        """Return the messages in a buffer."""
+
+        offset = 0
+
+        while offset < len(data):
+            _, _, length = HEADER.unpack_from(data, offset)
+            yield data[offset:offset + length]
+            offset += length
+
+    def __answer(self, data):
+        """Return the responses to the messages in a buffer."""
+
+        out = []
+
+        for frame in self.__split(data):
+
+            self.messages += 1
+
+            msg_type = frame[1]
+
+            if msg_type == PT_MULTI_REQUEST:
+                self.multi_requests += 1
+                responses = self.__answer(frame[12:])
+                if self.multi_response and responses:
+                    out.append(self.multi_response_msg(responses))
+                else:
+                    out.extend(responses)
+                continue
+
+            if msg_type not in self.responders:
+                continue
+
+            response = self.responders[msg_type](frame)
+
+            if response is not None:
+                self.requests += 1
+                out.append(response)
+
+        return out
+
+    def multi_response_msg(self, responses):
+        """Return a MULTI_RESPONSE message carrying the responses."""
+
+        nb_responses = len(responses)
+        responses = b''.join(responses)
+
+        return MULTI_RESPONSE.build(Container(version=PT_VERSION,
+                                              type=PT_MULTI_RESPONSE,
+                                              length=18 + len(responses),
+                                              seq=0,
+                                              wtp=self.wtp,
+                                              nb_responses=nb_responses,
+                                              responses=responses))
+
+    def poller_response(self, frame, pt_type=None, nb_entries=0):
+        """Answer a request with a poller response carrying nb_entries
+        entries. The response type is the request type plus one, unless
+        specified."""
+
+        if pt_type is None:
+            pt_type = frame[1] + 1
+
+        module_id = MODULE_ID.unpack_from(frame, MODULE_ID_OFFSET)[0]
+
+        entries = [[bytes([0, 0, 0, 0, 0, i % 256]), 0, -60, 10, 100, -61]
+                   for i in range(nb_entries)]
+
+        return POLLER_RESPONSE.build(Container(version=PT_VERSION,
+                                               type=pt_type,
+                                               length=22 + 17 * nb_entries,
+                                               seq=0,
+                                               module_id=module_id,
+                                               wtp=self.wtp,
+                                               nb_entries=nb_entries,
+                                               img_entries=entries))
+
+    def reply(self):
+        """Send the pending responses to the controller with a single
+        read."""
+
+        if not self.__outbox:
+            return
+
+        outbox = self.__outbox
+        self.__outbox = []
+
+        self.responses += len(outbox)
+        self.connection._on_read(b''.join(outbox))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Packet size binning benchmark.
+
+The Binner is compared with the loops previously used by the bin counter
+modules (old_fill and old_fill_by_lvap, kept in test_binning.py). Both the
+bytes and the packets bins are computed, as done on every stats response:
+
+    fill: the samples of each LVAP are binned separately (bin counter)
+    fill_by_key: the samples of all the LVAPs are binned at once (WTP bin
+      counter, including the EtherAddress conversion of fill_samples)
+
+Times are in ms per run (best of --repeat runs).
+
+Usage:
+
+    python3 tests/bench_binning.py [--lvaps 1000 10000] [--samples 8]
+        [--repeat 5]
+"""
+
+import random
+import timeit
+import argparse
+
+# sets up the path
+import conftest  # pylint: disable=unused-import
+
+from empower.core.binning import Binner
+from empower.wtp_bin_counter.wtp_bin_counter import WTPBinCounter
+
+from test_binning import BINS
+from test_binning import old_fill
+from test_binning import old_fill_by_lvap
+
+
+def build_samples(nb_lvaps, nb_samples, seed=0):
+    """Return nb_samples random [size, count] samples for each LVAP."""
+
+    rnd = random.Random(seed)
+
+    return {bytes([0x04, 0xF0, 0x21, index >> 16 & 0xFF,
+                   index >> 8 & 0xFF, index & 0xFF]):
+            [[rnd.randint(60, 1514), rnd.randint(1, 100)]
+             for _ in range(nb_samples)]
+            for index in range(nb_lvaps)}
+
+
+def measure(test, repeat):
+    """Return the ms per call of test."""
+
+    return min(timeit.repeat(test, number=1, repeat=repeat)) * 1e3
+
+
+def bench(nb_lvaps, nb_samples, repeat):
+    """Return the old and new times of fill and fill_by_key."""
+
+    lvaps = build_samples(nb_lvaps, nb_samples)
+    samples = [(lvap, size, count) for lvap, data in lvaps.items()
+               for size, count in data]
+
+    binner = Binner(BINS)
+    module = WTPBinCounter()
+    module.bins = BINS
+
+    def old_per_lvap():
+        """Bin each LVAP with the old loop."""
+
+        for data in lvaps.values():
+            old_fill(BINS, data, True)
+            old_fill(BINS, data, False)
+
+    def new_per_lvap():
+        """Bin each LVAP with the Binner."""
+
+        for data in lvaps.values():
+            binner.fill(data)
+
+    def old_by_lvap():
+        """Bin all the LVAPs with the old loop."""
+
+        old_fill_by_lvap(BINS, samples, True)
+        old_fill_by_lvap(BINS, samples, False)
+
+    def new_by_lvap():
+        """Bin all the LVAPs with the WTP bin counter."""
+
+        module.fill_samples(samples)
+
+    return [("fill", measure(old_per_lvap, repeat),
+             measure(new_per_lvap, repeat)),
+            ("fill_by_key", measure(old_by_lvap, repeat),
+             measure(new_by_lvap, repeat))]
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Binning benchmark")
+    parser.add_argument("--lvaps", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--samples", type=int, default=8,
+                        help="samples per LVAP")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("%u bins, %u samples per LVAP, ms/run" % (len(BINS), args.samples))
+
+    for nb_lvaps in args.lvaps:
+        for name, old, new in bench(nb_lvaps, args.samples, args.repeat):
+            print("%6u LVAPs  %-12s old %8.2f  new %8.2f  (%.1fx)" %
+                  (nb_lvaps, name, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EtherAddress benchmark.
+
+Compares the interned EtherAddress with the previous implementation (kept
+below as OldEtherAddress) on the operations of the hot paths:
+
+    construct (str): parse a string address
+    construct (raw): wrap 6 raw bytes (e.g. from a message)
+    hash: hash an address
+    eq: compare two equal addresses
+    str: format an address
+    dict lookup: look up an address in a dict keyed by addresses
+
+Times are in ns per operation (best of --repeat runs).
+
+Usage:
+
+    python3 tests/bench_etheraddress.py [--addresses 1000] [--repeat 5]
+"""
+
+import timeit
+import argparse
+
+# sets up the path
+import conftest  # pylint: disable=unused-import
+
+from empower.datatypes.etheraddress import EtherAddress
+
+
+class OldEtherAddress:
+    """The previous EtherAddress (only the benchmarked methods)."""
+
+    def __init__(self, addr):
+
+        if isinstance(addr, bytes) and len(addr) == 6:
+            self._value = addr
+        elif isinstance(addr, str):
+            if len(addr) == 17 or addr.count(':') == 5:
+                if len(addr) == 17:
+                    if addr[2::3] != ':::::' and addr[2::3] != '-----':
+                        raise RuntimeError("Bad format for ethernet address")
+                    addr = ''.join(
+                        (addr[x * 3:x * 3 + 2] for x in range(0, 6)))
+                else:
+                    addr = ''.join(["%02x" % (int(x, 16),)
+                                    for x in addr.split(":")])
+                addr = b''.join(bytes((int(addr[x * 2:x * 2 + 2], 16),))
+                                for x in range(0, 6))
+            else:
+                raise ValueError("Expected 6 raw bytes or some hex")
+            self._value = addr
+        elif isinstance(addr, OldEtherAddress):
+            self._value = addr.to_raw()
+        elif addr is None:
+            self._value = b'\x00' * 6
+        else:
+            raise ValueError("EtherAddress must be a string of 6 raw bytes")
+
+    def to_raw(self):
+        """Return the raw bytes."""
+
+        return self._value
+
+    def to_str(self, separator=':'):
+        """Return the string representation."""
+
+        return separator.join(('%02x' % (x,) for x in self._value)).upper()
+
+    def __str__(self):
+        return self.to_str()
+
+    def __eq__(self, other):
+        if type(other) == OldEtherAddress:
+            other = other.to_raw()
+        elif type(other) == bytes:
+            pass
+        else:
+            try:
+                other = OldEtherAddress(other).to_raw()
+            except RuntimeError:
+                return False
+        if self._value == other:
+            return True
+        return False
+
+    def __hash__(self):
+        return self._value.__hash__()
+
+    def __setattr__(self, a, v):
+        if hasattr(self, '_value'):
+            raise TypeError("This object is immutable")
+        object.__setattr__(self, a, v)
+
+
+def bench(cls, nb_addresses, repeat):
+    """Return the ns per operation of each operation."""
+
+    raws = [bytes([0x04, 0xF0, 0x21, index >> 16 & 0xFF,
+                   index >> 8 & 0xFF, index & 0xFF])
+            for index in range(nb_addresses)]
+    strs = [':'.join('%02X' % x for x in raw) for raw in raws]
+
+    addrs = [cls(raw) for raw in raws]
+    others = [cls(raw) for raw in raws]
+    table = {addr: None for addr in addrs}
+
+    tests = [("construct (str)", lambda: [cls(addr) for addr in strs]),
+             ("construct (raw)", lambda: [cls(raw) for raw in raws]),
+             ("hash", lambda: [hash(addr) for addr in addrs]),
+             ("eq", lambda: [a == b for a, b in zip(addrs, others)]),
+             ("str", lambda: [str(addr) for addr in addrs]),
+             ("dict lookup", lambda: [table[addr] for addr in others])]
+
+    out = []
+
+    for name, test in tests:
+        best = min(timeit.repeat(test, number=10, repeat=repeat))
+        out.append((name, best / (10 * nb_addresses) * 1e9))
+
+    return out
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="EtherAddress benchmark")
+    parser.add_argument("--addresses", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    old = bench(OldEtherAddress, args.addresses, args.repeat)
+    new = bench(EtherAddress, args.addresses, args.repeat)
+
+    print("%u addresses, ns/op" % args.addresses)
+
+    for (name, old_ns), (_, new_ns) in zip(old, new):
+        print("%-16s old %7.1f  new %7.1f  (%.1fx)" %
+              (name, old_ns, new_ns, old_ns / new_ns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Intent server benchmark.
+
+A burst of points of attachment is added to the intent server, which applies
+them to an SDN controller stand-in answering each request after a delay. The
+benchmark reports the time the callers are blocked, the time needed to apply
+all the intents, the throughput, and the average request latency.
+
+Usage:
+
+    python3 tests/bench_intentserver.py [--intents 200] [--delay 0.02]
+"""
+
+import time
+import argparse
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+# sets up the runtime
+import conftest  # pylint: disable=unused-import
+
+from sdncontroller import SDNController
+from test_intentserver import settle
+
+from empower.intentserver.intentserver import IntentServer
+from empower.intentserver.intentclient import IntentClient
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Intent server benchmark")
+    parser.add_argument("--intents", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.02,
+                        help="SDN controller delay (in s)")
+    parser.add_argument("--max_clients", type=int, default=10)
+    args = parser.parse_args()
+
+    controller = SDNController(delay=args.delay)
+    controller.listen(0)
+
+    intent_server = IntentServer(0, max_clients=args.max_clients,
+                                 reconcile_every=0)
+    intent_server.client = IntentClient("127.0.0.1", controller.port,
+                                        args.max_clients)
+
+    @gen.coroutine
+    def bench():
+        """Add the intents and wait for them to be applied."""
+
+        yield settle(intent_server)
+
+        start = time.perf_counter()
+
+        for index in range(args.intents):
+            intent_server.add_poa({'version': '1.0',
+                                   'dpid': '00:00:00:00:00:00:00:01',
+                                   'port': index,
+                                   'hwaddr': '04:F0:21:09:F9:93'})
+
+        blocked = time.perf_counter() - start
+
+        yield settle(intent_server)
+
+        return blocked, time.perf_counter() - start
+
+    blocked, elapsed = IOLoop.current().run_sync(bench)
+
+    client = intent_server.client.to_dict()
+
+    print("%u intents, controller delay %.0f ms, %u clients (%s)" %
+          (args.intents, args.delay * 1000, args.max_clients,
+           client['client']))
+    print("blocked %.2f ms  applied in %.2f s  %.0f intents/s  "
+          "latency %.1f ms" % (blocked * 1000, elapsed,
+                               args.intents / elapsed,
+                               client['latency_avg'] * 1000))
+
+    if 'pool' in client:
+        print("connections opened %u  reused %u" %
+              (client['pool']['opened'], client['pool']['reused']))
+
+    assert len(controller.intents("intent/poas")) == args.intents
+
+
+if __name__ == "__main__":
+    main()
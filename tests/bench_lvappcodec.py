@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""LVAPP codec benchmark.
+
+Every message type is parsed and built with the precompiled codec and with
+the construct Struct of the same message, using the sample messages of the
+codec tests (see test_lvappcodec.py). Each path builds the message it
+decoded (a construct Container or a codec Message).
+
+Times are in us per message (best of --repeat runs).
+
+Usage:
+
+    python3 tests/bench_lvappcodec.py [--number 2000] [--repeat 5]
+        [--type hello]
+"""
+
+import timeit
+import argparse
+
+# sets up the path
+import conftest  # pylint: disable=unused-import
+
+from empower.lvapp.lvappcodec import CODECS
+
+from test_lvappcodec import SAMPLES
+from test_lvappcodec import CONSTRUCTS
+
+
+def measure(test, number, repeat):
+    """Return the us per call of test."""
+
+    return min(timeit.repeat(test, number=number, repeat=repeat)) / \
+        number * 1e6
+
+
+def bench(name, number, repeat):
+    """Return the parse and build times with construct and the codec."""
+
+    codec = CODECS[name]
+    parser = CONSTRUCTS[name]
+
+    raw = parser.build(SAMPLES[name])
+    buf = memoryview(raw)
+    container = parser.parse(raw)
+    msg = codec.parse(buf)
+
+    return (measure(lambda: parser.parse(raw), number, repeat),
+            measure(lambda: codec.parse(buf), number, repeat),
+            measure(lambda: parser.build(container), number, repeat),
+            measure(lambda: codec.build(msg), number, repeat))
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="LVAPP codec benchmark")
+    parser.add_argument("--number", type=int, default=2000,
+                        help="messages per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--type", action="append", choices=sorted(CODECS),
+                        help="message type (default: all)")
+    args = parser.parse_args()
+
+    names = args.type or sorted(CODECS)
+
+    print("us/message %28s %29s" % ("parse", "build"))
+    print("%-28s %9s %8s %8s %9s %8s %8s" %
+          ("type", "construct", "codec", "speedup",
+           "construct", "codec", "speedup"))
+
+    for name in names:
+        c_parse, parse, c_build, build = bench(name, args.number, args.repeat)
+        print("%-28s %9.2f %8.2f %7.1fx %9.2f %8.2f %7.1fx" %
+              (name, c_parse, parse, c_parse / parse,
+               c_build, build, c_build / build))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Memory footprint benchmark.
+
+The objects of the data model are created in bulk and the memory allocated
+(as traced by tracemalloc) is divided by the number of objects. The
+benchmark reports the bytes per:
+
+    lvap: a new LVAP
+    block: a new resource block (its dictionaries are not allocated yet)
+    cqm entry: a station entry in the UCQM of a block
+    tx policy: a transmission policy stored in a block
+
+Usage:
+
+    python3 tests/bench_memory.py [--lvaps 10000] [--blocks 2000]
+"""
+
+import argparse
+import tracemalloc
+
+# sets up the runtime
+import conftest  # pylint: disable=unused-import
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.ssid import SSID
+from empower.core.lvap import LVAP
+from empower.core.resourcepool import CQMEntry
+from empower.core.resourcepool import ResourceBlock
+from empower.core.wtp import WTP
+
+NET_BSSID = EtherAddress("02:CA:FE:00:00:00")
+
+
+def addresses(prefix, count):
+    """Return count addresses starting with the prefix byte."""
+
+    return [EtherAddress(bytes([prefix, 0, 0, index >> 16 & 0xFF,
+                                index >> 8 & 0xFF, index & 0xFF]))
+            for index in range(count)]
+
+
+def measure(build):
+    """Return the bytes allocated by build() (its result is kept alive
+    while measuring)."""
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    objects = build()
+
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    del objects
+
+    return allocated
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Memory benchmark")
+    parser.add_argument("--lvaps", type=int, default=10000)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--stations", type=int, default=20,
+                        help="stations per block")
+    args = parser.parse_args()
+
+    ssids = [SSID("EmPOWER")]
+    stations = addresses(0x04, args.lvaps)
+    hwaddrs = addresses(0x00, args.blocks)
+    wtps = [WTP(hwaddr, "Bench WTP") for hwaddr in hwaddrs]
+
+    def lvaps():
+        """Create the LVAPs."""
+
+        out = []
+        for addr in stations:
+            lvap = LVAP(addr, NET_BSSID, NET_BSSID)
+            lvap.ssids = ssids
+            out.append(lvap)
+        return out
+
+    def blocks():
+        """Create the blocks."""
+
+        return [ResourceBlock(wtp, hwaddr, 36, 0)
+                for wtp, hwaddr in zip(wtps, hwaddrs)]
+
+    pool = blocks()
+    entries = stations[:args.stations]
+
+    def cqm_entries():
+        """Add the stations to the UCQM of every block."""
+
+        for block in pool:
+            for addr in entries:
+                block.ucqm[addr] = CQMEntry(addr, mov_rssi=-60)
+
+    def tx_policies():
+        """Store a transmission policy for each station in every block."""
+
+        for block in pool:
+            for addr in entries:
+                block.tx_policies[addr] = block.tx_policies[addr]
+
+    nb_entries = args.blocks * args.stations
+
+    results = [("lvap", measure(lvaps), args.lvaps),
+               ("block", measure(blocks), args.blocks),
+               ("cqm entry", measure(cqm_entries), nb_entries),
+               ("tx policy", measure(tx_policies), nb_entries)]
+
+    print("%u LVAPs, %u blocks, %u stations per block" %
+          (args.lvaps, args.blocks, args.stations))
+
+    for name, allocated, count in results:
+        print("%-10s %7u objects  %6.0f bytes/object" %
+              (name, count, allocated / count))
+
+
+if __name__ == "__main__":
+    main()
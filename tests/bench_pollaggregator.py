@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Poll aggregation benchmark.
+
+Every round each module sends one poll request to its WTP, the requests are
+answered by agent stand-ins and the responses are dispatched to the modules.
+The benchmark reports the polls completed per second, the messages exchanged,
+and the controller CPU time per round (the time spent by the agents is not
+included) in three modes:
+
+    direct: each request is written and flushed by itself (no aggregation)
+    aggregated: requests are grouped per WTP and sent with one write
+    multi: requests are grouped per WTP in a MULTI_REQUEST message
+
+Usage:
+
+    python3 tests/bench_pollaggregator.py [--wtps 50] [--modules 6]
+"""
+
+import time
+import argparse
+
+import conftest
+
+from agent import Agent
+from test_pollaggregator import Module
+from test_pollaggregator import poller_request
+from test_pollaggregator import PT_TEST_REQUEST
+from test_pollaggregator import PT_TEST_RESPONSE
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.lvapp.lvappserver import ModuleLVAPPWorker
+from empower.maps.maps import POLLER_RESPONSE
+from empower.maps.ucqm import UCQM
+from empower.core.wtp import WTP
+
+MODES = ["direct", "aggregated", "multi"]
+
+
+def setup(runtime, server, nb_wtps, nb_modules, nb_entries):
+    """Return the worker and the WTPs, each with an agent stand-in."""
+
+    worker = ModuleLVAPPWorker(UCQM, PT_TEST_RESPONSE, POLLER_RESPONSE)
+    wtps = []
+
+    for index in range(nb_wtps):
+
+        addr = EtherAddress(bytes([0, 0x0D, 0xB9, 0, index // 256,
+                                   index % 256]))
+        wtp = WTP(addr, "Bench WTP")
+
+        agent = Agent(addr.to_raw())
+        agent.responders[PT_TEST_REQUEST] = \
+            lambda frame, agent=agent: agent.poller_response(
+                frame, nb_entries=nb_entries)
+
+        wtp.connection = server.CONNECTION(agent, ("127.0.0.1", 4433),
+                                           server)
+        wtp.connection.wtp = wtp
+        agent.connection = wtp.connection
+
+        runtime.wtps[addr] = wtp
+
+        modules = []
+
+        for _ in range(nb_modules):
+            module_id = worker.module_id
+            worker.modules[module_id] = Module()
+            modules.append(module_id)
+
+        wtps.append((wtp, modules))
+
+    return worker, wtps
+
+
+def run(server, worker, wtps, mode, rounds):
+    """Run the benchmark in the specified mode."""
+
+    server.aggregator.multi_request = mode == "multi"
+
+    agents = [wtp.connection.stream for wtp, _ in wtps]
+
+    for agent in agents:
+        agent.writes = agent.messages = agent.responses = 0
+        agent.busy = 0.0
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+
+    for _ in range(rounds):
+
+        for wtp, modules in wtps:
+            for module_id in modules:
+                msg = poller_request(wtp, module_id)
+                if mode == "direct":
+                    wtp.connection.write(msg)
+                    wtp.connection.flush()
+                else:
+                    worker.send_request(wtp, msg)
+
+        server.aggregator.flush()
+
+        for agent in agents:
+            agent.reply()
+
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu - sum(agent.busy for agent in agents)
+
+    polls = sum(len(modules) for _, modules in wtps) * rounds
+    writes = sum(agent.writes for agent in agents)
+    messages = sum(agent.messages + agent.responses for agent in agents)
+
+    return {'mode': mode,
+            'writes': writes,
+            'messages': messages,
+            'polls/s': polls / elapsed,
+            'cpu/round (ms)': cpu / rounds * 1000}
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Poll aggregation benchmark")
+    parser.add_argument("--wtps", type=int, default=50)
+    parser.add_argument("--modules", type=int, default=6,
+                        help="modules per WTP")
+    parser.add_argument("--entries", type=int, default=0,
+                        help="entries per response")
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    runtime = conftest.empower.main.RUNTIME
+    runtime.components[conftest.RESTServer.__module__] = \
+        conftest.RESTServer(0, None, None)
+    server = conftest.LVAPPServer(0, conftest.PT_TYPES,
+                                  conftest.PT_TYPES_HANDLERS)
+    runtime.components[conftest.LVAPPServer.__module__] = server
+
+    worker, wtps = setup(runtime, server, args.wtps, args.modules,
+                         args.entries)
+
+    print("%u WTPs, %u modules per WTP, %u rounds" %
+          (args.wtps, args.modules, args.rounds))
+
+    for mode in MODES:
+        out = run(server, worker, wtps, mode, args.rounds)
+        print("%-10s writes %7u  messages %7u  %8.0f polls/s  %6.2f ms/round"
+              % (out['mode'], out['writes'], out['messages'],
+                 out['polls/s'], out['cpu/round (ms)']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""RSSI matrix benchmark.
+
+The best block for a station is picked as the mobility managers did before
+(sortByRssi().first() over all the blocks of the tenant) and with the RSSI
+matrix, both over all the blocks of the tenant and over the station row:
+
+    sortByRssi: pool.sortByRssi(sta).first()
+    best (pool): matrix.best(sta, blocks=pool)
+    best (row): matrix.best(sta)
+
+Each WTP has two blocks and each station is heard by --heard random blocks.
+The three methods must pick a block with the same RSSI. Times are in us per
+decision (best of --repeat runs).
+
+Usage:
+
+    python3 tests/bench_rssimatrix.py [--wtps 500] [--stations 5000]
+        [--heard 20] [--queries 1000] [--repeat 5]
+"""
+
+import random
+import timeit
+import argparse
+
+# sets up the runtime
+import conftest  # pylint: disable=unused-import
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.resourcepool import CQMEntry
+from empower.core.resourcepool import ResourceBlock
+from empower.core.resourcepool import ResourcePool
+from empower.core.rssimatrix import RSSIMatrix
+from empower.core.wtp import WTP
+
+
+def address(prefix, index):
+    """Return an address starting with the prefix byte."""
+
+    return EtherAddress(bytes([prefix, 0, 0, index >> 16 & 0xFF,
+                               index >> 8 & 0xFF, index & 0xFF]))
+
+
+def build(nb_wtps, nb_stations, heard, seed=0):
+    """Return the pool, the matrix, and the stations."""
+
+    rnd = random.Random(seed)
+
+    pool = ResourcePool()
+
+    for index in range(nb_wtps):
+        wtp = WTP(address(0x00, index), "Bench WTP")
+        for channel, band in ((6, 0), (36, 1)):
+            block = ResourceBlock(wtp, address(0x02, len(pool)), channel,
+                                  band)
+            wtp.add_block(block)
+            pool.append(block)
+
+    matrix = RSSIMatrix()
+    stations = [address(0x04, index) for index in range(nb_stations)]
+
+    for sta in stations:
+        for block in rnd.sample(pool, heard):
+            rssi = rnd.randint(-90, -30)
+            block.ucqm[sta] = CQMEntry(sta, mov_rssi=rssi)
+            matrix.update(sta, block, rssi)
+
+    return pool, matrix, stations
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description="RSSI matrix benchmark")
+    parser.add_argument("--wtps", type=int, default=500)
+    parser.add_argument("--stations", type=int, default=5000)
+    parser.add_argument("--heard", type=int, default=20,
+                        help="blocks hearing each station")
+    parser.add_argument("--queries", type=int, default=1000,
+                        help="stations looked up per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pool, matrix, stations = build(args.wtps, args.stations, args.heard)
+    queries = random.Random(1).sample(stations, args.queries)
+
+    for sta in queries:
+        old = pool.sortByRssi(sta).first()[0]
+        assert matrix.best(sta, blocks=pool)[0].rssi(sta) == old.rssi(sta)
+        assert matrix.best(sta)[0].rssi(sta) == old.rssi(sta)
+
+    tests = [("sortByRssi", lambda sta: pool.sortByRssi(sta).first()),
+             ("best (pool)", lambda sta: matrix.best(sta, blocks=pool)),
+             ("best (row)", matrix.best)]
+
+    print("%u WTPs (%u blocks), %u stations, %u blocks per station, "
+          "us/decision" % (args.wtps, len(pool), args.stations, args.heard))
+
+    baseline = None
+
+    for name, test in tests:
+
+        elapsed = min(timeit.repeat(lambda: [test(sta) for sta in queries],
+                                    number=1, repeat=args.repeat))
+        elapsed = elapsed / args.queries * 1e6
+
+        if baseline is None:
+            baseline = elapsed
+
+        print("%-12s %9.1f  (%.1fx)" % (name, elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()
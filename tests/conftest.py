@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Test configuration.
+
+The EmPOWER Runtime is started once per session with an in-memory
+configuration database, the REST and LVAPP servers listen on ephemeral
+ports. The intent server talks to an SDN controller stand-in. The runtime must be set before any other empower module is imported
+since most of them bind RUNTIME at import time.
+"""
+
+import os
+import sys
+import types
+import collections
+import collections.abc
+
+import pytest
+
+# tornado 4.x still uses the ABC aliases removed from collections in 3.10
+for name in ('Mapping', 'MutableMapping', 'Sequence', 'MutableSet',
+             'Callable', 'Iterable', 'Hashable'):
+    if not hasattr(collections, name):
+        setattr(collections, name, getattr(collections.abc, name))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import empower.settings
+
+empower.settings.CONFIGDB_ENGINE = "sqlite://"
+
+import empower.main
+
+from empower.core.core import EmpowerRuntime
+
+empower.main.RUNTIME = EmpowerRuntime(types.SimpleNamespace(ctrl_adv=False))
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.restserver.restserver import RESTServer
+from empower.core.wtp import WTP
+from empower.lvapp.lvappserver import LVAPPServer
+from empower.intentserver.intentserver import IntentServer
+from empower.intentserver.intentclient import IntentClient
+from empower.lvapp import PT_TYPES
+from empower.lvapp import PT_TYPES_HANDLERS
+
+from sdncontroller import SDNController
+
+
+@pytest.fixture(scope="session")
+def runtime():
+    """Return the EmPOWER Runtime."""
+
+    return empower.main.RUNTIME
+
+
+@pytest.fixture(scope="session")
+def lvapp_server(runtime):
+    """Return the LVAPP Server (the REST Server is started as well)."""
+
+    if RESTServer.__module__ not in runtime.components:
+        runtime.components[RESTServer.__module__] = RESTServer(0, None, None)
+
+    if LVAPPServer.__module__ not in runtime.components:
+        runtime.components[LVAPPServer.__module__] = \
+            LVAPPServer(0, PT_TYPES, PT_TYPES_HANDLERS)
+
+    return runtime.components[LVAPPServer.__module__]
+
+
+class Stream:
+    """A stand-in for the IOStream of a WTP connection. Written bytes are
+    kept in a list."""
+
+    def __init__(self):
+        self.written = []
+        self.closed_ = False
+
+    def set_nodelay(self, value):
+        """Set TCP_NODELAY."""
+
+        pass
+
+    def set_close_callback(self, callback):
+        """Set the close callback."""
+
+        pass
+
+    def read_bytes(self, num_bytes, callback, partial=False):
+        """Read bytes (nothing is ever received)."""
+
+        pass
+
+    def write(self, data):
+        """Write bytes."""
+
+        self.written.append(bytes(data))
+
+    def closed(self):
+        """Return True if the stream is closed."""
+
+        return self.closed_
+
+    def close(self):
+        """Close the stream."""
+
+        self.closed_ = True
+
+
+@pytest.fixture
+def wtp(runtime, lvapp_server):
+    """Return a WTP connected to the LVAPP Server. The WTP is removed at
+    teardown."""
+
+    addr = EtherAddress("00:0D:B9:2F:56:64")
+    wtp = WTP(addr, "Test WTP")
+    wtp.connection = lvapp_server.CONNECTION(Stream(), ("127.0.0.1", 4433),
+                                             lvapp_server)
+    wtp.connection.wtp = wtp
+    runtime.wtps[addr] = wtp
+
+    yield wtp
+
+    del runtime.wtps[addr]
+
+
+@pytest.fixture
+def controller():
+    """Return an SDN controller stand-in."""
+
+    controller = SDNController()
+    server = controller.listen(0)
+
+    yield controller
+
+    server.stop()
+
+
+@pytest.fixture
+def intent_server(runtime, controller):
+    """Return an intent server connected to the SDN controller stand-in. The
+    intent server is registered with the runtime until teardown."""
+
+    intent_server = IntentServer(0, max_clients=4, timeout=2,
+                                 reconcile_every=0)
+    intent_server.client = IntentClient("127.0.0.1", controller.port,
+                                        intent_server.client.max_clients,
+                                        intent_server.client.timeout)
+
+    runtime.components[IntentServer.__module__] = intent_server
+
+    yield intent_server
+
+    del runtime.components[IntentServer.__module__]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""SDN controller stand-in.
+
+Implements the intent interface used by the intent server: the intents are
+kept in memory, one dictionary for each url (e.g. /intent/poas):
+
+    GET /intent/poas              list the intents (indexed by uuid)
+    POST /intent/poas             add an intent (201, uuid in Location)
+    PUT /intent/poas/<uuid>       update an intent (204, or 404)
+    DELETE /intent/poas/<uuid>    remove an intent (204, or 404)
+    DELETE /intent/poas           remove all the intents (204)
+
+Every request can be delayed to emulate a slow SDN controller.
+
+    controller = SDNController(delay=0.1)
+    controller.listen(0)
+"""
+
+import json
+import uuid
+
+import tornado.web
+import tornado.httpserver
+
+from tornado import gen
+
+
+class IntentHandler(tornado.web.RequestHandler):
+    """Intent interface handler."""
+
+    def initialize(self, controller):
+        self.controller = controller
+
+    @gen.coroutine
+    def prepare(self):
+
+        self.controller.requests += 1
+        self.controller.peers.add(self.request.connection.context.address)
+        self.controller.in_flight += 1
+        self.controller.max_in_flight = max(self.controller.max_in_flight,
+                                            self.controller.in_flight)
+
+        if self.controller.delay:
+            yield gen.sleep(self.controller.delay)
+
+    def on_finish(self):
+
+        self.controller.in_flight -= 1
+
+    def get(self, url, intent_id=None):
+
+        intents = self.controller.intents(url)
+
+        if intent_id:
+            if intent_id not in intents:
+                self.send_error(404)
+                return
+            self.write(intents[intent_id])
+            return
+
+        self.write(intents)
+
+    def post(self, url, intent_id=None):
+
+        intent_id = str(uuid.uuid4())
+
+        self.controller.intents(url)[intent_id] = \
+            json.loads(self.request.body.decode('UTF-8'))
+
+        self.set_header("Location", "/%s/%s" % (url, intent_id))
+        self.set_status(201)
+
+    def put(self, url, intent_id=None):
+
+        intents = self.controller.intents(url)
+
+        if intent_id not in intents:
+            self.send_error(404)
+            return
+
+        intents[intent_id] = json.loads(self.request.body.decode('UTF-8'))
+
+        self.set_status(204)
+
+    def delete(self, url, intent_id=None):
+
+        intents = self.controller.intents(url)
+
+        if not intent_id:
+            intents.clear()
+            self.set_status(204)
+            return
+
+        if intent_id not in intents:
+            self.send_error(404)
+            return
+
+        del intents[intent_id]
+
+        self.set_status(204)
+
+
+class SDNController(tornado.web.Application):
+    """SDN controller intent interface.
+
+    Attributes:
+        delay: delay applied to every request (in s)
+        store: dictionary mapping urls to dictionaries of intents indexed
+          by uuid
+        requests: number of requests received
+        in_flight: number of requests being served
+        max_in_flight: maximum value of in_flight
+        peers: set of the (address, port) of the client connections
+    """
+
+    def __init__(self, delay=0.0):
+
+        self.delay = delay
+        self.store = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.peers = set()
+        self.port = None
+
+        handlers = [(r"/(intent/[a-z]+)/?", IntentHandler,
+                     dict(controller=self)),
+                    (r"/(intent/[a-z]+)/([a-zA-Z0-9-]+)/?", IntentHandler,
+                     dict(controller=self))]
+
+        super().__init__(handlers)
+
+    def intents(self, url):
+        """Return the intents of an url."""
+
+        return self.store.setdefault(url, {})
+
+    def listen(self, port, address="127.0.0.1", **kwargs):
+        """Start the HTTP server. The port actually used (e.g. if port is
+        0) is saved in the port attribute."""
+
+        server = tornado.httpserver.HTTPServer(self, **kwargs)
+        server.listen(port, address)
+
+        sockets = list(server._sockets.values())
+        self.port = sockets[0].getsockname()[1]
+
+        return server
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Packet size binning tests.
+
+The results are compared with the loops previously used by the bin counter
+modules (old_fill and old_fill_by_lvap).
+"""
+
+import random
+
+import pytest
+
+from construct import Container
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.binning import Binner
+from empower.lvapp import PT_VERSION
+from empower.bin_counter.bin_counter import BinCounter
+from empower.bin_counter.bin_counter import PT_STATS_RESPONSE
+from empower.bin_counter.bin_counter import STATS_RESPONSE
+from empower.wtp_bin_counter.wtp_bin_counter import WTPBinCounter
+from empower.wtp_bin_counter.wtp_bin_counter import PT_WTP_STATS_RESPONSE
+from empower.wtp_bin_counter.wtp_bin_counter import WTP_STATS_RESPONSE
+
+BINS = [128, 512, 1514, 8192]
+
+WTP = EtherAddress("00:0D:B9:2F:56:64")
+STA = EtherAddress("04:F0:21:09:F9:93")
+
+
+def old_fill(bins, samples, bytes_samples):
+    """Bin the samples as the bin counter did before (sort and scan)."""
+
+    out = [0] * len(bins)
+
+    for entry in sorted(samples, key=lambda entry: entry[0]):
+
+        if not entry:
+            continue
+
+        size, count = entry[0], entry[1]
+
+        for index, bound in enumerate(bins):
+            if size <= bound:
+                out[index] += size * count if bytes_samples else count
+                break
+
+    return out
+
+
+def old_fill_by_lvap(bins, samples, bytes_samples):
+    """Bin the samples as the WTP bin counter did before."""
+
+    lvaps = {}
+
+    for lvap, size, count in samples:
+        lvaps.setdefault(EtherAddress(lvap), []).append([size, count])
+
+    return {lvap: old_fill(bins, data, bytes_samples)
+            for lvap, data in lvaps.items()}
+
+
+def random_samples(rnd, max_size=9000):
+    """Return a random list of [size, count] samples."""
+
+    return [[rnd.randint(1, max_size), rnd.randint(0, 100)]
+            for _ in range(rnd.randint(0, 30))]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random(seed):
+    """Random lists are binned as before."""
+
+    rnd = random.Random(seed)
+
+    for _ in range(10):
+        samples = random_samples(rnd)
+        out_bytes, out_packets = Binner(BINS).fill(samples)
+        assert out_bytes == old_fill(BINS, samples, True)
+        assert out_packets == old_fill(BINS, samples, False)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_by_lvap(seed):
+    """Random lists of several LVAPs are binned as before."""
+
+    rnd = random.Random(seed)
+
+    lvaps = [bytes(rnd.randrange(256) for _ in range(6)) for _ in range(10)]
+    samples = [(lvap, size, count) for lvap in lvaps
+               for size, count in random_samples(rnd)]
+
+    module = WTPBinCounter()
+    module.bins = BINS
+
+    out_bytes, out_packets = module.fill_samples(samples)
+
+    assert out_bytes == old_fill_by_lvap(BINS, samples, True)
+    assert out_packets == old_fill_by_lvap(BINS, samples, False)
+
+
+def test_boundaries():
+    """A packet as large as a bound falls in that bin."""
+
+    samples = [[size, 1] for size in BINS] + \
+        [[size + 1, 1] for size in BINS[:-1]]
+
+    out_bytes, out_packets = Binner(BINS).fill(samples)
+
+    assert out_packets == [1, 2, 2, 2]
+    assert out_bytes == old_fill(BINS, samples, True)
+
+
+def test_empty():
+    """Empty lists, empty samples, and zero counts yield empty bins."""
+
+    binner = Binner(BINS)
+
+    assert binner.fill([]) == ([0] * 4, [0] * 4)
+    assert binner.fill([[]]) == ([0] * 4, [0] * 4)
+    assert binner.fill([[60, 0], [0, 0]]) == ([0] * 4, [0] * 4)
+    assert binner.fill_by_key([]) == ({}, {})
+
+
+def test_oversize():
+    """Packets larger than the last bound are not counted."""
+
+    samples = [[8193, 5], [65535, 1], [60, 1]]
+
+    assert Binner(BINS).fill(samples) == ([60, 0, 0, 0], [1, 0, 0, 0])
+    assert Binner(BINS).fill(samples)[0] == old_fill(BINS, samples, True)
+
+    # an LVAP with oversize packets only has empty bins
+    out_bytes, _ = Binner(BINS).fill_by_key([[STA, 9000, 1]])
+    assert out_bytes == {STA: [0, 0, 0, 0]}
+
+
+def test_rx_samples():
+    """All the samples after the first nb_tx are rx samples."""
+
+    stats = [(60, 1), (1500, 2), (70, 3), (600, 4)]
+
+    raw = STATS_RESPONSE.build(Container(version=PT_VERSION,
+                                         type=PT_STATS_RESPONSE,
+                                         length=32 + 6 * len(stats),
+                                         seq=1,
+                                         module_id=1,
+                                         wtp=WTP.to_raw(),
+                                         sta=STA.to_raw(),
+                                         nb_tx=2,
+                                         nb_rx=2,
+                                         stats=stats))
+
+    module = BinCounter()
+    module.lvap = STA
+    module.bins = BINS
+    module.handle_response(STATS_RESPONSE.parse(raw))
+
+    assert module.tx_packets == [1, 0, 2, 0]
+    assert module.rx_packets == [3, 0, 4, 0]
+    assert module.rx_bytes == [210, 0, 2400, 0]
+
+
+def test_wtp_rx_samples():
+    """All the samples after the first nb_tx are rx samples (WTP)."""
+
+    stats = [(STA.to_raw(), 60, 1), (STA.to_raw(), 70, 3),
+             (STA.to_raw(), 600, 4)]
+
+    raw = WTP_STATS_RESPONSE.build(
+        Container(version=PT_VERSION,
+                  type=PT_WTP_STATS_RESPONSE,
+                  length=26 + 12 * len(stats),
+                  seq=1,
+                  module_id=1,
+                  wtp=WTP.to_raw(),
+                  nb_tx=1,
+                  nb_rx=2,
+                  stats=stats))
+
+    module = WTPBinCounter()
+    module.bins = BINS
+    module.handle_response(WTP_STATS_RESPONSE.parse(raw))
+
+    assert module.tx_packets == {STA: [1, 0, 0, 0]}
+    assert module.rx_packets == {STA: [3, 0, 4, 0]}
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EtherAddress tests."""
+
+import gc
+import copy
+import pickle
+import weakref
+
+import pytest
+
+from empower.datatypes.etheraddress import EtherAddress
+
+RAW = b'\x04\xf0\x21\x09\xf9\x93'
+STR = "04:F0:21:09:F9:93"
+INT = 0x04F02109F993
+
+
+@pytest.mark.parametrize("addr", [STR, STR.lower(), "04-f0-21-09-f9-93",
+                                  "4:f0:21:9:f9:93", RAW, INT,
+                                  EtherAddress(STR)])
+def test_forms(addr):
+    """All the accepted forms give the same (interned) address."""
+
+    ether = EtherAddress(addr)
+
+    assert ether is EtherAddress(STR)
+    assert ether.to_raw() == RAW
+    assert ether.to_str() == STR
+    assert ether.to_int() == INT
+    assert ether.to_tuple() == tuple(RAW)
+
+
+def test_none():
+    """None is the all zeros address."""
+
+    assert EtherAddress() is EtherAddress(b'\x00' * 6)
+    assert EtherAddress(None).to_int() == 0
+
+
+@pytest.mark.parametrize("addr", ["04:F0:21:09:F9", "04:F0:21:09:F9:93:00",
+                                  b'\x04\xf0', 1 << 48, -1, True, 1.0,
+                                  [4, 240, 33, 9, 249, 147]])
+def test_invalid(addr):
+    """Invalid forms are rejected."""
+
+    with pytest.raises((ValueError, RuntimeError)):
+        EtherAddress(addr)
+
+
+def test_hash_eq():
+    """Addresses are equal to (and hash as) their raw and string forms."""
+
+    ether = EtherAddress(STR)
+
+    assert hash(ether) == hash(RAW)
+    assert ether == RAW
+    assert ether == STR
+    assert ether == STR.lower()
+    assert ether != EtherAddress("04:F0:21:09:F9:94")
+    assert ether != b'\x00' * 6
+
+    table = {RAW: 1}
+    assert table[ether] == 1
+
+    table = {ether: 1}
+    assert table[RAW] == 1
+    assert table[EtherAddress(INT)] == 1
+
+
+def test_str():
+    """The canonical form uses upper case hex digits and colons."""
+
+    ether = EtherAddress(STR.lower())
+
+    assert str(ether) == STR
+    assert ether.to_str() is ether.to_str()
+    assert ether.to_str('-') == "04-F0-21-09-F9-93"
+    assert repr(ether) == "EtherAddress('04:F0:21:09:F9:93')"
+
+
+def test_flags():
+    """Multicast and locally administered bits are decoded."""
+
+    assert EtherAddress.bcast().is_multicast()
+    assert EtherAddress("02:CA:FE:00:00:01").is_local()
+    assert EtherAddress(STR).is_global()
+    assert not EtherAddress(STR).is_multicast()
+
+
+def test_match():
+    """Addresses match masks covering all their bits."""
+
+    assert EtherAddress("00:00:00:00:00:00").match(STR)
+    assert EtherAddress(STR).match(EtherAddress.bcast())
+    assert not EtherAddress.bcast().match(STR)
+
+
+def test_pickle_copy():
+    """Pickling and copying return the interned address."""
+
+    ether = EtherAddress(STR)
+
+    assert pickle.loads(pickle.dumps(ether)) is ether
+    assert copy.copy(ether) is ether
+    assert copy.deepcopy(ether) is ether
+    assert copy.deepcopy({ether: [ether]}) == {ether: [ether]}
+
+
+def test_immutable():
+    """Addresses cannot be modified."""
+
+    ether = EtherAddress(STR)
+
+    with pytest.raises(TypeError):
+        ether._value = b'\x00' * 6
+
+    with pytest.raises(TypeError):
+        ether.addr = 1
+
+    with pytest.raises(TypeError):
+        del ether._value
+
+    assert ether.to_raw() == RAW
+
+
+def test_interning():
+    """Addresses are not kept alive by the intern table."""
+
+    ether = EtherAddress("04:F0:21:00:00:01")
+    ref = weakref.ref(ether)
+
+    assert EtherAddress(ether.to_int()) is ether
+
+    del ether
+    gc.collect()
+
+    assert ref() is None
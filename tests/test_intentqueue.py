@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Intent queue tests.
+
+The queue is driven with stub send and remove coroutines recording the
+operations that reach the SDN controller.
+"""
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+from empower.intentserver.intentqueue import IntentQueue
+
+URL = "/intent/poas"
+
+
+class Controller:
+    """Stub send and remove coroutines.
+
+    Attributes:
+        calls: the operations sent, as (method, uuid, intent) tuples
+        started: the operations started, including the ones in flight
+        gate: if set, the operations wait for this future before completing
+    """
+
+    def __init__(self):
+
+        self.calls = []
+        self.started = []
+        self.gate = None
+
+    @gen.coroutine
+    def send_intent(self, method, url, intent, uuid):
+        """Send an intent."""
+
+        assert url == URL
+
+        self.started.append((method, uuid))
+
+        if self.gate:
+            yield self.gate
+
+        self.calls.append((method, uuid, intent))
+
+        return uuid
+
+    @gen.coroutine
+    def remove_intent(self, url, uuid=None):
+        """Remove an intent (all the intents if uuid is None)."""
+
+        assert url == URL
+
+        self.started.append(("DELETE", uuid))
+
+        if self.gate:
+            yield self.gate
+
+        self.calls.append(("DELETE", uuid, None))
+
+
+def run(coroutine):
+    """Run a coroutine on the IOLoop."""
+
+    return IOLoop.current().run_sync(coroutine, timeout=10)
+
+
+def new_queue(window=0):
+    """Return a new queue and its stub controller."""
+
+    controller = Controller()
+    queue = IntentQueue(controller.send_intent, controller.remove_intent,
+                        window=window)
+
+    return queue, controller
+
+
+def test_add():
+    """Queued operations are sent at the end of the window."""
+
+    queue, controller = new_queue(window=5)
+
+    @gen.coroutine
+    def add():
+        """Add two intents."""
+
+        futures = [queue.add(URL, {'port': 1}, "a"),
+                   queue.add(URL, {'port': 2}, "b")]
+
+        assert queue.busy(URL)
+        assert not controller.calls
+
+        uuids = yield futures
+        assert uuids == ["a", "b"]
+
+    run(add)
+
+    assert controller.calls == [("POST", "a", {'port': 1}),
+                                ("POST", "b", {'port': 2})]
+    assert not queue.busy(URL)
+    assert (queue.queued, queue.merged, queue.submitted) == (2, 0, 2)
+    assert queue.batches == 1
+    assert queue.depth.to_dict()['2'] == 1
+
+
+def test_add_update():
+    """An update merges with the queued add."""
+
+    queue, controller = new_queue()
+
+    @gen.coroutine
+    def add_update():
+        """Add and update an intent."""
+
+        first = queue.add(URL, {'port': 1}, "a")
+        second = queue.update(URL, {'port': 2}, "a")
+
+        assert first is second
+        assert (yield first) == "a"
+
+    run(add_update)
+
+    assert controller.calls == [("POST", "a", {'port': 2})]
+    assert (queue.queued, queue.merged, queue.submitted) == (1, 1, 1)
+
+
+def test_update_update():
+    """Updates merge with the queued update."""
+
+    queue, controller = new_queue()
+
+    @gen.coroutine
+    def update_update():
+        """Update an intent three times."""
+
+        futures = [queue.update(URL, {'port': port}, "a")
+                   for port in range(3)]
+        yield futures
+
+    run(update_update)
+
+    assert controller.calls == [("PUT", "a", {'port': 2})]
+    assert (queue.queued, queue.merged, queue.submitted) == (1, 2, 1)
+
+
+def test_add_remove():
+    """A removal cancels the queued add, nothing is sent."""
+
+    queue, controller = new_queue()
+
+    @gen.coroutine
+    def add_remove():
+        """Add and remove an intent."""
+
+        added = queue.add(URL, {'port': 1}, "a")
+        removed = queue.remove(URL, "a")
+
+        assert (yield added) is None
+        assert (yield removed) is None
+        assert not queue.busy(URL)
+
+        yield gen.moment
+
+    run(add_remove)
+
+    assert controller.calls == []
+    assert (queue.queued, queue.merged, queue.submitted) == (1, 2, 0)
+    assert queue.batches == 0
+
+
+def test_update_remove():
+    """A removal supersedes the queued update."""
+
+    queue, controller = new_queue()
+
+    @gen.coroutine
+    def update_remove():
+        """Update and remove an intent."""
+
+        updated = queue.update(URL, {'port': 1}, "a")
+        removed = queue.remove(URL, "a")
+
+        assert (yield updated) is None
+        yield removed
+
+    run(update_remove)
+
+    assert controller.calls == [("DELETE", "a", None)]
+    assert (queue.queued, queue.merged, queue.submitted) == (2, 1, 1)
+
+
+def test_remove_update():
+    """Updates of an intent being removed are dropped."""
+
+    queue, controller = new_queue()
+
+    @gen.coroutine
+    def remove_update():
+        """Remove and update an intent."""
+
+        removed = queue.remove(URL, "a")
+        updated = queue.update(URL, {'port': 1}, "a")
+
+        assert (yield updated) is None
+        yield removed
+
+    run(remove_update)
+
+    assert controller.calls == [("DELETE", "a", None)]
+    assert (queue.queued, queue.merged, queue.submitted) == (1, 1, 1)
+
+
+def test_remove_all():
+    """Removing all the intents is not queued."""
+
+    queue, controller = new_queue()
+
+    run(lambda: queue.remove(URL, None))
+
+    assert controller.calls == [("DELETE", None, None)]
+    assert queue.queued == 0
+
+
+def test_serialization():
+    """Operations on the same intent wait for the one in flight."""
+
+    queue, controller = new_queue()
+    controller.gate = Future()
+
+    @gen.coroutine
+    def serialize():
+        """Update an intent and a second one while the add is in flight."""
+
+        added = queue.add(URL, {'port': 1}, "a")
+        yield gen.moment
+
+        assert controller.started == [("POST", "a")]
+
+        updated = queue.update(URL, {'port': 2}, "a")
+        other = queue.add(URL, {'port': 3}, "b")
+
+        for _ in range(3):
+            yield gen.moment
+
+        # the update waits for the add, the other intent does not
+        assert controller.started == [("POST", "a"), ("POST", "b")]
+        assert queue.busy(URL)
+
+        controller.gate.set_result(None)
+
+        yield [added, updated, other]
+
+    run(serialize)
+
+    assert controller.started == [("POST", "a"), ("POST", "b"),
+                                  ("PUT", "a")]
+    assert controller.calls[-1] == ("PUT", "a", {'port': 2})
+    assert (queue.queued, queue.merged, queue.submitted) == (3, 0, 3)
+    assert queue.batches == 2
+    assert not queue.busy(URL)
+
+
+def test_serialization_failure():
+    """Operations are sent even if the previous one on the intent failed."""
+
+    queue, controller = new_queue()
+    controller.gate = Future()
+
+    @gen.coroutine
+    def serialize():
+        """Remove an intent while its failing add is in flight."""
+
+        added = queue.add(URL, {'port': 1}, "a")
+        yield gen.moment
+
+        removed = queue.remove(URL, "a")
+
+        controller.gate.set_exception(ValueError("failed"))
+
+        try:
+            yield added
+        except ValueError:
+            pass
+        else:
+            assert False, "the add did not fail"
+
+        controller.gate = None
+        yield removed
+
+    run(serialize)
+
+    assert controller.calls == [("DELETE", "a", None)]
+    assert controller.started == [("POST", "a"), ("DELETE", "a")]
+    assert queue.submitted == 2
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Intent server tests.
+
+The intent server and its HTTP client are tested against an SDN controller
+stand-in (see sdncontroller.py).
+"""
+
+import json
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.intentserver.intentclient import IntentClient
+from empower.intentserver.pooledclient import PooledHTTPClient
+
+from sdncontroller import SDNController
+
+POA = {'version': '1.0', 'dpid': '00:00:00:00:00:00:00:01', 'port': 1,
+       'hwaddr': '04:F0:21:09:F9:93'}
+
+
+def run(coroutine):
+    """Run a coroutine on the IOLoop."""
+
+    return IOLoop.current().run_sync(coroutine, timeout=10)
+
+
+@gen.coroutine
+def settle(intent_server):
+    """Wait for the queued intent operations to complete."""
+
+    yield gen.moment
+
+    while any(intent_server.queue.busy(url) for url in intent_server.urls) \
+            or intent_server.client.in_flight:
+        yield gen.sleep(0.01)
+
+
+def test_client(controller):
+    """Requests and responses go through the HTTP client."""
+
+    client = IntentClient("127.0.0.1", controller.port)
+
+    @gen.coroutine
+    def requests():
+        """Create, update, list, and remove an intent."""
+
+        code, _, location, _ = \
+            yield client.request("POST", "/intent/poas", POA)
+        assert code == 201
+
+        ret = yield client.request("PUT", location, dict(POA, port=2))
+        assert ret[0] == 204
+
+        ret = yield client.request("GET", "/intent/poas")
+        assert ret[0] == 200
+        assert [intent['port'] for intent in
+                json.loads(ret[3].decode('UTF-8')).values()] == [2]
+
+        ret = yield client.request("DELETE", location)
+        assert ret[0] == 204
+
+        ret = yield client.request("DELETE", location)
+        assert ret[0] == 404
+
+    run(requests)
+
+    assert not controller.intents("intent/poas")
+    assert client.requests == 5
+    assert client.failures == 1
+    assert client.in_flight == 0
+
+
+def pooled_client(port, max_clients=10, timeout=5.0):
+    """Return an intent client using the pooled HTTP client."""
+
+    client = IntentClient("127.0.0.1", port, max_clients, timeout)
+    client.http_client = PooledHTTPClient(max_clients=max_clients)
+
+    return client
+
+
+def test_keep_alive(controller):
+    """Sequential requests reuse the same connection."""
+
+    client = pooled_client(controller.port)
+
+    @gen.coroutine
+    def requests():
+        """Send a few requests, one at a time."""
+
+        for i in range(5):
+            ret = yield client.request("POST", "/intent/rules", {'id': i})
+            assert ret[0] == 201
+
+        ret = yield client.request("GET", "/intent/rules")
+        assert len(json.loads(ret[3].decode('UTF-8'))) == 5
+
+    run(requests)
+
+    assert len(controller.peers) == 1
+    assert client.to_dict()['pool'] == {'max_clients': 10, 'opened': 1,
+                                        'reused': 5, 'retried': 0,
+                                        'idle': 1}
+
+
+def test_keep_alive_concurrency(controller):
+    """At most max_clients connections are opened."""
+
+    controller.delay = 0.02
+    client = pooled_client(controller.port, max_clients=4)
+
+    @gen.coroutine
+    def requests():
+        """Send two bursts of requests."""
+
+        for _ in range(2):
+            ret = yield [client.request("POST", "/intent/rules", {'id': i})
+                         for i in range(12)]
+            assert [code for code, _, _, _ in ret] == [201] * 12
+
+    run(requests)
+
+    assert len(controller.peers) == 4
+    assert client.http_client.opened == 4
+    assert client.http_client.reused == 20
+    assert controller.max_in_flight == 4
+
+
+def test_keep_alive_idle():
+    """Idle connections closed by the server are not reused."""
+
+    controller = SDNController()
+    server = controller.listen(0, idle_connection_timeout=0.05)
+    client = pooled_client(controller.port)
+
+    @gen.coroutine
+    def requests():
+        """Send a request after the idle connection has been closed."""
+
+        ret = yield client.request("POST", "/intent/rules", {'id': 0})
+        assert ret[0] == 201
+
+        yield gen.sleep(0.2)
+
+        ret = yield client.request("POST", "/intent/rules", {'id': 1})
+        assert ret[0] == 201
+
+    try:
+        run(requests)
+    finally:
+        server.stop()
+
+    assert len(controller.intents("intent/rules")) == 2
+    assert len(controller.peers) == 2
+    assert client.http_client.opened == 2
+    assert client.failures == 0
+
+
+def test_keep_alive_retry():
+    """Requests are sent again if the server closed the idle connection
+    before the client noticed."""
+
+    controller = SDNController()
+    server = controller.listen(0)
+    client = pooled_client(controller.port)
+
+    @gen.coroutine
+    def requests():
+        """Send a request over a connection closed by the server."""
+
+        ret = yield client.request("POST", "/intent/rules", {'id': 0})
+        assert ret[0] == 201
+
+        # close the server side without running the IOLoop
+        for connection in list(server._connections):
+            connection.stream.close()
+
+        ret = yield client.request("POST", "/intent/rules", {'id': 1})
+        assert ret[0] == 201
+
+    try:
+        run(requests)
+    finally:
+        server.stop()
+
+    assert len(controller.intents("intent/rules")) == 2
+    assert client.http_client.retried == 1
+    assert client.http_client.opened == 2
+    assert client.failures == 0
+
+
+def test_keep_alive_refused():
+    """Connection errors are reported with status 599."""
+
+    controller = SDNController()
+    server = controller.listen(0)
+    server.stop()
+
+    client = pooled_client(controller.port, timeout=1)
+
+    ret = run(lambda: client.request("GET", "/intent/rules"))
+
+    assert ret[0] == 599
+    assert client.failures == 1
+
+
+def test_client_concurrency(controller):
+    """At most max_clients requests are in flight."""
+
+    controller.delay = 0.05
+    client = IntentClient("127.0.0.1", controller.port, max_clients=4)
+
+    @gen.coroutine
+    def requests():
+        """Send a burst of requests."""
+
+        ret = yield [client.request("POST", "/intent/rules", {'id': i})
+                     for i in range(12)]
+
+        assert [code for code, _, _, _ in ret] == [201] * 12
+
+    run(requests)
+
+    assert controller.max_in_flight == 4
+    assert client.max_in_flight == 12
+    assert len(controller.intents("intent/rules")) == 12
+
+
+def test_client_timeout(controller):
+    """Requests timing out are reported as failures."""
+
+    controller.delay = 0.5
+    client = IntentClient("127.0.0.1", controller.port, timeout=0.1)
+
+    @gen.coroutine
+    def request():
+        """Send a request to the slow controller."""
+
+        ret = yield client.request("GET", "/intent/poas")
+        assert ret[0] == 599
+
+    run(request)
+
+    assert client.failures == 1
+
+
+def test_non_blocking(controller, intent_server):
+    """Intents are returned immediately and applied in the background."""
+
+    controller.delay = 0.05
+
+    intent_id = intent_server.add_poa(POA)
+
+    assert intent_id in intent_server.desired[intent_server.intent_url_poa]
+    assert controller.requests == 0
+
+    run(lambda: settle(intent_server))
+
+    assert list(controller.intents("intent/poas").values()) == [POA]
+
+
+def test_update_remove(controller, intent_server):
+    """Updates and removals are applied to the SDN controller."""
+
+    @gen.coroutine
+    def update_remove():
+        """Create, update, and remove a point of attachment."""
+
+        intent_id = intent_server.add_poa(POA)
+        yield settle(intent_server)
+
+        yield intent_server.update_poa(dict(POA, port=2), intent_id)
+        assert [intent['port'] for intent in
+                controller.intents("intent/poas").values()] == [2]
+
+        yield intent_server.remove_poa(intent_id)
+        assert not controller.intents("intent/poas")
+
+    run(update_remove)
+
+    assert intent_server.failures == 0
+
+
+def test_reconcile(controller, intent_server):
+    """Stale intents are removed and lost intents are created again."""
+
+    @gen.coroutine
+    def reconcile():
+        """Reconcile the intents."""
+
+        intent_server.add_rule({'id': 1})
+        yield settle(intent_server)
+
+        rules = controller.intents("intent/rules")
+        rules.clear()
+        rules['5d4b3a62-3bd0-4d6c-a1b4-63f2e0d8e7d1'] = {'id': 0}
+
+        yield intent_server.reconcile()
+        yield settle(intent_server)
+
+    run(reconcile)
+
+    assert list(controller.intents("intent/rules").values()) == [{'id': 1}]
+    assert intent_server.recreated == 1
+    assert intent_server.removed_stale == 1
+
+
+def test_update_unknown(controller, intent_server):
+    """Updating an unknown intent creates it."""
+
+    @gen.coroutine
+    def update_unknown():
+        """Update a removed point of attachment."""
+
+        intent_id = intent_server.add_poa(POA)
+        yield settle(intent_server)
+
+        yield intent_server.remove_poa(intent_id)
+        yield intent_server.update_poa(dict(POA, port=2), intent_id)
+        yield settle(intent_server)
+
+        assert intent_id in intent_server.desired[intent_server.intent_url_poa]
+
+    run(update_unknown)
+
+    assert [intent['port'] for intent in
+            controller.intents("intent/poas").values()] == [2]
+    assert intent_server.failures == 0
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""LVAP tests."""
+
+import pytest
+
+from construct import Container
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.ssid import SSID
+from empower.core.lvap import LVAP
+from empower.core.networkport import NetworkPort
+from empower.core.resourcepool import ResourceBlock
+from empower.core.tenant import T_TYPE_UNIQUE
+from empower.lvapp import PT_VERSION
+from empower.lvapp import PT_ASSOC_REQUEST
+from empower.lvapp import ASSOC_REQUEST
+
+STA = EtherAddress("04:F0:21:09:F9:93")
+NET_BSSID = EtherAddress("02:CA:FE:09:F9:93")
+TENANT_NAME = SSID("EmPOWER")
+
+
+def next_iteration():
+    """Run the IOLoop for one iteration."""
+
+    @gen.coroutine
+    def moment():
+        """Yield to the IOLoop."""
+
+        yield gen.moment
+
+    IOLoop.current().run_sync(moment)
+
+
+@pytest.fixture(scope="module")
+def tenant(runtime):
+    """Return a tenant with unique BSSIDs."""
+
+    tenant_id = runtime.add_tenant("root", "Test tenant", TENANT_NAME,
+                                   T_TYPE_UNIQUE)
+
+    yield runtime.tenants[tenant_id]
+
+    runtime.remove_tenant(tenant_id)
+
+
+@pytest.fixture
+def blocks(wtp):
+    """Return the resource blocks of the WTP, the WTP connection records the
+    ADD_LVAP messages in its add_lvap attribute."""
+
+    port = NetworkPort(dpid=wtp.addr, port_id=1, hwaddr=wtp.addr,
+                       iface="empower0")
+    wtp.ports[port.port_id] = port
+
+    blocks = [ResourceBlock(wtp, EtherAddress("00:0D:B9:2F:56:65"), 36, 0),
+              ResourceBlock(wtp, EtherAddress("00:0D:B9:2F:56:66"), 6, 0)]
+
+    for block in blocks:
+        wtp.add_block(block)
+
+    connection = wtp.connection
+    send_add_lvap = connection.send_add_lvap
+    connection.add_lvap = []
+
+    def record_add_lvap(lvap, block, set_mask):
+        """Record and send ADD_LVAP message."""
+
+        connection.add_lvap.append((block, set_mask))
+        send_add_lvap(lvap, block, set_mask)
+
+    connection.send_add_lvap = record_add_lvap
+
+    return blocks
+
+
+@pytest.fixture
+def lvap(runtime, lvapp_server, intent_server, tenant, blocks):
+    """Return an LVAP scheduled on the blocks (the first one is the
+    downlink). The LVAP is removed at teardown."""
+
+    lvap = LVAP(STA, NET_BSSID, NET_BSSID)
+    lvap.supported_band = 0
+    lvap.ssids = [tenant.tenant_name]
+
+    runtime.lvaps[STA] = lvap
+
+    lvap.blocks = blocks
+
+    next_iteration()
+
+    yield lvap
+
+    runtime.remove_lvap(STA)
+
+
+def add_lvap(wtp):
+    """Return the ADD_LVAP messages sent to the WTP so far, and forget
+    them."""
+
+    connection = wtp.connection
+    out = connection.add_lvap
+    connection.add_lvap = []
+
+    return out
+
+
+def assoc_request(lvap, ssid):
+    """Return a raw association request."""
+
+    ssid = ssid.to_raw()
+
+    return ASSOC_REQUEST.build(Container(version=PT_VERSION,
+                                         type=PT_ASSOC_REQUEST,
+                                         length=37 + len(ssid),
+                                         seq=1,
+                                         wtp=lvap.wtp.addr.to_raw(),
+                                         sta=lvap.addr.to_raw(),
+                                         bssid=lvap.net_bssid.to_raw(),
+                                         hwaddr=lvap.blocks[0].hwaddr.to_raw(),
+                                         channel=lvap.blocks[0].channel,
+                                         band=lvap.blocks[0].band,
+                                         supported_band=1,
+                                         ssid=ssid))
+
+
+def test_assign_blocks(wtp, lvap, blocks):
+    """Assigning the blocks sends one ADD_LVAP per block."""
+
+    assert add_lvap(wtp) == [(blocks[0], True), (blocks[1], False)]
+
+
+def test_association(wtp, lvap, blocks, tenant):
+    """An association sends one ADD_LVAP per block."""
+
+    add_lvap(wtp)
+    saved = LVAP.refreshes_saved
+
+    frame = assoc_request(lvap, tenant.tenant_name)
+    lvap.wtp.connection._trigger_message(PT_ASSOC_REQUEST, frame)
+
+    assert lvap.tenant == tenant
+    assert lvap.supported_band == 1
+    assert add_lvap(wtp) == [(blocks[0], True), (blocks[1], False)]
+
+    next_iteration()
+
+    assert not add_lvap(wtp)
+    assert LVAP.refreshes_saved == saved + 2
+
+
+def test_coalesce(wtp, lvap, blocks):
+    """Changes made in the same IOLoop iteration are sent once, at the next
+    iteration."""
+
+    add_lvap(wtp)
+    refreshes = LVAP.refreshes
+
+    lvap.encap = EtherAddress("02:00:00:00:00:01")
+    lvap.assoc_id = 10
+    lvap.supported_band = 1
+
+    assert not add_lvap(wtp)
+
+    next_iteration()
+
+    assert add_lvap(wtp) == [(blocks[0], True), (blocks[1], False)]
+    assert LVAP.refreshes == refreshes + 1
+
+
+def test_commit(wtp, lvap, blocks):
+    """Pending changes can be sent immediately."""
+
+    add_lvap(wtp)
+
+    lvap.assoc_id = 11
+    lvap.commit()
+
+    assert add_lvap(wtp) == [(blocks[0], True), (blocks[1], False)]
+
+    lvap.commit()
+    next_iteration()
+
+    assert not add_lvap(wtp)
+
+
+def test_no_change(wtp, lvap):
+    """Setting a field to its current value does not refresh the LVAP."""
+
+    add_lvap(wtp)
+
+    lvap.assoc_id = lvap.assoc_id
+    lvap.ssids = list(lvap.ssids)
+
+    next_iteration()
+
+    assert not add_lvap(wtp)
+
+
+def test_clear(wtp, lvap):
+    """Pending changes are dropped when the LVAP is cleared."""
+
+    add_lvap(wtp)
+
+    lvap.assoc_id = 12
+    lvap.clear_lvap()
+
+    next_iteration()
+
+    assert not add_lvap(wtp)
+
+
+def test_remove_lvap(runtime, wtp, lvap, blocks):
+    """Removing the LVAP drops only its own transmission policies."""
+
+    other = ResourceBlock(wtp, EtherAddress("00:0D:B9:2F:56:67"), 11, 0)
+    wtp.add_block(other)
+
+    for block in blocks + [other]:
+        block.tx_policies[STA].ur_count = 5
+
+    runtime.remove_lvap(STA)
+
+    assert STA not in runtime.lvaps
+    assert all(STA not in block.tx_policies for block in blocks)
+    assert STA in other.tx_policies
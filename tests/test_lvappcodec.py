@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""LVAPP codec tests.
+
+Every precompiled codec is checked against the construct definition of the
+same message: messages built by either must be identical and must decode to
+the same fields with either.
+"""
+
+import pytest
+
+from construct import Struct
+from construct import Container
+
+import empower.lvapp
+
+from empower.lvapp.lvappcodec import CODECS
+from empower.wifi_stats.wifi_stats import WIFI_STATS_RESPONSE
+from empower.wifi_stats.wifi_stats import METRICS
+from empower.wifi_stats.wifi_stats import NB_METRIC_ENTRIES
+
+ADDR = b'\x00\x0d\xb9\x2f\x56\x64'
+STA = b'\x04\xf0\x21\x09\xf9\x93'
+BSSID = b'\x02\xca\xfe\x00\x00\x01'
+
+CONSTRUCTS = {parser.name: parser for parser in vars(empower.lvapp).values()
+              if isinstance(parser, Struct)}
+CONSTRUCTS[WIFI_STATS_RESPONSE.name] = WIFI_STATS_RESPONSE
+
+
+def header(pt_type, length, **kwargs):
+    """Return a message with the common header."""
+
+    return Container(version=0, type=pt_type, length=length, seq=7, **kwargs)
+
+
+SAMPLES = {
+    'hello': header(0x04, 20, wtp=ADDR, period=500),
+    'probe_request': header(0x05, 35, wtp=ADDR, sta=STA, hwaddr=ADDR,
+                            channel=6, band=1, supported_band=1,
+                            ssid=b'abcd'),
+    'probe_response': header(0x06, 19, sta=STA, ssid=b'abc'),
+    'auth_request': header(0x07, 28, wtp=ADDR, sta=STA, bssid=BSSID),
+    'auth_response': header(0x08, 16, sta=STA),
+    'assoc_request': header(0x09, 39, wtp=ADDR, sta=STA, bssid=BSSID,
+                            hwaddr=ADDR, channel=36, band=0,
+                            supported_band=1, ssid=b'xy'),
+    'assoc_response': header(0x10, 16, sta=STA),
+    'add_lvap': header(0x11, 57, module_id=3,
+                       flags=Container(set_mask=True, associated=False,
+                                       authenticated=True),
+                       assoc_id=9, hwaddr=ADDR, channel=6, band=1,
+                       supported_band=1, sta=STA, encap=STA,
+                       net_bssid=BSSID, lvap_bssid=BSSID,
+                       ssids=[Container(length=4, ssid=b'abcd'),
+                              Container(length=0, ssid=b'')]),
+    'del_lvap': header(0x12, 30, module_id=3, sta=STA, target_hwaddr=ADDR,
+                       target_channel=1, tagert_band=0, csa_switch_mode=0,
+                       csa_switch_count=3),
+    'status_lvap': header(0x13, 56,
+                          flags=Container(set_mask=True, associated=True,
+                                          authenticated=False),
+                          assoc_id=2, wtp=ADDR, sta=STA, encap=STA,
+                          hwaddr=ADDR, channel=11, band=1, supported_band=0,
+                          net_bssid=BSSID, lvap_bssid=BSSID,
+                          ssids=[Container(length=2, ssid=b'ab')]),
+    'caps': header(0x17, 52, wtp=ADDR, nb_resources_elements=2,
+                   nb_ports_elements=1,
+                   blocks=[[ADDR, 1, 0], [ADDR, 36, 1]],
+                   ports=[[STA, 5, b'empower0\x00\x00']]),
+    'caps_request': header(0x16, 10),
+    'lvap_status_request': header(0x53, 10),
+    'traffic_rule_status_request': header(0x61, 10),
+    'port_status_request': header(0x62, 10),
+    'vap_status_request': header(0x54, 10),
+    'set_port': header(0x14, 37, flags=Container(no_ack=True), hwaddr=ADDR,
+                       channel=6, band=1, sta=STA, rts_cts=2436, tx_mcast=0,
+                       ur_mcast_count=3, nb_mcses=3, nb_ht_mcses=2,
+                       mcs=[2, 4, 11], ht_mcs=[0, 7]),
+    'del_port': header(0x80, 24, hwaddr=ADDR, channel=6, band=1, sta=STA),
+    'status_port': header(0x15, 39, flags=Container(no_ack=False), wtp=ADDR,
+                          sta=STA, hwaddr=ADDR, channel=6, band=1,
+                          rts_cts=2436, tx_mcast=2, ur_mcast_count=3,
+                          nb_mcses=1, nb_ht_mcses=0, mcs=[12], ht_mcs=[]),
+    'add_vap': header(0x32, 27, hwaddr=ADDR, channel=1, band=0,
+                      net_bssid=BSSID, ssid=b'abc'),
+    'del_vap': header(0x33, 16, net_bssid=BSSID),
+    'status_vap': header(0x34, 33, wtp=ADDR, hwaddr=ADDR, channel=1, band=0,
+                         net_bssid=BSSID, ssid=b'abc'),
+    'add_del_lvap': header(0x51, 30, wtp=ADDR, sta=STA, module_id=5,
+                           status=0),
+    'set_traffic_rule': header(0x56, 28,
+                               flags=Container(amsdu_aggregation=True),
+                               hwaddr=ADDR, channel=1, band=0,
+                               quantum=12000, dscp=0, ssid=b'abc'),
+    'del_traffic_rule': header(0x57, 22, hwaddr=ADDR, channel=1, band=0,
+                               dscp=0, ssid=b'abc'),
+    'status_traffic_rule': header(0x58, 34, wtp=ADDR,
+                                  flags=Container(amsdu_aggregation=False),
+                                  hwaddr=ADDR, channel=1, band=0,
+                                  quantum=12000, dscp=0x40, ssid=b'abc'),
+    'multi_request': header(0x63, 56, nb_requests=2,
+                            requests=b'\x00\x26\x00\x00\x00\x16' +
+                            b'\x01' * 16 +
+                            b'\x00\x28\x00\x00\x00\x16' +
+                            b'\x02' * 16),
+    'multi_response': header(0x64, 38, wtp=ADDR, nb_responses=1,
+                             responses=b'\x00\x27\x00\x00\x00\x14' +
+                             b'\x03' * 14),
+    'wifi_stats_response': header(0x38, 22 + 9 * 3 * NB_METRIC_ENTRIES,
+                                  module_id=4, wtp=ADDR,
+                                  nb_entries=3 * NB_METRIC_ENTRIES,
+                                  entries=[[i // NB_METRIC_ENTRIES,
+                                            1000 + i, i % 181]
+                                           for i in
+                                           range(3 * NB_METRIC_ENTRIES)]),
+}
+
+
+def normalize(value):
+    """Return a comparable representation of a decoded message."""
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+
+    if isinstance(value, bool):
+        return int(value)
+
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+
+    if hasattr(value, '__dict__'):
+        return {k: normalize(v) for k, v in vars(value).items()}
+
+    return value
+
+
+def decoded(codec, msg):
+    """Return the fields of a message decoded by a codec in the construct
+    layout."""
+
+    if codec.name != 'wifi_stats_response':
+        return normalize(msg)
+
+    out = normalize({k: v for k, v in vars(msg).items()
+                     if k not in METRICS})
+    out['entries'] = [list(entry) for metric in METRICS
+                      for entry in zip(getattr(msg, metric).types,
+                                       getattr(msg, metric).timestamps,
+                                       getattr(msg, metric).samples)]
+
+    return out
+
+
+def test_samples():
+    """Every registered codec has a sample message."""
+
+    assert sorted(SAMPLES) == sorted(CODECS)
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_construct_to_codec(name):
+    """Messages built with construct are decoded by the codec."""
+
+    codec = CODECS[name]
+    parser = CONSTRUCTS[name]
+
+    raw = parser.build(SAMPLES[name])
+    msg = codec.parse(memoryview(raw))
+
+    assert len(raw) == SAMPLES[name].length
+    assert decoded(codec, msg) == normalize(parser.parse(raw))
+    assert codec.build(msg) == raw
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_codec_to_construct(name):
+    """Messages built with the codec are decoded by construct."""
+
+    codec = CODECS[name]
+    parser = CONSTRUCTS[name]
+
+    raw = codec.build(codec.parse(parser.build(SAMPLES[name])))
+
+    if name != 'wifi_stats_response':
+        assert codec.build(SAMPLES[name]) == raw
+
+    assert normalize(parser.parse(raw)) == \
+        normalize(parser.parse(parser.build(SAMPLES[name])))
+    assert decoded(codec, codec.parse(raw)) == normalize(parser.parse(raw))
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_offset(name):
+    """Messages are decoded in place from a larger buffer."""
+
+    codec = CODECS[name]
+    raw = CONSTRUCTS[name].build(SAMPLES[name])
+
+    buf = memoryview(b'\xff' * 5 + raw + b'\xff' * 3)
+
+    assert decoded(codec, codec.parse(buf, 5)) == \
+        decoded(codec, codec.parse(raw))
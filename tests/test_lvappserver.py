@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""LVAPP Server tests."""
+
+import pytest
+
+from construct import Container
+
+from empower.lvapp.lvappserver import ModuleLVAPPWorker
+from empower.lvapp.lvappserver import _to_bool
+from empower.maps.maps import POLLER_RESPONSE
+from empower.maps.ucqm import UCQM
+from empower.maps.ncqm import NCQM
+
+# a response type not used by any module
+PT_TEST_RESPONSE = 0xF0
+
+
+class Module:
+    """A module recording its responses."""
+
+    def __init__(self):
+        self.responses = []
+
+    def handle_response(self, response):
+        """Record response."""
+
+        self.responses.append(response)
+
+
+def poller_response(wtp, module_id):
+    """Return a raw poller response."""
+
+    return POLLER_RESPONSE.build(Container(version=0,
+                                           type=PT_TEST_RESPONSE,
+                                           length=24,
+                                           seq=1,
+                                           module_id=module_id,
+                                           wtp=wtp.addr.to_raw(),
+                                           nb_entries=0,
+                                           img_entries=[]))
+
+
+def test_shared_response_type(lvapp_server, wtp):
+    """Two workers on the same response type both get their responses."""
+
+    ucqm = ModuleLVAPPWorker(UCQM, PT_TEST_RESPONSE, POLLER_RESPONSE)
+    ncqm = ModuleLVAPPWorker(NCQM, PT_TEST_RESPONSE, POLLER_RESPONSE)
+
+    ucqm.modules[1] = Module()
+    ncqm.modules[2] = Module()
+
+    orphans = lvapp_server.orphans.get(PT_TEST_RESPONSE, 0)
+
+    for module_id in (1, 2, 3):
+        frame = poller_response(wtp, module_id)
+        wtp.connection._trigger_message(PT_TEST_RESPONSE, frame)
+
+    assert [msg.module_id for msg in ucqm.modules[1].responses] == [1]
+    assert [msg.module_id for msg in ncqm.modules[2].responses] == [2]
+
+    assert lvapp_server.orphans[PT_TEST_RESPONSE] == orphans + 1
+    assert ucqm.to_dict()['orphans'] == orphans + 1
+
+
+@pytest.mark.parametrize("value, expected", [(True, True), ("True", True),
+                                             ("true", True), ("1", True),
+                                             (False, False), ("False", False),
+                                             ("no", False), ("0", False)])
+def test_to_bool(value, expected):
+    """Boolean command line options are parsed explicitly."""
+
+    assert _to_bool(value) is expected
+
+
+def test_to_bool_invalid():
+    """Invalid boolean command line options are rejected."""
+
+    with pytest.raises(ValueError):
+        _to_bool("maybe")
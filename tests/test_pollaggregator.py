@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Poll aggregator tests.
+
+Poll requests are sent by a worker through the aggregator to an agent
+stand-in, the responses (single or carried by a MULTI_RESPONSE) must reach
+the modules that sent the requests.
+"""
+
+import pytest
+
+from construct import Container
+
+from agent import Agent
+
+from empower.lvapp import PT_VERSION
+from empower.lvapp.lvappserver import ModuleLVAPPWorker
+from empower.maps.maps import POLLER_REQUEST
+from empower.maps.maps import POLLER_RESPONSE
+from empower.maps.ucqm import UCQM
+
+# request and response types not used by any module
+PT_TEST_REQUEST = 0xF1
+PT_TEST_RESPONSE = 0xF2
+
+NB_MODULES = 3
+
+
+class Module:
+    """A module recording its responses."""
+
+    def __init__(self):
+        self.responses = []
+
+    def handle_response(self, response):
+        """Record response."""
+
+        self.responses.append(response)
+
+
+def poller_request(wtp, module_id):
+    """Return a raw poller request."""
+
+    return POLLER_REQUEST.build(Container(version=PT_VERSION,
+                                          type=PT_TEST_REQUEST,
+                                          length=22,
+                                          seq=wtp.seq,
+                                          module_id=module_id,
+                                          hwaddr=wtp.addr.to_raw(),
+                                          channel=36,
+                                          band=0))
+
+
+@pytest.fixture(scope="module")
+def worker(lvapp_server):
+    """Return a worker with NB_MODULES modules."""
+
+    worker = ModuleLVAPPWorker(UCQM, PT_TEST_RESPONSE, POLLER_RESPONSE)
+
+    for module_id in range(1, NB_MODULES + 1):
+        worker.modules[module_id] = Module()
+
+    return worker
+
+
+@pytest.fixture
+def agent(wtp, lvapp_server, worker):
+    """Return an agent stand-in connected to the WTP."""
+
+    agent = Agent(wtp.addr.to_raw())
+    agent.responders[PT_TEST_REQUEST] = agent.poller_response
+
+    wtp.connection = lvapp_server.CONNECTION(agent, ("127.0.0.1", 4433),
+                                             lvapp_server)
+    wtp.connection.wtp = wtp
+    agent.connection = wtp.connection
+
+    for module in worker.modules.values():
+        module.responses = []
+
+    aggregator = lvapp_server.aggregator
+    multi_request = aggregator.multi_request
+
+    yield agent
+
+    aggregator.multi_request = multi_request
+
+
+def poll(wtp, agent, worker):
+    """Send one request for each module and deliver the responses."""
+
+    for module_id in worker.modules:
+        worker.send_request(wtp, poller_request(wtp, module_id))
+
+    worker.pnfp_server.aggregator.flush()
+    agent.reply()
+
+    assert not agent.closed()
+
+    for module_id, module in worker.modules.items():
+        assert [msg.module_id for msg in module.responses] == [module_id]
+
+
+def test_aggregation(lvapp_server, wtp, agent, worker):
+    """Requests for the same WTP are sent with a single write."""
+
+    lvapp_server.aggregator.multi_request = False
+
+    bursts = lvapp_server.aggregator.bursts
+
+    poll(wtp, agent, worker)
+
+    assert agent.writes == 1
+    assert agent.messages == NB_MODULES
+    assert agent.multi_requests == 0
+    assert lvapp_server.aggregator.bursts == bursts + 1
+
+
+def test_multi_request(lvapp_server, wtp, agent, worker):
+    """Requests for the same WTP are wrapped in a MULTI_REQUEST and answered
+    with a single MULTI_RESPONSE."""
+
+    lvapp_server.aggregator.multi_request = True
+
+    multi_requests = lvapp_server.aggregator.multi_requests
+
+    poll(wtp, agent, worker)
+
+    assert agent.writes == 1
+    assert agent.multi_requests == 1
+    assert agent.requests == NB_MODULES
+    assert agent.responses == 1
+    assert lvapp_server.aggregator.multi_requests == multi_requests + 1
+
+
+def test_multi_request_single_responses(lvapp_server, wtp, agent, worker):
+    """Requests wrapped in a MULTI_REQUEST can be answered with individual
+    responses."""
+
+    lvapp_server.aggregator.multi_request = True
+    agent.multi_response = False
+
+    poll(wtp, agent, worker)
+
+    assert agent.multi_requests == 1
+    assert agent.responses == NB_MODULES
+
+
+def test_closed_connection(lvapp_server, wtp, agent, worker):
+    """Requests for a closed connection are dropped."""
+
+    dropped = lvapp_server.aggregator.dropped
+
+    worker.send_request(wtp, poller_request(wtp, 1))
+    agent.close()
+    lvapp_server.aggregator.flush()
+
+    assert agent.writes == 0
+    assert lvapp_server.aggregator.dropped == dropped + 1
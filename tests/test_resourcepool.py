@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Resource pool tests."""
+
+import pytest
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.ssid import SSID
+from empower.core.resourcepool import TxPolicyProp
+from empower.core.resourcepool import TrafficRuleQueueProp
+from empower.core.resourcepool import ResourceBlock
+from empower.core.resourcepool import ResourcePool
+from empower.core.resourcepool import CQMEntry
+from empower.core.resourcepool import BT_L20
+from empower.core.resourcepool import BT_HT20
+from empower.core.wtp import WTP
+
+STA = EtherAddress("04:F0:21:09:F9:93")
+
+
+@pytest.fixture
+def block():
+    """Return a resource block."""
+
+    wtp = WTP(EtherAddress("00:0D:B9:2F:56:64"), "Test WTP")
+    block = ResourceBlock(wtp, EtherAddress("00:0D:B9:2F:56:65"), 36, 0)
+    wtp.add_block(block)
+
+    return block
+
+
+@pytest.fixture
+def pool():
+    """Return a pool of blocks, the station RSSI is known by all the blocks
+    except the last one."""
+
+    wtp = WTP(EtherAddress("00:0D:B9:2F:56:64"), "Test WTP")
+    pool = ResourcePool()
+
+    for index, (channel, band) in enumerate([(36, BT_L20), (40, BT_HT20),
+                                             (6, BT_L20), (36, BT_HT20),
+                                             (11, BT_L20)]):
+        hwaddr = EtherAddress(bytes([0, 0x0D, 0xB9, 0x2F, 0x56, index]))
+        block = ResourceBlock(wtp, hwaddr, channel, band)
+        wtp.add_block(block)
+        pool.append(block)
+
+    for block, rssi, avg in zip(pool, [-70, -50, -90, -60], [-40, -80, -50,
+                                                             -90]):
+        block.ucqm[STA] = CQMEntry(STA, last_rssi_avg=avg, mov_rssi=rssi)
+
+    return pool
+
+
+def test_default_policy(block):
+    """Default policies are not stored."""
+
+    policies = TxPolicyProp(block)
+
+    txp = policies[STA]
+
+    assert txp.addr == STA
+    assert txp.block == block
+    assert STA not in policies
+
+
+def test_default_traffic_rule_queue(block):
+    """Tuple keys are expanded when building the default policy."""
+
+    queues = TrafficRuleQueueProp(block)
+
+    queue = queues[(SSID("EmPOWER"), 0x40)]
+
+    assert queue.ssid == SSID("EmPOWER")
+    assert queue.dscp == 0x40
+    assert queue.block == block
+    assert not queues
+
+
+def test_expire(block):
+    """Idle policies are removed, the pinned ones are kept."""
+
+    policies = TxPolicyProp(block)
+    policies[STA] = policies[STA]
+
+    block.downlinks[STA] = None
+    assert policies.expire(-1) == 0
+
+    del block.downlinks[STA]
+    assert policies.expire(-1) == 1
+    assert STA not in policies
+    assert policies.evicted == 1
+
+
+def test_first_last(pool):
+    """First and last return a pool with one block, or an empty pool."""
+
+    assert pool.first() == [pool[0]]
+    assert pool.last() == [pool[-1]]
+    assert isinstance(pool.first(), ResourcePool)
+
+    assert ResourcePool().first() == []
+    assert ResourcePool().last() == []
+
+
+def test_top(pool):
+    """Blocks are sorted by decreasing RSSI, unknown stations rank last."""
+
+    assert pool.top(STA) == [pool[1]]
+    assert pool.top(STA, k=3) == [pool[1], pool[3], pool[0]]
+    assert pool.top(STA, k=10) == pool.sortByRssi(STA)
+    assert isinstance(pool.top(STA), ResourcePool)
+
+    assert ResourcePool().top(STA) == []
+
+
+def test_top_metric(pool):
+    """Blocks can be ranked by any UCQM metric."""
+
+    assert pool.top(STA, k=2, metric='last_rssi_avg') == [pool[0], pool[2]]
+
+    with pytest.raises(KeyError):
+        pool.top(STA, metric='rssi')
+
+
+def test_top_filters(pool):
+    """Blocks can be filtered by band, channel, and minimum RSSI."""
+
+    assert pool.top(STA, k=5, band=BT_L20) == [pool[0], pool[2], pool[4]]
+    assert pool.top(STA, k=5, channel=36) == [pool[3], pool[0]]
+    assert pool.top(STA, k=5, min_rssi=-70) == [pool[1], pool[3], pool[0]]
+    assert pool.top(STA, band=BT_L20, min_rssi=-60) == []
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""RSSI matrix tests."""
+
+import time
+import uuid
+import types
+
+import pytest
+
+from construct import Container
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.resourcepool import ResourceBlock
+from empower.core.resourcepool import ResourcePool
+from empower.core.rssimatrix import RSSIMatrix
+from empower.core.wtp import WTP
+from empower.maps.ucqm import UCQM
+
+STA = EtherAddress("04:F0:21:09:F9:93")
+
+
+@pytest.fixture
+def blocks():
+    """Return a pool of resource blocks."""
+
+    wtp = WTP(EtherAddress("00:0D:B9:2F:56:64"), "Test WTP")
+
+    pool = ResourcePool()
+
+    for index in range(5):
+        block = ResourceBlock(wtp, EtherAddress(bytes([0, 0x0D, 0xB9, 0x2F,
+                                                       0x56, index])),
+                              36 + 4 * index, 0)
+        wtp.add_block(block)
+        pool.append(block)
+
+    return pool
+
+
+def test_best(blocks):
+    """The blocks are sorted by decreasing RSSI."""
+
+    matrix = RSSIMatrix()
+
+    for block, rssi in zip(blocks, [-70, -50, -90, -60, -80]):
+        matrix.update(STA, block, rssi)
+
+    assert matrix.best(STA) == [blocks[1]]
+    assert matrix.best(STA, k=3) == [blocks[1], blocks[3], blocks[0]]
+    assert matrix.best(STA, k=2, blocks=blocks[2:]) == [blocks[3], blocks[4]]
+    assert isinstance(matrix.best(STA, blocks=blocks), ResourcePool)
+
+
+def test_best_unknown(blocks):
+    """Blocks without a valid RSSI rank last."""
+
+    matrix = RSSIMatrix()
+
+    assert matrix.best(STA) == []
+    assert matrix.best(STA, k=2, blocks=blocks) == blocks[:2]
+
+    matrix.update(STA, blocks[4], -80)
+
+    assert matrix.best(STA, k=2, blocks=blocks) == [blocks[4], blocks[0]]
+
+
+def test_best_stale(blocks):
+    """Cells older than max_age are ignored."""
+
+    matrix = RSSIMatrix(max_age=10)
+
+    matrix.update(STA, blocks[0], -50, timestamp=time.time() - 20)
+    matrix.update(STA, blocks[1], -80)
+
+    assert matrix.best(STA) == [blocks[1]]
+    assert matrix.best(STA, k=2) == [blocks[1]]
+    assert matrix.get(STA, blocks[0]) == -float("inf")
+
+
+def test_maps(runtime, blocks, monkeypatch):
+    """The maps modules update the block maps and the tenant matrix in
+    place and keep a snapshot of the last response."""
+
+    tenant_id = uuid.uuid4()
+    tenant = types.SimpleNamespace(ucqm=RSSIMatrix())
+    monkeypatch.setitem(runtime.tenants, tenant_id, tenant)
+
+    other = EtherAddress("04:F0:21:09:F9:94")
+
+    module = UCQM()
+    module.tenant_id = tenant_id
+    module.block = blocks[0]
+
+    module.handle_response(Container(img_entries=[
+        [STA.to_raw(), 1, -60, 10, 100, -61],
+        [other.to_raw(), 2, -70, 20, 200, -71]]))
+
+    entry = blocks[0].ucqm[STA]
+    maps = module.maps
+
+    assert maps[STA].mov_rssi == -61
+    assert tenant.ucqm.get(other, blocks[0]) == -71
+
+    module.handle_response(Container(img_entries=[
+        [STA.to_raw(), 3, -50, 30, 130, -55]]))
+
+    # the block entries are updated in place
+    assert blocks[0].ucqm[STA] is entry
+    assert entry.mov_rssi == -55
+    assert other not in blocks[0].ucqm
+    assert tenant.ucqm.get(other, blocks[0]) == -float("inf")
+
+    # the previous snapshot is not modified
+    assert maps[STA].mov_rssi == -61
+    assert other in maps
+    assert module.maps is not blocks[0].ucqm
+    assert module.maps[STA].to_dict() == entry.to_dict()
+    assert list(module.maps) == [STA]
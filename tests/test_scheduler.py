@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Scheduler tests."""
+
+import json
+import random
+
+import pytest
+import tornado.ioloop
+
+from empower.core.scheduler import Scheduler
+from empower.core.scheduler import Timer
+from empower.core.scheduler import TICK_MS
+
+
+class Clock:
+    """A fake IOLoop clock driving the scheduler ticks.
+
+    Attributes:
+        ms: the current time (in ms)
+        tick: the scheduler tick callback (None if not ticking)
+    """
+
+    def __init__(self):
+
+        self.ms = 0
+        self.tick = None
+
+    def time(self):
+        """Return the current time (in s). The time is a fraction of a
+        microsecond past the current ms, so that the float rounding never
+        delays a tick."""
+
+        return (self.ms + 0.001) / 1000 if self.ms else 0.0
+
+    def advance(self, ms, step=TICK_MS):
+        """Advance the clock, calling the tick callback every step ms."""
+
+        for _ in range(ms // step):
+            self.ms += step
+            if self.tick:
+                self.tick()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the IOLoop clock and periodic callbacks with a fake clock."""
+
+    clock = Clock()
+
+    class PeriodicCallback:
+        """Periodic callback driven by the fake clock."""
+
+        def __init__(self, callback, callback_time):
+            self.callback = callback
+
+        def start(self):
+            """Start ticking."""
+
+            clock.tick = self.callback
+
+        def stop(self):
+            """Stop ticking."""
+
+            clock.tick = None
+
+    monkeypatch.setattr(tornado.ioloop.IOLoop, "current",
+                        staticmethod(lambda *args, **kwargs: clock))
+    monkeypatch.setattr(tornado.ioloop, "PeriodicCallback", PeriodicCallback)
+
+    return clock
+
+
+def recorder(clock, fires):
+    """Return a callback appending the current time to fires."""
+
+    return lambda: fires.append(clock.ms)
+
+
+class Poller:
+    """An object with a periodic method."""
+
+    def loop(self):
+        """Periodic method."""
+
+        pass
+
+
+def test_timer_to_dict():
+    """Timers are JSON-serializable."""
+
+    timer = Timer(Scheduler(), Poller().loop, 500, 0)
+
+    out = json.loads(json.dumps(timer.to_dict()))
+
+    assert out['callback'] == "Poller.loop"
+    assert out['every'] == 500
+
+
+@pytest.mark.parametrize("every", [10, 50, 990, 2560, 5000])
+def test_cadence(clock, every):
+    """Timers fire once every period, starting one period after their
+    creation (without jitter)."""
+
+    fires = []
+    scheduler = Scheduler()
+    scheduler.add_timer(recorder(clock, fires), every, jitter=0)
+
+    clock.advance(10 * every)
+
+    assert fires == [every * n for n in range(1, 11)]
+
+
+def test_cascade(clock):
+    """Timers in the coarser wheels cascade down and fire on time."""
+
+    fires = {}
+    scheduler = Scheduler()
+
+    # first wheel: 256 ticks, second wheel: 16384 ticks
+    for every in [2000, 3000, 200000]:
+        fires[every] = []
+        scheduler.add_timer(recorder(clock, fires[every]), every, jitter=0)
+
+    clock.advance(400000, step=100)
+
+    for every, times in fires.items():
+        assert times == [every * n for n in range(1, 400000 // every + 1)]
+
+
+def test_round_period(clock):
+    """Periods are rounded to the tick."""
+
+    fires = []
+    scheduler = Scheduler()
+    timer = scheduler.add_timer(recorder(clock, fires), 14, jitter=0)
+
+    clock.advance(100)
+
+    assert timer.period == 1
+    assert fires == list(range(10, 110, 10))
+
+
+def test_cancel(clock):
+    """Cancelled timers stop firing, the worker stops with the last timer."""
+
+    fires = []
+    scheduler = Scheduler()
+    timer = scheduler.add_timer(recorder(clock, fires), 100, jitter=0)
+
+    clock.advance(250)
+    timer.cancel()
+    timer.cancel()
+    clock.advance(1000)
+
+    assert fires == [100, 200]
+    assert not timer.active
+    assert scheduler.timers == 0
+    assert clock.tick is None
+
+
+def test_cancel_from_callback(clock):
+    """Timers can cancel themselves and other timers from a callback."""
+
+    fires = []
+    scheduler = Scheduler()
+    timers = {}
+
+    def first():
+        """Cancel the second timer and this one."""
+        fires.append("first")
+        timers['second'].cancel()
+        timers['first'].cancel()
+
+    timers['first'] = scheduler.add_timer(first, 100, jitter=0)
+    timers['second'] = scheduler.add_timer(recorder(clock, fires), 200,
+                                           jitter=0)
+    timers['third'] = scheduler.add_timer(recorder(clock, fires), 100,
+                                          jitter=0)
+
+    clock.advance(300)
+
+    assert fires.count("first") == 1
+    assert [fire for fire in fires if fire != "first"] == [100, 200, 300]
+    assert scheduler.timers == 1
+
+
+def test_cancel_same_tick(clock):
+    """A timer cancelled by a timer expiring in the same tick does not
+    fire."""
+
+    fires = []
+    scheduler = Scheduler()
+    timers = []
+
+    def cancel_others():
+        """Cancel all the timers."""
+        fires.append(clock.ms)
+        for timer in timers:
+            timer.cancel()
+
+    for _ in range(2):
+        timers.append(scheduler.add_timer(cancel_others, 100, jitter=0))
+
+    clock.advance(300)
+
+    assert fires == [100]
+    assert scheduler.timers == 0
+
+
+def test_callback_exception(clock):
+    """Exceptions raised by a callback do not stop the timer."""
+
+    fires = []
+
+    def fail():
+        """Fail."""
+        fires.append(clock.ms)
+        raise ValueError()
+
+    scheduler = Scheduler()
+    scheduler.add_timer(fail, 100, jitter=0)
+
+    clock.advance(300)
+
+    assert fires == [100, 200, 300]
+
+
+@pytest.mark.parametrize("jitter", [0.0, 0.5, 1.0])
+def test_jitter(clock, jitter):
+    """The first expiration is spread over jitter * period."""
+
+    random.seed(jitter)
+
+    every = 1000
+    fires = {}
+    scheduler = Scheduler()
+
+    for index in range(200):
+        fires[index] = []
+        scheduler.add_timer(recorder(clock, fires[index]), every, jitter)
+
+    clock.advance(3 * every)
+
+    first = [times[0] for times in fires.values()]
+
+    assert min(first) >= max(TICK_MS, every * (1 - jitter))
+    assert max(first) <= every
+
+    if jitter:
+        assert max(first) - min(first) >= every * jitter / 2
+    else:
+        assert set(first) == {every}
+
+    # then the timers fire every period
+    for times in fires.values():
+        assert times == [times[0] + every * n for n in range(len(times))]
+
+
+def test_invalid(clock):
+    """Periods must be positive, jitter within [0, 1]."""
+
+    scheduler = Scheduler()
+
+    with pytest.raises(ValueError):
+        scheduler.add_timer(lambda: None, 0)
+
+    with pytest.raises(ValueError):
+        scheduler.add_timer(lambda: None, 100, jitter=1.5)
+
+
+def test_lateness(clock):
+    """Stalls are caught up firing each timer once, and are reported."""
+
+    fires = []
+    scheduler = Scheduler()
+    scheduler.add_timer(recorder(clock, fires), 50, jitter=0)
+
+    clock.advance(100)
+
+    assert fires == [50, 100]
+    assert scheduler.late_max < 1
+    assert scheduler.catchups == 0
+
+    # the IOLoop stalls for 200 ms
+    clock.advance(200, step=200)
+
+    # 20 ticks processed at once, one is due and one late tick is tolerated
+    assert fires == [50, 100, 300]
+    assert scheduler.catchups == 18
+    assert 149 < scheduler.late_max < 151
+
+    # then the timer fires on time
+    clock.advance(100)
+
+    assert fires == [50, 100, 300, 350, 400]
+    assert scheduler.fired == 5
+
+    out = scheduler.to_dict()
+
+    assert out['fired'] == 5
+    assert out['late_avg'] == pytest.approx(scheduler.late_total / 5)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Remote callback sink tests."""
+
+import json
+
+import pytest
+
+from empower.core.sink import Sink
+from empower.core.sink import POLICY_COALESCE
+from empower.core.sink import POLICY_DROP_NEWEST
+
+
+class Result:
+    """A module result."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'value': self.value}
+
+
+class RecordingSink(Sink):
+    """A sink recording the payloads, calls are completed by complete()."""
+
+    def __init__(self, **kwargs):
+
+        super().__init__(**kwargs)
+
+        self.payloads = []
+        self.pending = []
+
+    def deliver(self, payload, started):
+        """Record a JSON payload."""
+
+        self.payloads.append(json.loads(payload)['value'])
+        self.pending.append(started)
+
+    def complete(self):
+        """Complete the calls in progress."""
+
+        pending, self.pending = self.pending, []
+
+        for started in pending:
+            self.done(started)
+
+
+def test_abstract():
+    """Sinks must implement deliver()."""
+
+    with pytest.raises(TypeError):
+        Sink()
+
+
+def test_concurrency():
+    """At most max_concurrency calls are in progress, results are queued."""
+
+    sink = RecordingSink(max_concurrency=2)
+
+    for value in range(5):
+        sink.send(Result(value))
+
+    assert sink.payloads == [0, 1]
+    assert sink.depth == 3
+
+    sink.complete()
+
+    assert sink.payloads == [0, 1, 2, 3]
+
+    sink.complete()
+    sink.complete()
+
+    assert sink.payloads == [0, 1, 2, 3, 4]
+    assert sink.calls == 5
+    assert sink.in_flight == 0
+
+
+def test_drop_newest():
+    """New results are dropped when the queue is full."""
+
+    sink = RecordingSink(max_concurrency=1, max_queue=2,
+                         policy=POLICY_DROP_NEWEST)
+
+    for value in range(5):
+        sink.send(Result(value))
+
+    sink.complete()
+    sink.complete()
+    sink.complete()
+
+    assert sink.payloads == [0, 1, 2]
+    assert sink.drops == 2
+
+
+def test_coalesce():
+    """Queued results are replaced by newer results of the same module."""
+
+    sink = RecordingSink(max_concurrency=1, policy=POLICY_COALESCE)
+
+    sink.send(Result(0), key="a")
+    sink.send(Result(1), key="a")
+    sink.send(Result(2), key="b")
+    sink.send(Result(3), key="a")
+
+    sink.complete()
+    sink.complete()
+    sink.complete()
+
+    assert sink.payloads == [0, 3, 2]
+    assert sink.coalesced == 1
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Time series tests."""
+
+import time
+
+import pytest
+
+import empower.core.timeseries
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.module import Module
+from empower.core.timeseries import TimeSeries
+from empower.core.timeseries import TimeSeriesStore
+from empower.core.timeseries import get_timeseries
+from empower.bin_counter.bin_counter import BinCounter
+
+STA = EtherAddress("04:F0:21:09:F9:93")
+
+
+def series(values, capacity=10):
+    """Return a time series with one sample per second."""
+
+    out = TimeSeries(capacity)
+
+    for timestamp, value in enumerate(values):
+        out.append(value, float(timestamp))
+
+    return out
+
+
+@pytest.fixture
+def expire_always(monkeypatch):
+    """Look for idle time series at every new time series."""
+
+    monkeypatch.setattr(empower.core.timeseries, "EXPIRE_PERIOD", -1)
+
+
+def test_invalid_capacity():
+    """The capacity must be positive."""
+
+    with pytest.raises(ValueError):
+        TimeSeries(0)
+
+
+def test_empty():
+    """Empty time series have no samples, no rate, and no aggregates."""
+
+    empty = TimeSeries(4)
+
+    assert not empty
+    assert empty.last() is None
+    assert empty.samples() == []
+    assert empty.samples(window=10) == []
+    assert empty.rate() == 0.0
+    assert empty.aggregate() == {'count': 0, 'min': None, 'max': None,
+                                 'avg': None}
+
+
+def test_append():
+    """Samples are returned oldest first."""
+
+    values = series([10, 20, 30], capacity=4)
+
+    assert len(values) == 3
+    assert values.last() == (2.0, 30.0)
+    assert values.samples() == [[0.0, 10.0], [1.0, 20.0], [2.0, 30.0]]
+
+
+def test_wraparound():
+    """Once full the oldest samples are overwritten."""
+
+    values = series(range(10), capacity=4)
+
+    assert len(values) == 4
+    assert values.last() == (9.0, 9.0)
+    assert values.samples() == [[6.0, 6.0], [7.0, 7.0], [8.0, 8.0],
+                                [9.0, 9.0]]
+    assert values.rate() == 1.0
+    assert values.aggregate()['min'] == 6.0
+
+
+def test_window():
+    """Windows end with the most recent sample."""
+
+    values = series([0, 10, 30, 60, 100, 150], capacity=4)
+
+    assert values.samples(window=1) == [[4.0, 100.0], [5.0, 150.0]]
+    assert values.samples(window=0) == [[5.0, 150.0]]
+    assert len(values.samples(window=100)) == 4
+
+    assert values.rate() == (150 - 30) / 3
+    assert values.rate(window=1) == 50.0
+    assert values.rate(window=0) == 0.0
+
+    assert values.aggregate(window=2) == {'count': 3, 'min': 60.0,
+                                          'max': 150.0,
+                                          'avg': (60 + 100 + 150) / 3}
+
+
+def test_rate_same_timestamp():
+    """Samples taken at the same time have no rate."""
+
+    values = TimeSeries(4)
+    values.append(1, 5.0)
+    values.append(2, 5.0)
+
+    assert values.rate() == 0.0
+
+
+def test_to_dict():
+    """The serialization includes the samples in the window."""
+
+    out = series([1, 2, 3]).to_dict(window=1)
+
+    assert out['capacity'] == 10
+    assert out['last'] == (2.0, 3.0)
+    assert out['rate'] == 1.0
+    assert out['samples'] == [[1.0, 2.0], [2.0, 3.0]]
+
+
+def test_store():
+    """Time series are identified by module, entity, and metric."""
+
+    store = TimeSeriesStore(capacity=4)
+
+    store.append("bin_counter", STA, "tx_bytes[8192]", 1)
+    store.append("bin_counter", STA, "rx_bytes[8192]", 2)
+    store.append("lvap_stats", STA, "best_prob", 3)
+
+    assert store.get("bin_counter", str(STA), "tx_bytes[8192]").capacity == 4
+    assert len(store.query(entity=STA)) == 3
+    assert len(store.query(module="bin_counter")) == 2
+    assert len(store.query(metric="best_prob")) == 1
+
+    store.remove(module="bin_counter")
+
+    assert list(store.query()) == [("lvap_stats", str(STA), "best_prob")]
+    assert store.generation == 2
+
+
+def test_get_many():
+    """The time series of several metrics are fetched at once."""
+
+    store = TimeSeriesStore()
+
+    many = store.get_many("bin_counter", STA, ("a", "b"))
+
+    assert many == [store.get("bin_counter", STA, "a"),
+                    store.get("bin_counter", STA, "b")]
+    assert many[0] is not many[1]
+
+
+def test_expire(expire_always):
+    """Time series not updated in the last idle seconds are removed."""
+
+    store = TimeSeriesStore(idle=10)
+    now = time.time()
+
+    store.append("bin_counter", STA, "stale", 1, now - 20)
+    store.get("bin_counter", STA, "empty")
+    store.append("bin_counter", STA, "fresh", 1, now)
+
+    store.get("bin_counter", STA, "new")
+
+    assert sorted(key[2] for key in store.query()) == ["fresh", "new"]
+    assert store.expired == 2
+
+
+def test_expire_disabled(expire_always):
+    """Time series are never removed if idle is 0."""
+
+    store = TimeSeriesStore(idle=0)
+
+    store.append("bin_counter", STA, "stale", 1, 0.0)
+    store.get("bin_counter", STA, "new")
+
+    assert len(store.query()) == 2
+    assert store.expired == 0
+
+
+def test_module_series(expire_always):
+    """Modules cache their time series until the store removes some."""
+
+    module = Module()
+    module.module_type = "test_timeseries"
+    metrics = ("a", "b")
+
+    cached = module.series(STA, metrics)
+
+    assert module.series(STA, metrics) is cached
+    assert module.series(STA, ("a", )) is not cached
+
+    cached = module.series(STA, metrics)
+    cached[1].append(1)
+    get_timeseries().remove(module="test_timeseries", metric="a")
+
+    fetched = module.series(STA, metrics)
+
+    assert fetched is not cached
+    assert fetched[1] is cached[1]
+    assert fetched == get_timeseries().get_many("test_timeseries", STA,
+                                                metrics)
+
+    get_timeseries().remove(module="test_timeseries")
+
+
+def test_bin_counter_metrics():
+    """The bin counter builds its metric names once per bins."""
+
+    module = BinCounter()
+
+    assert module._metrics == ("tx_bytes[8192]", "rx_bytes[8192]",
+                               "tx_packets[8192]", "rx_packets[8192]")
+
+    module.bins = [512, 1514]
+
+    assert module._metrics == ("tx_bytes[512]", "tx_bytes[1514]",
+                               "rx_bytes[512]", "rx_bytes[1514]",
+                               "tx_packets[512]", "tx_packets[1514]",
+                               "rx_packets[512]", "rx_packets[1514]")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Transmission policy tests."""
+
+import pytest
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.resourcepool import ResourceBlock
+from empower.core.transmissionpolicy import TX_MCAST_DMS
+from empower.core.transmissionpolicy import TX_MCAST_LEGACY
+from empower.core.transmissionpolicy import TxPolicy
+from empower.core.wtp import WTP
+
+STA = EtherAddress("04:F0:21:09:F9:93")
+
+
+class Connection:
+    """A WTP connection recording the SET_PORT messages."""
+
+    def __init__(self):
+        self.set_port = []
+        self.stream = self
+        self.is_closed = False
+
+    def closed(self):
+        """Return True if the stream is closed."""
+
+        return self.is_closed
+
+    def send_set_port(self, txp):
+        """Record SET_PORT message."""
+
+        self.set_port.append(txp)
+
+
+def new_block(index=0):
+    """Return a resource block of a new WTP."""
+
+    wtp = WTP(EtherAddress(bytes([0, 0x0D, 0xB9, 0x2F, 0x56, index])),
+              "Test WTP")
+    wtp.connection = Connection()
+    block = ResourceBlock(wtp, EtherAddress("00:0D:B9:2F:56:65"), 36, 0)
+    wtp.add_block(block)
+
+    return block
+
+
+@pytest.fixture
+def block():
+    """Return a resource block."""
+
+    return new_block()
+
+
+@pytest.fixture
+def coalesce():
+    """Enable SET_PORT coalescing."""
+
+    TxPolicy.coalesce = True
+    yield
+    TxPolicy.coalesce = False
+
+
+def next_iteration():
+    """Run the IOLoop for one iteration."""
+
+    @gen.coroutine
+    def moment():
+        """Yield to the IOLoop."""
+
+        yield gen.moment
+
+    IOLoop.current().run_sync(moment)
+
+
+def test_set(block):
+    """Each change is stored and sent."""
+
+    txp = block.tx_policies[STA]
+    txp.mcast = TX_MCAST_DMS
+    txp.ur_count = 5
+
+    assert block.tx_policies[STA] is txp
+    assert len(block.radio.connection.set_port) == 2
+
+
+def test_batch(block):
+    """Changes made in a batch are stored and sent once."""
+
+    txp = block.tx_policies[STA]
+
+    with txp.batch():
+        txp.mcast = TX_MCAST_DMS
+        txp.ur_count = 5
+        assert STA not in block.tx_policies
+
+    assert block.tx_policies[STA] is txp
+    assert block.radio.connection.set_port == [txp]
+
+
+def test_batch_rollback(block):
+    """Changes made in a failed batch are neither stored nor sent."""
+
+    txp = block.tx_policies[STA]
+
+    with pytest.raises(ValueError):
+        with txp.batch():
+            txp.mcast = TX_MCAST_DMS
+            txp.ur_count = "five"
+
+    assert txp.mcast == TX_MCAST_LEGACY
+    assert STA not in block.tx_policies
+    assert not block.radio.connection.set_port
+
+
+def test_update_invalid_field(block):
+    """Updates with unknown fields are neither stored nor sent."""
+
+    txp = block.tx_policies[STA]
+
+    with pytest.raises(KeyError):
+        txp.update(mcast=TX_MCAST_DMS, rate=54)
+
+    assert STA not in block.tx_policies
+    assert not block.radio.connection.set_port
+
+
+def test_coalesce(coalesce, block):
+    """Changes made in the same IOLoop iteration are sent once."""
+
+    txp = block.tx_policies[STA]
+    txp.mcast = TX_MCAST_DMS
+    txp.ur_count = 5
+
+    assert block.tx_policies[STA] is txp
+    assert not block.radio.connection.set_port
+
+    next_iteration()
+
+    assert block.radio.connection.set_port == [txp]
+
+
+def test_coalesce_disconnected(coalesce):
+    """Policies of disconnected WTPs are dropped, the others are sent."""
+
+    blocks = [new_block(index) for index in range(3)]
+
+    for block in blocks:
+        block.tx_policies[STA].ur_count = 5
+
+    connections = [block.radio.connection for block in blocks]
+    blocks[0].radio.connection = None
+    connections[1].is_closed = True
+
+    dropped = TxPolicy.dropped
+
+    next_iteration()
+
+    assert TxPolicy.dropped == dropped + 2
+    assert not connections[0].set_port
+    assert not connections[1].set_port
+    assert connections[2].set_port == [blocks[2].tx_policies[STA]]